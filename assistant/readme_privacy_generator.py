@@ -6,6 +6,7 @@ README & PRIVACY Generator - A tool to generate documentation from plugin manife
 import os
 import sys
 import json
+import time
 import argparse
 from pathlib import Path
 
@@ -19,15 +20,26 @@ from dotenv import load_dotenv
 # Local module imports
 from utils.formatting import (
     print_header, print_success, print_info, 
-    print_warning, print_error, print_progress
+    print_warning, print_error, print_progress, print_plain, configure_output
 )
-from utils.file_operations import find_manifest_file, create_plugin_directory, create_reminder_file
+from utils.file_operations import find_manifest_file, create_plugin_directory, create_reminder_file, write_docs_to_source
 from utils.manifest_handler import extract_manifest_info
 from utils.code_analyzer import generate_code_structure
-from utils.token_counter import count_tokens
-from utils.api_handler import call_dify_api
+from utils.code_outline import generate_code_outline
+from utils.doc_update import (
+    prepare_update, build_update_query, save_snapshot, keep_unchanged_sections, NO_CODE_CHANGES, NO_MANIFEST_CHANGES
+)
+from utils.payload_packer import count_structure_tokens, pack_code_structure, print_pack_report
+from utils.token_counter import count_tokens_cached
+from utils.api_handler import call_dify_api, build_api_response
+from utils.dify_client import get_dify_client, pool_size_for
+from utils.retry_policy import RetryPolicy
+from utils.response_cache import make_cache_key, load_cached_answer, save_cached_answer
+from utils.translation import parse_locales, translate_documents
 # No longer needed: from utils.markdown_extractor import extract_markdown_files
 from utils.logging import write_error_log
+from utils.batch_runner import discover_plugin_paths, run_batch, run_batch_async, print_batch_summary
+from utils.metrics import PluginMetrics, activate_metrics, timed, set_value, summarize_batch, export_metrics
 
 # Load environment variables from project root
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
@@ -47,88 +59,211 @@ IGNORE_EXTENSIONS = [ext if ext.startswith('.') else f'.{ext}' for ext in IGNORE
 # Token limit settings
 TOKEN_LIMIT = int(os.getenv("TOKEN_LIMIT", "64000"))  # Default to 64k tokens
 
-if not DIFY_API_KEY:
-    print_error("DIFY_API_KEY environment variable is not set.")
-    print_info("Please create a .env file with your Dify API key.")
-    sys.exit(1)
+# Number of plugins processed at the same time in batch mode
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
+# Generate README and PRIVACY with two concurrent requests instead of one
+SPLIT_DOCUMENTS = os.getenv("SPLIT_DOCUMENTS", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Send a compact outline (signatures, declarations) instead of whole file bodies
+CODE_OUTLINE = os.getenv("CODE_OUTLINE", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Build code structures from a content-addressed store shared by all plugins
+BLOB_STORE = os.getenv("BLOB_STORE", "false").strip().lower() in ("1", "true", "yes", "on")
+
+
+def process_plugin(plugin_path, non_interactive=False, additional_instructions=None, use_async=False, use_cache=True,
+                   incremental=False, pack=True, split=False, locales=None, outline=False,
+                   blob_store=False, update=False):
+    """Generate README & PRIVACY documentation for a single plugin
+
+    Args:
+        plugin_path (str): Path to the plugin source directory
+        non_interactive (bool): Skip all prompts (token limit and additional instructions)
+        additional_instructions (str): Extra instructions for the model; prompted for when
+            None and running interactively
+        use_async (bool): Use the asyncio client instead of the blocking one
+        use_cache (bool): Replay a cached response when the request is unchanged
+        incremental (bool): Re-digest only the files changed since the last run
+        pack (bool): Fit an oversized code structure into TOKEN_LIMIT instead of
+            sending it whole
+        split (bool): Generate README and PRIVACY with two concurrent requests
+        locales (list): Extra locales to translate the generated documents into
+        outline (bool): Send a compact code outline instead of the full code structure
+        blob_store (bool): Build the code structure from the shared blob store
+        update (bool): Revise the existing documents from the changes since the
+            last generation instead of generating them from scratch
+
+    Returns:
+        dict: Result with ``status`` ("success", "partial", "failed" or "skipped"),
+        ``name``, ``plugin_path``, ``readme``, ``privacy``, ``tokens``, ``error``,
+        ``translations`` (locale -> status) and ``metrics`` (a ``PluginMetrics``)
+    """
+    result, job = prepare_plugin(plugin_path, non_interactive, additional_instructions, use_cache, incremental, pack,
+                                 split, locales, outline, blob_store, update)
+    if job is None:
+        return result
+
+    # One time budget for the call, its resumes and split requests, and the translations
+    job["deadline"] = RetryPolicy.from_env(job["max_retries"]).start()
+
+    # Make the API call with XML tag extraction enabled
+    print_info("Generating documentation using Dify API...")
+    with timed("api"):
+        if use_async:
+            from utils.async_api_handler import call_dify_api_sync
+            api_response, error_details = call_dify_api_sync(save_docs=True, **job)
+        else:
+            api_response, error_details = call_dify_api(save_docs=True, **job)
+
+    return finalize_plugin(result, job, api_response, error_details)
+
+
+def prepare_plugin(plugin_path, non_interactive=False, additional_instructions=None, use_cache=True,
+                   incremental=False, pack=True, split=False, locales=None, outline=False,
+                   blob_store=False, update=False):
+    """Run the local stages (manifest, code structure, tokens) for a plugin
+
+    On a response cache hit the saved answer is replayed and the plugin is
+    finalized here, without an API call.
+
+    Returns:
+        tuple: (result, job) where job holds the ``call_dify_api`` keyword
+        arguments, or is None if the plugin is already done, failed or was skipped
+    """
+    result = {
+        "plugin_path": plugin_path,
+        "name": os.path.basename(os.path.normpath(plugin_path)),
+        "status": "failed",
+        "readme": False,
+        "privacy": False,
+        "tokens": 0,
+        "stage": "setup",
+        "error": "",
+        "translations": {},
+        "locales": locales or [],
+        "metrics": PluginMetrics(os.path.basename(os.path.normpath(plugin_path)))
+    }
+    activate_metrics(result["metrics"])
 
-def main():
-    """Main function to run the README & PRIVACY Generator"""
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Generate README & PRIVACY documentation for Dify plugins.')
-    parser.add_argument('-p', '--path', help='Path to the plugin directory')
-    parser.add_argument('-y', '--yes', action='store_true', help='Run in non-interactive mode (skip additional instructions)')
-    args = parser.parse_args()
-    
-    print_header("README & PRIVACY Generator", "=")
-    print("\nThis tool generates README & PRIVACY documentation for Dify plugins")
-    print("It extracts information from manifest.yaml and analyzes code structure")
-    
-    # Get plugin directory from user or command line
-    if args.path:
-        plugin_path = args.path.strip('"').strip("'")  # Remove quotes if present
-        print_info(f"Using plugin path from command line: {plugin_path}")
-    else:
-        plugin_path = input("Enter the plugin directory path: ")
-        plugin_path = plugin_path.strip('"').strip("'")  # Remove quotes if present
-    
     # Validate the path
     if not os.path.isdir(plugin_path):
         print_error(f"Directory not found: {plugin_path}")
-        sys.exit(1)
+        result["error"] = "Directory not found"
+        return result, None
     
     # Extract manifest information
-    manifest_info = extract_manifest_info(plugin_path)
+    with timed("manifest"):
+        manifest_info = extract_manifest_info(plugin_path)
     if not manifest_info:
-        print_error("Failed to extract manifest information. Exiting.")
-        sys.exit(1)
+        print_error("Failed to extract manifest information.")
+        result["error"] = "Failed to extract manifest information"
+        return result, None
+    result["name"] = manifest_info["name"] or result["name"]
+    result["metrics"].plugin = result["name"]
     
     # Create plugin directory if it doesn't exist
     plugin_dir = create_plugin_directory(manifest_info["name"])
     if not plugin_dir:
-        print_error("Failed to create plugin directory. Exiting.")
-        sys.exit(1)
+        print_error("Failed to create plugin directory.")
+        result["error"] = "Failed to create plugin directory"
+        return result, None
     
     # Create reminder file immediately after getting plugin info
     create_reminder_file(plugin_dir, manifest_info["name"])
     
     # Generate code structure file
     print_header("GENERATING CODE STRUCTURE", "─")
-    output_file = os.path.join(plugin_dir, f"{manifest_info['name']}_structure.txt")
-    code_structure = generate_code_structure(plugin_path, output_file)
+    with timed("code_structure"):
+        if outline:
+            # Outlines are cached per file, so there is nothing to update incrementally
+            output_file = os.path.join(plugin_dir, f"{manifest_info['name']}_outline.txt")
+            code_structure = generate_code_outline(plugin_path, output_file, manifest_info.get("plugin_files"))
+        else:
+            output_file = os.path.join(plugin_dir, f"{manifest_info['name']}_structure.txt")
+            code_structure = generate_code_structure(plugin_path, output_file, incremental, blob_store)
     if not code_structure:
-        print_error("Failed to generate code structure. Exiting.")
-        sys.exit(1)
+        print_error("Failed to generate code structure.")
+        result["error"] = "Failed to generate code structure"
+        return result, None
         
     # Count tokens in code structure
-    token_count = count_tokens(code_structure)
+    with timed("token_count"):
+        token_count = count_structure_tokens(code_structure)
+    result["tokens"] = token_count
+    set_value("structure_chars", len(code_structure))
+    set_value("structure_tokens", token_count)
     print_info(f"Code structure contains approximately {token_count} tokens")
-    
+
+    # The full payload is recorded once the documents are complete, as the base of later updates
+    payload_format = "outline" if outline else "structure"
+    result["snapshot"] = (code_structure, payload_format)
+
+    revision = None
+    if update:
+        print_header("COMPARING WITH THE LAST GENERATION", "─")
+        with timed("diff"):
+            revision = prepare_update(plugin_path, plugin_dir, manifest_info, code_structure, payload_format)
+        if revision is None:
+            print_info("Generating the documentation from scratch")
+        elif not revision["code_diff"] and not revision["manifest_delta"]:
+            print_success("Nothing changed since the last generation, keeping the documentation as is")
+            result.pop("snapshot")
+            result["status"] = "success"
+            result["readme"] = result["privacy"] = True
+            return result, None
+        else:
+            print_info(f"{len(revision['changed'])} file(s) changed since the last generation")
+
     # Check if token count exceeds limit
     token_limit = int(os.getenv("TOKEN_LIMIT", "64000"))
-    if token_count > token_limit:
+    if revision is not None:
+        # Only the changes are sent, so the limit applies to them instead of the full code structure
+        with timed("token_count"):
+            update_tokens = count_tokens_cached(revision["code_diff"]) + count_tokens_cached(revision["manifest_delta"])
+        set_value("update_tokens", update_tokens)
+        print_info(f"The changes contain approximately {update_tokens} tokens")
+        if update_tokens > token_limit:
+            # A diff cannot be packed by file importance; the full structure can
+            print_warning(f"The changes exceed the token limit of {token_limit}, "
+                          "generating the documentation from scratch")
+            revision = None
+        else:
+            result["tokens"] = update_tokens
+
+    if revision is None and token_count > token_limit and pack:
+        print_warning(f"Code structure exceeds token limit of {token_limit}, packing by file importance")
+        with timed("pack"):
+            code_structure, pack_report = pack_code_structure(code_structure, token_limit)
+        print_pack_report(pack_report, token_limit)
+        result["tokens"] = pack_report["tokens"]
+        set_value("packed_tokens", pack_report["tokens"])
+    elif revision is None and token_count > token_limit:
         print_warning(f"Code structure exceeds token limit of {token_limit}!")
         print_warning("This may cause issues with the API call.")
-        if args.yes:
+        if non_interactive:
             print_info("Running in non-interactive mode, proceeding anyway...")
             proceed = 'y'
         else:
             proceed = input("Do you want to proceed anyway? (y/n): ").lower()
         if proceed != 'y':
             print_info("Exiting. Consider reducing the code structure size.")
-            sys.exit(0)
+            result["status"] = "skipped"
+            result["error"] = f"Token limit of {token_limit} exceeded"
+            return result, None
     
     # Get any additional instructions from user (unless in non-interactive mode)
-    if args.yes:
-        print_info("Running in non-interactive mode (skipping additional instructions)")
-        additional_instructions = ""
-    else:
-        additional_instructions = input("Any additional instructions? (Press Enter to skip): ")
+    if additional_instructions is None:
+        if non_interactive:
+            print_info("Running in non-interactive mode (skipping additional instructions)")
+            additional_instructions = ""
+        else:
+            additional_instructions = input("Any additional instructions? (Press Enter to skip): ")
     
     # Call Dify API
     print_header("GENERATING DOCUMENTATION", "─")
-    max_retries = int(os.getenv("MAX_RETRIES", "0"))
+    max_retries = MAX_RETRIES
+    result["stage"] = "generation"
     
     # Prepare inputs for API call
     inputs = {
@@ -145,11 +280,54 @@ def main():
     
     # Query for API
     query = "Generate README.md and PRIVACY.md for this Dify plugin"
-    
-    # Make the API call with XML tag extraction enabled
-    print_info("Generating documentation using Dify API...")
-    api_response, error_details = call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries, save_docs=True)
-    
+
+    if revision is not None:
+        # Send the changes and the current documents instead of the whole plugin
+        inputs["manifest_info"] = revision["manifest_delta"] or NO_MANIFEST_CHANGES
+        inputs["code_files"] = revision["code_diff"] or NO_CODE_CHANGES
+        query = build_update_query(revision["documents"])
+        result["update_documents"] = revision["documents"]
+
+    job = {
+        "plugin_dir": plugin_dir,
+        "manifest_info": manifest_info,
+        "inputs": inputs,
+        "query": query,
+        "max_retries": max_retries,
+        # Split requests would replace the revision query with a from-scratch one
+        "split_documents": split and revision is None
+    }
+
+    # Replay a cached response if nothing in the request changed
+    if use_cache:
+        with timed("cache_lookup"):
+            result["cache_key"] = make_cache_key(inputs, query)
+            cached_answer = load_cached_answer(result["cache_key"])
+        set_value("cache_hit", 1 if cached_answer else 0)
+        if cached_answer:
+            print_success("Found cached response for unchanged plugin, skipping API call")
+            api_response = build_api_response(cached_answer, plugin_dir, save_docs=True)
+            return finalize_plugin(result, job, api_response, ""), None
+
+    return result, job
+
+
+def finalize_plugin(result, job, api_response, error_details):
+    """Report on the API response and write generated docs to the plugin source
+
+    Returns:
+        dict: The updated result
+    """
+    plugin_dir = job["plugin_dir"]
+    plugin_path = result["plugin_path"]
+    cache_key = result.pop("cache_key", None)
+    locales = result.pop("locales", [])
+    snapshot = result.pop("snapshot", None)
+    previous_documents = result.pop("update_documents", None)
+
+    if api_response and previous_documents:
+        keep_unchanged_sections(api_response, previous_documents, plugin_dir)
+
     if api_response:
         # Check if README and PRIVACY content was extracted
         readme_found = api_response.get('readme_content', '') != ''
@@ -170,30 +348,286 @@ def main():
                 print_success("Generated PRIVACY.md file")
                 print_info(f"File saved to: {plugin_dir}")
             
-            # Copy generated files to source directory
-            print_info(f"Copying documentation to source directory: {plugin_path}")
-            from utils.file_operations import copy_docs_to_source
-            readme_copied, privacy_copied = copy_docs_to_source(
-                plugin_dir, plugin_path, readme_found, privacy_found
-            )
+            # Write generated files to source directory
+            print_info(f"Writing documentation to source directory: {plugin_path}")
+            with timed("copy_docs"):
+                readme_written, privacy_written = write_docs_to_source(
+                    plugin_path, api_response.get('readme_content', ''), api_response.get('privacy_content', '')
+                )
             
-            # Report on copy results
-            if readme_copied or privacy_copied:
-                print_success("Documentation copied to source directory successfully")
+            # Report on write results
+            if readme_written or privacy_written:
+                print_success("Documentation in source directory is up to date")
             else:
-                print_warning("Failed to copy documentation to source directory")
+                print_warning("Failed to write documentation to source directory")
+
+            result["readme"] = readme_found
+            result["privacy"] = privacy_found
+            complete = api_response.get('readme_complete') and api_response.get('privacy_complete')
+            result["status"] = "success" if complete else "partial"
+            if not complete:
+                result["error"] = error_details or "Incomplete documentation in API response"
+            else:
+                if cache_key:
+                    # Only complete responses are worth replaying
+                    save_cached_answer(cache_key, api_response["answer"], result["name"])
+                if snapshot:
+                    save_snapshot(plugin_dir, job["manifest_info"], *snapshot)
+
+            if locales:
+                # Without a cache key the run was started with --no-cache
+                result["translations"] = translate_plugin_docs(
+                    result, job, api_response, locales, use_cache=cache_key is not None
+                )
         else:
             print_error("Failed to generate documentation files")
             error_message = "Failed to extract documentation content from API response."
             write_error_log(error_message, error_details, plugin_dir)
             print_info("Check error_log.txt for details")
+            result["error"] = error_message
     else:
         print_error("Failed to get API response. Check error log for details.")
         if error_details:
             write_error_log("API call failed", error_details, plugin_dir)
             print_info("Error details written to error_log.txt")
+        result["error"] = "API call failed"
+
+    return result
+
+
+def translate_plugin_docs(result, job, api_response, locales, use_cache=True):
+    """Translate the generated documents and write the translations to the plugin source
+
+    Returns:
+        dict: Locale -> "success", "partial" or "failed"
+    """
+    print_header("TRANSLATING DOCUMENTATION", "─")
+    with timed("translation"):
+        translations = translate_documents(
+            job["plugin_dir"], job["manifest_info"], job["inputs"], api_response, locales,
+            job["max_retries"], use_cache, job.get("deadline")
+        )
+
+    statuses = {}
+    for locale, (translated, error_details) in translations.items():
+        if not translated:
+            print_error(f"Failed to translate documentation into {locale}")
+            if error_details:
+                write_error_log(f"Translation into {locale} failed", error_details, job["plugin_dir"])
+            statuses[locale] = "failed"
+            continue
+        write_docs_to_source(result["plugin_path"], translated.get("readme_content", ""),
+                             translated.get("privacy_content", ""), locale)
+        complete = all(
+            translated.get(f"{key}_complete") for key in ("readme", "privacy") if api_response.get(f"{key}_complete")
+        )
+        statuses[locale] = "success" if complete else "partial"
+        if complete:
+            print_success(f"Translated documentation into {locale}")
+        else:
+            print_warning(f"Translation into {locale} is incomplete")
+    return statuses
+
+
+def write_metrics(metrics_file, results, wall_time=None):
+    """Export per-plugin (and, for batches, aggregated) metrics of a run"""
+    records = [
+        result["metrics"].to_dict(status=result["status"], duration=round(result.get("duration", 0.0), 6))
+        for result in results
+        if result.get("metrics")
+    ]
+    if wall_time is not None:
+        records.append(summarize_batch(records, wall_time))
+    if export_metrics(metrics_file, records):
+        print_info(f"Metrics written to: {metrics_file}")
+    else:
+        print_warning(f"Failed to write metrics to: {metrics_file}")
+
+
+def streams_per_plugin(split=False, locales=None):
+    """Return how many API streams one plugin may have open at once"""
+    from utils.stream_extractor import DOCUMENTS
+    return max(len(DOCUMENTS) if split else 1, len(locales or []))
+
+
+def run_batch_mode(source, concurrency, use_async=False, use_cache=True, incremental=False, pack=True,
+                   metrics_file=None, split=False, locales=None, outline=False, blob_store=False, update=False):
+    """Generate documentation for every plugin found in a root directory or list file"""
+    plugin_paths = discover_plugin_paths(source)
+    if not plugin_paths:
+        print_error(f"No plugins found in: {source}")
+        sys.exit(1)
+
+    print_info(f"Found {len(plugin_paths)} plugins in: {source}")
+    batch_started = time.monotonic()
+    # Blocking calls (all calls without --async, translations with it) share one pooled client
+    get_dify_client(pool_size_for(concurrency, streams_per_plugin(split, locales)))
+    if use_async:
+        results = run_batch_async(
+            plugin_paths,
+            lambda plugin_path: prepare_plugin(plugin_path, non_interactive=True, use_cache=use_cache,
+                                               incremental=incremental, pack=pack, split=split,
+                                               locales=locales, outline=outline, blob_store=blob_store,
+                                               update=update),
+            finalize_plugin,
+            concurrency,
+            streams_per_plugin(split)
+        )
+    else:
+        results = run_batch(
+            plugin_paths,
+            lambda plugin_path: process_plugin(plugin_path, non_interactive=True, use_cache=use_cache,
+                                               incremental=incremental, pack=pack, split=split,
+                                               locales=locales, outline=outline, blob_store=blob_store,
+                                               update=update),
+            concurrency
+        )
+    all_succeeded = print_batch_summary(results)
+    if metrics_file:
+        write_metrics(metrics_file, results, time.monotonic() - batch_started)
+
+    print_plain()
+    print_header("PROCESS COMPLETED", "=")
+    if not all_succeeded:
+        sys.exit(1)
+
+
+def run_watch_mode(plugin_paths, concurrency, use_cache=True, pack=True, metrics_file=None, split=False,
+                   locales=None, outline=False, blob_store=False, update=False):
+    """Regenerate documentation whenever a watched plugin changes, until interrupted
+
+    The tokenizer, the pooled HTTP session and the in-memory token counts stay
+    warm between regenerations, and code structures are updated incrementally.
+    """
+    from utils.watcher import watch_plugins
+    from utils.token_counter import get_encoding
+
+    # Pay the one-time startup costs before the first change arrives
+    get_encoding()
+    get_dify_client(pool_size_for(concurrency, streams_per_plugin(split, locales)))
+
+    def worker(plugin_path):
+        return process_plugin(plugin_path, non_interactive=True, use_cache=use_cache, incremental=True, pack=pack,
+                              split=split, locales=locales, outline=outline, blob_store=blob_store,
+                              update=update)
+
+    def regenerate(changed_paths):
+        started = time.monotonic()
+        if len(changed_paths) == 1:
+            results = [worker(changed_paths[0])]
+            results[0]["duration"] = time.monotonic() - started
+        else:
+            results = run_batch(changed_paths, worker, concurrency)
+            print_batch_summary(results)
+        if metrics_file:
+            write_metrics(metrics_file, results, time.monotonic() - started if len(results) > 1 else None)
+
+    watch_plugins(
+        plugin_paths,
+        regenerate,
+        debounce=float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2")),
+        poll_interval=float(os.getenv("WATCH_POLL_SECONDS", "1"))
+    )
+
+
+def main():
+    """Main function to run the README & PRIVACY Generator"""
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Generate README & PRIVACY documentation for Dify plugins.')
+    parser.add_argument('-p', '--path', help='Path to the plugin directory')
+    parser.add_argument('-y', '--yes', action='store_true', help='Run in non-interactive mode (skip additional instructions)')
+    parser.add_argument('-b', '--batch', metavar='SOURCE',
+                        help='Process every plugin under a root directory, or listed (one path per line) in a file; implies --yes')
+    parser.add_argument('-j', '--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help=f'Number of plugins processed concurrently in batch mode (default: {BATCH_CONCURRENCY})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Use the asyncio client (all API streams share one event loop and connection pool)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='Always call the API, even if a cached response exists for an unchanged plugin')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-digest files changed since the last run (keeps a manifest next to the structure file)')
+    parser.add_argument('--no-pack', dest='pack', action='store_false',
+                        help='Do not pack an oversized code structure into TOKEN_LIMIT; ask (or with -y, send it whole)')
+    parser.add_argument('--metrics', metavar='FILE', default=os.getenv("METRICS_FILE") or None,
+                        help='Write stage timings and counters to FILE: Prometheus text if it ends in .prom, '
+                             'otherwise appended JSON lines (default: METRICS_FILE)')
+    parser.add_argument('--split', action='store_true', default=SPLIT_DOCUMENTS,
+                        help='Generate README and PRIVACY with two concurrent requests, each retried on its own '
+                             '(default: SPLIT_DOCUMENTS)')
+    parser.add_argument('--outline', action='store_true', default=CODE_OUTLINE,
+                        help='Send a compact outline (docstrings, signatures, tool parameters, credentials, HTTP hosts) '
+                             'instead of whole file bodies (default: CODE_OUTLINE)')
+    parser.add_argument('--blob-store', action='store_true', default=BLOB_STORE,
+                        help='Build code structures from a content-addressed store shared across plugins and runs, '
+                             'so files seen before are not digested or token-counted again (default: BLOB_STORE)')
+    parser.add_argument('--update', action='store_true',
+                        help='Revise the existing README and PRIVACY: send only the file diffs and manifest changes '
+                             'since the last complete generation instead of the whole code structure')
+    parser.add_argument('--locales', default=os.getenv("DOC_LOCALES", ""),
+                        help='Comma-separated extra locales (e.g. zh_Hans,ja_JP): translate the generated documents '
+                             'into README_<locale>.md and PRIVACY_<locale>.md (default: DOC_LOCALES)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and regenerate the documentation of the plugin (-p) or batch (-b) '
+                             'whenever its manifest, YAML or source files change')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print warnings and errors')
+    parser.add_argument('--log-format', choices=['text', 'json'], default=None,
+                        help='Console output format; json prints one JSON object per message (default: CONSOLE_LOG_FORMAT or text)')
+    args = parser.parse_args()
+    configure_output(log_format=args.log_format, quiet=args.quiet)
+
+    # Checked after parsing so --help works without credentials
+    if not DIFY_API_KEY:
+        print_error("DIFY_API_KEY environment variable is not set.")
+        print_info("Please create a .env file with your Dify API key.")
+        sys.exit(1)
+    locales = parse_locales(args.locales)
+    
+    print_header("README & PRIVACY Generator", "=")
+    print_plain("\nThis tool generates README & PRIVACY documentation for Dify plugins")
+    print_plain("It extracts information from manifest.yaml and analyzes code structure")
+
+    if args.watch:
+        source = args.batch or args.path
+        if not source:
+            print_error("--watch needs a plugin path (-p) or a batch source (-b)")
+            sys.exit(1)
+        plugin_paths = discover_plugin_paths(source) if args.batch else [source.strip('"').strip("'")]
+        plugin_paths = [plugin_path for plugin_path in plugin_paths if os.path.isdir(plugin_path)]
+        if not plugin_paths:
+            print_error(f"No plugins found in: {source}")
+            sys.exit(1)
+        run_watch_mode(plugin_paths, args.concurrency, args.use_cache, args.pack, args.metrics, args.split, locales,
+                       args.outline, args.blob_store, args.update)
+        return
+
+    if args.batch:
+        run_batch_mode(args.batch, args.concurrency, args.use_async, args.use_cache, args.incremental, args.pack,
+                       args.metrics, args.split, locales, args.outline, args.blob_store, args.update)
+        return
+    
+    # Get plugin directory from user or command line
+    if args.path:
+        plugin_path = args.path.strip('"').strip("'")  # Remove quotes if present
+        print_info(f"Using plugin path from command line: {plugin_path}")
+    else:
+        plugin_path = input("Enter the plugin directory path: ")
+        plugin_path = plugin_path.strip('"').strip("'")  # Remove quotes if present
+    
+    started = time.monotonic()
+    result = process_plugin(plugin_path, non_interactive=args.yes, use_async=args.use_async,
+                            use_cache=args.use_cache, incremental=args.incremental, pack=args.pack,
+                            split=args.split, locales=locales, outline=args.outline,
+                            blob_store=args.blob_store, update=args.update)
+    result["duration"] = time.monotonic() - started
+    if args.metrics:
+        write_metrics(args.metrics, [result])
+    if result["status"] == "skipped":
+        sys.exit(0)
+    if result["status"] == "failed" and result["stage"] == "setup":
+        print_error("Exiting.")
+        sys.exit(1)
     
-    print("")
+    print_plain()
     print_header("PROCESS COMPLETED", "=")
 
 
@@ -0,0 +1,73 @@
+"""
+Startup time benchmark for the generator CLI
+
+Runs ``readme_privacy_generator.py --help`` in fresh interpreters and reports
+the median wall time, plus the slowest imports from ``python -X importtime``.
+Heavy dependencies (gitingest, requests, yaml, pathspec, tiktoken, aiohttp)
+are imported where they are used, so they should not show up here.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--top 15] [--budget 0.25]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATOR = os.path.join(project_root, "assistant", "readme_privacy_generator.py")
+
+
+def time_command(command, runs):
+    """Return the wall time of each of ``runs`` runs of ``command``"""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def slowest_imports(top, args=("--help",)):
+    """Return [(cumulative seconds, module)] of the slowest top-level imports"""
+    command = [sys.executable, "-X", "importtime", GENERATOR, *args]
+    output = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only modules imported directly by the generator or site, not their dependencies
+        if name.startswith("  "):
+            continue
+        imports.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cold start time of the generator CLI.')
+    parser.add_argument('--runs', type=int, default=10, help='Interpreter starts to time (default: 10)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list (default: 15)')
+    parser.add_argument('--budget', type=float,
+                        help='Fail (exit code 1) if the median start takes longer than this many seconds')
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_command([sys.executable, "-c", "pass"], args.runs))
+    durations = time_command([sys.executable, GENERATOR, "--help"], args.runs)
+    median = statistics.median(durations)
+
+    print(f"Bare interpreter:  {baseline * 1000:7.1f} ms (median of {args.runs})")
+    print(f"Generator --help:  {median * 1000:7.1f} ms (median, min {min(durations) * 1000:.1f} ms)")
+    print("\nSlowest top-level imports:")
+    for seconds, name in slowest_imports(args.top):
+        print(f"  {seconds * 1000:7.1f} ms  {name}")
+
+    if args.budget is not None and median > args.budget:
+        print(f"\nStartup took {median:.3f}s, over the budget of {args.budget:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
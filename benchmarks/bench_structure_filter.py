@@ -0,0 +1,134 @@
+"""
+Benchmark for the code-structure ignore filter
+
+Generates a synthetic gitingest dump (50 MB by default) and compares the
+previous read-split-rewrite line filter with the streaming, file-level
+filter in utils/code_analyzer.py.
+
+Usage:
+    python benchmarks/bench_structure_filter.py [--size-mb 50] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+# Setup import path for local modules
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from utils.code_analyzer import SEPARATOR, build_suffix_matcher, filter_structure_file
+
+IGNORE_EXTENSIONS = ".min.js,.min.css,.map,.lock,.png,.jpg,.jpeg,.gif,.svg,.woff,.woff2,.ttf,.eot"
+
+# (suffix, share of files) for the synthetic corpus
+FILE_KINDS = [
+    (".py", 0.45),
+    (".yaml", 0.2),
+    (".md", 0.05),
+    (".min.js", 0.1),
+    (".svg", 0.1),
+    (".map", 0.1),
+]
+
+
+def legacy_line_filter(output_file, ignore_extensions):
+    """The filter generate_code_structure used before the streaming rewrite"""
+    with open(output_file, 'r', encoding='utf-8') as f:
+        file_content = f.read()
+    ignore_extensions = ignore_extensions.split(',')
+    filtered_lines = []
+    for line in file_content.split('\n'):
+        should_include = True
+        for ext in ignore_extensions:
+            if ext in line.lower():
+                should_include = False
+                break
+        if should_include:
+            filtered_lines.append(line)
+    filtered_content = '\n'.join(filtered_lines)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(filtered_content)
+
+
+def streaming_filter(output_file, ignore_extensions):
+    """The current single-pass, file-level filter"""
+    filter_structure_file(output_file, build_suffix_matcher(ignore_extensions))
+
+
+def write_synthetic_dump(path, size_bytes, seed=0):
+    """Write a gitingest-style dump of roughly ``size_bytes``"""
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in FILE_KINDS]
+    weights = [weight for _, weight in FILE_KINDS]
+    code_line = "    result = compute_value(item, options=options)  # see helper.map docs\n"
+
+    paths = []
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        body_parts = []
+        index = 0
+        while written < size_bytes:
+            suffix = rng.choices(kinds, weights)[0]
+            file_path = f"pkg{index % 50}/module_{index}{suffix}"
+            paths.append(file_path)
+            body = code_line * rng.randint(20, 400)
+            section = f"{SEPARATOR}\nFILE: {file_path}\n{SEPARATOR}\n{body}\n\n"
+            body_parts.append(section)
+            written += len(section)
+            index += 1
+
+        f.write("Directory structure:\n└── plugin/\n")
+        for i, file_path in enumerate(paths):
+            marker = "└── " if i == len(paths) - 1 else "├── "
+            f.write(f"    {marker}{file_path}\n")
+        f.write("\n")
+        f.write("\n".join(body_parts))
+
+    return len(paths)
+
+
+def measure(filter_function, template_path, work_path, repeat):
+    """Return (best wall time, peak traced memory) for a filter"""
+    times = []
+    for _ in range(repeat):
+        with open(template_path, 'rb') as source, open(work_path, 'wb') as target:
+            target.write(source.read())
+        start = time.perf_counter()
+        filter_function(work_path, IGNORE_EXTENSIONS)
+        times.append(time.perf_counter() - start)
+
+    with open(template_path, 'rb') as source, open(work_path, 'wb') as target:
+        target.write(source.read())
+    tracemalloc.start()
+    filter_function(work_path, IGNORE_EXTENSIONS)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the code-structure ignore filter.')
+    parser.add_argument('--size-mb', type=float, default=50, help='Size of the synthetic dump in MB (default: 50)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per filter; the best is reported (default: 3)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        template_path = os.path.join(temp_dir, "structure_template.txt")
+        work_path = os.path.join(temp_dir, "structure.txt")
+        file_count = write_synthetic_dump(template_path, int(args.size_mb * 1024 * 1024))
+        size_mb = os.path.getsize(template_path) / (1024 * 1024)
+        print(f"Synthetic dump: {size_mb:.1f} MB, {file_count} files")
+
+        for label, filter_function in [("legacy line filter", legacy_line_filter),
+                                       ("streaming file filter", streaming_filter)]:
+            best, peak = measure(filter_function, template_path, work_path, args.repeat)
+            print(f"{label:<24} {best:7.2f}s  {size_mb / best:7.1f} MB/s  peak memory {peak / (1024 * 1024):7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Local stand-in for the Dify chat-messages API
+
+Streams ``message`` and ``message_end`` SSE events like Dify's streaming
+mode, with configurable answer size, chunk size, latency and error
+injection. Can run in a background thread (``FakeDifyServer``) or on its own:
+
+Usage:
+    python benchmarks/fake_dify_server.py [--port 8765] [--chunk-size 16] [--latency 0.2] [--error-rate 0.1]
+
+Then point the generator at it with ``DIFY_BASE_URL=http://127.0.0.1:8765/v1``.
+"""
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_answer(name, answer_bytes, query=""):
+    """Build a README/PRIVACY answer of roughly ``answer_bytes`` characters
+
+    A query asking for only one document (split mode) gets only that one.
+    """
+    paragraph = (f"The {name} plugin connects Dify to an external service. "
+                 "It exposes tools that send the given parameters to the service API and return the results. ")
+    body = (paragraph * max(1, answer_bytes // (2 * len(paragraph)))).strip()
+    readme = f"<readme>\n# {name}\n\n{body}\n</readme>\n"
+    privacy = f"<privacy_policy>\n# Privacy Policy\n\n{body}\n</privacy_policy>\n"
+    if "only README.md" in query:
+        privacy = ""
+    elif "only PRIVACY.md" in query:
+        readme = ""
+    return f"Here is the documentation.\n{readme}{privacy}"
+
+
+class FakeDifyServer:
+    """Threaded fake Dify server
+
+    Args:
+        port (int): Port to listen on (0 picks a free one)
+        answer_bytes (int): Approximate answer size in characters
+        chunk_size (int): Characters per ``message`` event
+        latency (float): Seconds before the first event
+        chunk_delay (float): Seconds between events
+        error_rate (float): Share of requests answered with HTTP 500
+        rate_limit_rate (float): Share of requests answered with HTTP 429 and ``Retry-After: 1``
+        drop_rate (float): Share of streams cut off halfway through the answer
+        seed (int): Random seed for error injection
+        statuses (list): HTTP statuses the first requests are answered with, in
+            order and after ``latency``, before requests are streamed normally
+    """
+
+    def __init__(self, port=0, answer_bytes=8000, chunk_size=16, latency=0.0, chunk_delay=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, drop_rate=0.0, seed=0, statuses=None):
+        self.options = {
+            "answer_bytes": answer_bytes,
+            "chunk_size": max(1, chunk_size),
+            "latency": latency,
+            "chunk_delay": chunk_delay,
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+            "drop_rate": drop_rate,
+        }
+        self.random = random.Random(seed)
+        self.statuses = list(statuses or [])
+        # Parsed bodies of all requests received, in order
+        self.received = []
+        self.stats = {"requests": 0, "connections": 0, "errors": 0, "rate_limited": 0, "dropped": 0,
+                      "bytes_received": 0, "streams": 0, "peak_streams": 0}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _draw(self):
+        """Decide the outcome of a request: a scripted status, "error", "rate_limited", "dropped" or "ok" """
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.statuses:
+                return self.statuses.pop(0)
+            roll = self.random.random()
+            for outcome, option in (("errors", "error_rate"), ("rate_limited", "rate_limit_rate"),
+                                    ("dropped", "drop_rate")):
+                if roll < self.options[option]:
+                    self.stats[outcome] += 1
+                    return outcome
+                roll -= self.options[option]
+            return "ok"
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            # One handler per TCP connection; kept-alive requests reuse it
+            with server.lock:
+                server.stats["connections"] += 1
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with server.lock:
+                server.stats["bytes_received"] += len(raw)
+            if self.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            request = json.loads(raw)
+            with server.lock:
+                server.received.append(request)
+
+            outcome = server._draw()
+            if isinstance(outcome, int):
+                if server.options["latency"]:
+                    time.sleep(server.options["latency"])
+                return self._plain(outcome, f"Scripted status {outcome}")
+            if outcome == "errors":
+                return self._plain(500, "Internal Server Error")
+            if outcome == "rate_limited":
+                return self._plain(429, "Too Many Requests", {"Retry-After": "1"})
+
+            options = server.options
+            name = (request.get("inputs") or {}).get("name") or "plugin"
+            answer = build_answer(name, options["answer_bytes"], request.get("query") or "")
+            conversation_id = request.get("conversation_id") or f"conv-{time.monotonic_ns()}"
+
+            with server.lock:
+                server.stats["streams"] += 1
+                server.stats["peak_streams"] = max(server.stats["peak_streams"], server.stats["streams"])
+            try:
+                self._stream(answer, outcome, conversation_id)
+            finally:
+                with server.lock:
+                    server.stats["streams"] -= 1
+
+        def _stream(self, answer, outcome, conversation_id):
+            options = server.options
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if options["latency"]:
+                time.sleep(options["latency"])
+
+            size = options["chunk_size"]
+            stop_at = len(answer) // 2 if outcome == "dropped" else len(answer)
+            for start in range(0, stop_at, size):
+                event = {"event": "message", "answer": answer[start:start + size], "conversation_id": conversation_id}
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+                if options["chunk_delay"]:
+                    time.sleep(options["chunk_delay"])
+
+            if outcome == "dropped":
+                # Cut the connection without the terminating chunk
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self._chunk(f"data: {json.dumps({'event': 'message_end', 'conversation_id': conversation_id})}\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        def _plain(self, status, text, headers=None):
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake Dify streaming API for benchmarks.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--answer-bytes', type=int, default=8000, help='Approximate answer size (default: 8000)')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Characters per message event (default: 16)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before the first event (default: 0)')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='Seconds between events (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with 429')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of streams cut off halfway')
+    args = parser.parse_args()
+
+    server = FakeDifyServer(args.port, args.answer_bytes, args.chunk_size, args.latency, args.chunk_delay,
+                            args.error_rate, args.rate_limit_rate, args.drop_rate)
+    print(f"Fake Dify API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
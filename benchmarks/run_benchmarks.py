@@ -0,0 +1,311 @@
+"""
+End-to-end benchmark suite
+
+Generates a synthetic plugin corpus, starts the fake Dify server and times
+the pipeline stages on it: code structure analysis (full and incremental),
+code outlines (empty and warm blob store), structures of plugins sharing
+their files through the blob store, token counting (cold and warm), tag extraction, streamed API calls and
+whole batch runs. Results can be saved as JSON and compared with an earlier
+run to catch regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes small,medium] [--repeat 3] [--json results.json]
+    python benchmarks/run_benchmarks.py --compare baseline.json [--tolerance 0.2]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import contextlib
+
+# Setup import path for local modules
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The clients send whatever key is set; the fake server accepts any
+os.environ.setdefault("DIFY_API_KEY", "benchmark")
+
+from synthetic_plugins import SIZES, generate_plugin
+from fake_dify_server import FakeDifyServer, build_answer
+from utils import token_counter
+from utils.blob_store import get_blob_store
+from utils.code_analyzer import generate_code_structure
+from utils.code_outline import generate_code_outline
+from utils.payload_packer import count_structure_tokens
+from utils.stream_extractor import StreamingTagExtractor
+from utils.api_handler import call_dify_api
+from utils.dify_client import DifyClient
+from utils.batch_runner import run_batch
+
+try:
+    # gitingest logs every ingestion through loguru
+    from loguru import logger
+    logger.disable("gitingest")
+except ImportError:
+    pass
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the pipeline's console output while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def best_of(repeat, function, setup=None):
+    """Return the best wall time of ``repeat`` runs of ``function``"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        with quiet():
+            function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def tree_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def bench_structure(work_dir, plugin_dirs, repeat):
+    """Time generate_code_structure, full and incremental with nothing changed"""
+    results = {}
+    for size, plugin_dir in plugin_dirs.items():
+        output_file = os.path.join(work_dir, f"{size}_structure.txt")
+        mb = tree_bytes(plugin_dir) / (1024 * 1024)
+        full = best_of(repeat, lambda: generate_code_structure(plugin_dir, output_file))
+        with quiet():
+            generate_code_structure(plugin_dir, output_file, incremental=True)
+        incremental = best_of(repeat, lambda: generate_code_structure(plugin_dir, output_file, incremental=True))
+        results[f"structure_full_{size}"] = (full, f"{mb / full:.1f} MB/s of plugin tree")
+        results[f"structure_incremental_{size}"] = (incremental, f"{full / incremental:.1f}x faster than full")
+    return results
+
+
+def clear_blob_store():
+    """Empty the blob store, in memory and on disk"""
+    store = get_blob_store()
+    store.clear_memory()
+    shutil.rmtree(store.directory, ignore_errors=True)
+
+
+def bench_outline(work_dir, plugin_dirs, repeat):
+    """Time generate_code_outline with an empty and a warm blob store"""
+    results = {}
+    for size, plugin_dir in plugin_dirs.items():
+        output_file = os.path.join(work_dir, f"{size}_outline.txt")
+        with quiet():
+            structure = generate_code_structure(plugin_dir, os.path.join(work_dir, f"{size}_full.txt"))
+            outline = generate_code_outline(plugin_dir, output_file)
+        cold = best_of(repeat, lambda: generate_code_outline(plugin_dir, output_file), setup=clear_blob_store)
+        warm = best_of(repeat, lambda: generate_code_outline(plugin_dir, output_file))
+        results[f"outline_cold_{size}"] = (cold, f"{len(structure) / len(outline):.1f}x smaller than the structure")
+        results[f"outline_warm_{size}"] = (warm, f"{cold / warm:.1f}x faster than cold")
+    return results
+
+
+def bench_blob_store(work_dir, plugin_dirs, repeat, copies=4):
+    """Time structure and token count of plugins sharing their files, with gitingest and the blob store
+
+    Each plugin is copied so the batch holds ``copies`` plugins with the same
+    files, like plugins vendoring the same helpers. ``warm`` is a later run:
+    the blob store is on disk but nothing is in memory.
+    """
+    results = {}
+    for size, plugin_dir in plugin_dirs.items():
+        batch = [plugin_dir]
+        for index in range(1, copies):
+            copy = os.path.join(work_dir, "shared", f"{size}_{index}", os.path.basename(plugin_dir))
+            if not os.path.isdir(copy):
+                shutil.copytree(plugin_dir, copy)
+            batch.append(copy)
+
+        def run(blob_store):
+            for index, path in enumerate(batch):
+                output_file = os.path.join(work_dir, f"{size}_shared_{index}_structure.txt")
+                count_structure_tokens(generate_code_structure(path, output_file, blob_store=blob_store))
+
+        def new_process():
+            token_counter._counts.clear()
+            get_blob_store().clear_memory()
+
+        gitingest = best_of(repeat, lambda: run(False), setup=token_counter._counts.clear)
+        cold = best_of(repeat, lambda: run(True), setup=lambda: (new_process(), clear_blob_store()))
+        warm = best_of(repeat, lambda: run(True), setup=new_process)
+        results[f"shared_gitingest_{size}"] = (gitingest, f"{copies} plugins with the same files")
+        results[f"shared_blob_cold_{size}"] = (cold, f"{gitingest / cold:.1f}x faster than gitingest")
+        results[f"shared_blob_warm_{size}"] = (warm, f"{gitingest / warm:.1f}x faster than gitingest")
+    return results
+
+
+def bench_tokens(work_dir, plugin_dirs, repeat):
+    """Time count_structure_tokens with an empty and a warm section cache"""
+    results = {}
+    for size, plugin_dir in plugin_dirs.items():
+        with quiet():
+            structure = generate_code_structure(plugin_dir, os.path.join(work_dir, f"{size}_tokens.txt"))
+        mb = len(structure) / (1024 * 1024)
+        cold = best_of(repeat, lambda: count_structure_tokens(structure), setup=token_counter._counts.clear)
+        warm = best_of(repeat, lambda: count_structure_tokens(structure))
+        results[f"tokens_cold_{size}"] = (cold, f"{mb / cold:.1f} MB/s")
+        results[f"tokens_warm_{size}"] = (warm, f"{cold / warm:.1f}x faster than cold")
+    return results
+
+
+def bench_extraction(answer_bytes, repeat):
+    """Time StreamingTagExtractor on an answer fed in small and large chunks"""
+    answer = build_answer("benchmark", answer_bytes)
+    mb = len(answer) / (1024 * 1024)
+    results = {}
+    for chunk_size in (8, 256):
+        chunks = [answer[start:start + chunk_size] for start in range(0, len(answer), chunk_size)]
+
+        def extract():
+            extractor = StreamingTagExtractor(save_docs=False)
+            for chunk in chunks:
+                extractor.feed(chunk)
+            assert extractor.finish()[2:] == (True, True)
+
+        elapsed = best_of(repeat, extract)
+        results[f"extraction_chunk_{chunk_size}"] = (elapsed, f"{mb / elapsed:.1f} MB/s, {len(chunks)} chunks")
+    return results
+
+
+def bench_stream(work_dir, server, requests_count, repeat, name="stream_requests"):
+    """Time sequential streamed call_dify_api requests against the fake server
+
+    With a server that drops streams, this includes resuming the truncated answers.
+    """
+    client = DifyClient(base_url=server.base_url, api_key="benchmark")
+    inputs = {"name": "benchmark", "code_files": "print('hello')\n" * 200}
+    answer_mb = len(build_answer("benchmark", server.options["answer_bytes"])) / (1024 * 1024)
+
+    def calls():
+        for _ in range(requests_count):
+            response, _ = call_dify_api(work_dir, {}, inputs, "Generate docs", save_docs=False, client=client)
+            assert response and response["readme_complete"] and response["privacy_complete"]
+
+    elapsed = best_of(repeat, calls)
+    client.close()
+    return {
+        name: (elapsed, f"{requests_count / elapsed:.1f} req/s, "
+                                     f"{requests_count * answer_mb / elapsed:.1f} MB/s of answer"),
+    }
+
+
+def bench_batch(work_dir, plugin_paths, concurrency):
+    """Time a whole batch of process_plugin runs (no response cache)"""
+    from assistant.readme_privacy_generator import process_plugin
+
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        start = time.perf_counter()
+        with quiet():
+            results = run_batch(
+                plugin_paths,
+                lambda plugin_path: process_plugin(plugin_path, non_interactive=True, use_cache=False),
+                concurrency
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(previous_dir)
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return {
+        "batch_end_to_end": (elapsed, f"{len(plugin_paths) / elapsed:.2f} plugins/s, "
+                                      f"{succeeded}/{len(plugin_paths)} succeeded"),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the change against a baseline and return the regressed benchmarks"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, (seconds, _) in results.items():
+        if name not in baseline:
+            continue
+        change = seconds / baseline[name]["seconds"] - 1
+        flag = "REGRESSION" if change > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<32} {change:+7.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite on a synthetic plugin corpus.')
+    parser.add_argument('--sizes', default='small,medium,large',
+                        help=f'Comma-separated plugin sizes from: {", ".join(SIZES)} (default: small,medium,large)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark; the best is reported (default: 3)')
+    parser.add_argument('--answer-bytes', type=int, default=8000, help='Size of the fake answers (default: 8000)')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Characters per fake SSE event (default: 16)')
+    parser.add_argument('--requests', type=int, default=20, help='Streamed requests per run (default: 20)')
+    parser.add_argument('--batch-plugins', type=int, default=8, help='Plugins in the end-to-end batch (default: 8)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Batch concurrency (default: 4)')
+    parser.add_argument('--json', metavar='FILE', help='Save the results as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with results saved by --json')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline before failing (default: 0.2)')
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        corpus_dir = os.path.join(temp_dir, "corpus")
+        work_dir = os.path.join(temp_dir, "work")
+        os.makedirs(work_dir)
+        os.environ["BLOB_STORE_DIR"] = os.path.join(work_dir, "blobs")
+        plugin_dirs = {size: generate_plugin(corpus_dir, f"bench_{size}", size) for size in sizes}
+        batch_paths = [generate_plugin(os.path.join(temp_dir, "batch"), f"batch_{index}", "small", seed=index)
+                       for index in range(args.batch_plugins)]
+
+        with FakeDifyServer(answer_bytes=args.answer_bytes, chunk_size=args.chunk_size) as server:
+            os.environ["DIFY_BASE_URL"] = server.base_url
+            results.update(bench_structure(work_dir, plugin_dirs, args.repeat))
+            results.update(bench_outline(work_dir, plugin_dirs, args.repeat))
+            results.update(bench_blob_store(work_dir, plugin_dirs, args.repeat))
+            results.update(bench_tokens(work_dir, plugin_dirs, args.repeat))
+            results.update(bench_extraction(args.answer_bytes, args.repeat))
+            results.update(bench_stream(work_dir, server, args.requests, args.repeat))
+            results.update(bench_batch(work_dir, batch_paths, args.concurrency))
+        with FakeDifyServer(answer_bytes=args.answer_bytes, chunk_size=args.chunk_size, drop_rate=0.25) as server:
+            os.environ["DIFY_BASE_URL"] = server.base_url
+            results.update(bench_stream(work_dir, server, args.requests, args.repeat, "stream_requests_with_drops"))
+
+    for name, (seconds, note) in results.items():
+        print(f"{name:<32} {seconds * 1000:10.1f} ms  {note}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                "timestamp": round(time.time(), 3),
+                "python": sys.version.split()[0],
+                "options": vars(args),
+                "results": {name: {"seconds": round(seconds, 6), "note": note}
+                            for name, (seconds, note) in results.items()},
+            }, f, indent=2)
+        print(f"\nResults saved to: {args.json}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Synthetic Dify plugin trees for benchmarks
+
+Generates plugins that look like real tool plugins (manifest, provider,
+tool YAML/Python pairs, tests) plus the noise the generator has to skip:
+binary assets, vendored minified JavaScript, source maps and lock files.
+
+Usage:
+    python benchmarks/synthetic_plugins.py OUTPUT_DIR [--size medium] [--count 1] [--seed 0]
+"""
+import os
+import sys
+import random
+import argparse
+
+# size -> (tools, helper modules, asset files, vendored JS bytes)
+SIZES = {
+    "small": (3, 2, 2, 0),
+    "medium": (20, 10, 10, 256 * 1024),
+    "large": (100, 40, 40, 2 * 1024 * 1024),
+    "huge": (400, 150, 120, 8 * 1024 * 1024),
+}
+
+WORDS = (
+    "search query result item record user account token request response page "
+    "document image file channel message task project status value option filter"
+).split()
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _write(path, content, mode="w"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if mode == "wb":
+        with open(path, "wb") as f:
+            f.write(content)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def _manifest(name, tool_names):
+    tools = "\n".join(f"#   - tools/{tool}.yaml" for tool in tool_names[:5])
+    return f"""version: 0.0.1
+type: plugin
+author: benchmark
+name: {name}
+label:
+  en_US: {name.replace('_', ' ').title()}
+description:
+  en_US: Synthetic plugin used by the benchmark suite
+icon: icon.svg
+resource:
+  memory: 268435456
+  permission:
+    tool:
+      enabled: true
+plugins:
+  tools:
+    - provider/{name}.yaml
+meta:
+  version: 0.0.1
+  arch:
+    - amd64
+  runner:
+    language: python
+    version: "3.12"
+    entrypoint: main
+# First tools, for reference:
+{tools}
+"""
+
+
+def _tool_yaml(rng, tool):
+    parameters = []
+    for index in range(rng.randint(1, 6)):
+        parameters.append(f"""  - name: param_{index}
+    type: {rng.choice(['string', 'number', 'boolean', 'select'])}
+    required: {rng.choice(['true', 'false'])}
+    label:
+      en_US: {_words(rng, 2).title()}
+    human_description:
+      en_US: {_words(rng, 12)}
+    llm_description: {_words(rng, 16)}
+    form: llm""")
+    return f"""identity:
+  name: {tool}
+  author: benchmark
+  label:
+    en_US: {tool.replace('_', ' ').title()}
+description:
+  human:
+    en_US: {_words(rng, 15)}
+  llm: {_words(rng, 25)}
+parameters:
+{chr(10).join(parameters)}
+extra:
+  python:
+    source: tools/{tool}.py
+"""
+
+
+def _tool_py(rng, tool):
+    class_name = "".join(part.title() for part in tool.split("_")) + "Tool"
+    helpers = []
+    for index in range(rng.randint(2, 8)):
+        helpers.append(f'''
+    def _step_{index}(self, payload: dict) -> dict:
+        """{_words(rng, 8).capitalize()}"""
+        values = [payload.get(key) for key in sorted(payload)]
+        if not values:
+            return {{}}
+        return {{"{rng.choice(WORDS)}": values, "count": len(values)}}
+''')
+    return f'''from collections.abc import Generator
+from typing import Any
+
+import requests
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+
+class {class_name}(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        api_key = self.runtime.credentials["api_key"]
+        response = requests.get(
+            "https://api.example.com/{tool}",
+            headers={{"Authorization": f"Bearer {{api_key}}"}},
+            params=tool_parameters,
+            timeout=30,
+        )
+        response.raise_for_status()
+        yield self.create_json_message(response.json())
+{"".join(helpers)}'''
+
+
+def _helper_py(rng, index):
+    functions = []
+    for function_index in range(rng.randint(3, 10)):
+        body = "\n".join(f"    {rng.choice(WORDS)}_{line} = value * {line}" for line in range(rng.randint(3, 15)))
+        functions.append(f'''
+def {rng.choice(WORDS)}_{function_index}(value):
+    """{_words(rng, 10).capitalize()}"""
+{body}
+    return value
+''')
+    return f'"""Helper module {index}"""\nimport json\nimport time\n' + "".join(functions)
+
+
+def generate_plugin(root, name, size="medium", seed=0):
+    """Write one synthetic plugin and return its directory
+
+    Args:
+        root (str): Parent directory
+        name (str): Plugin name (also the directory name)
+        size (str): One of ``SIZES``
+        seed (int): Random seed, so the same arguments give the same tree
+
+    Returns:
+        str: Path of the plugin directory
+    """
+    rng = random.Random(f"{name}-{size}-{seed}")
+    tool_count, helper_count, asset_count, vendored_bytes = SIZES[size]
+    plugin_dir = os.path.join(root, name)
+    tool_names = [f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{index}" for index in range(tool_count)]
+
+    _write(os.path.join(plugin_dir, "manifest.yaml"), _manifest(name, tool_names))
+    _write(os.path.join(plugin_dir, "main.py"),
+           "from dify_plugin import Plugin, DifyPluginEnv\n\nplugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=120))\n\n"
+           "if __name__ == '__main__':\n    plugin.run()\n")
+    _write(os.path.join(plugin_dir, "requirements.txt"), "dify_plugin>=0.2.0\nrequests>=2.31\n")
+    _write(os.path.join(plugin_dir, ".gitignore"), "__pycache__/\n*.pyc\n.env\n")
+    _write(os.path.join(plugin_dir, "provider", f"{name}.yaml"),
+           f"identity:\n  name: {name}\n  author: benchmark\ncredentials_for_provider:\n  api_key:\n"
+           f"    type: secret-input\n    required: true\ntools:\n"
+           + "".join(f"  - tools/{tool}.yaml\n" for tool in tool_names)
+           + f"extra:\n  python:\n    source: provider/{name}.py\n")
+    _write(os.path.join(plugin_dir, "provider", f"{name}.py"),
+           "from dify_plugin import ToolProvider\n\n\nclass Provider(ToolProvider):\n"
+           "    def _validate_credentials(self, credentials):\n        if not credentials.get('api_key'):\n"
+           "            raise ValueError('api_key is required')\n")
+
+    for tool in tool_names:
+        _write(os.path.join(plugin_dir, "tools", f"{tool}.yaml"), _tool_yaml(rng, tool))
+        _write(os.path.join(plugin_dir, "tools", f"{tool}.py"), _tool_py(rng, tool))
+
+    for index in range(helper_count):
+        _write(os.path.join(plugin_dir, "utils", f"helper_{index}.py"), _helper_py(rng, index))
+        if index % 3 == 0:
+            _write(os.path.join(plugin_dir, "tests", f"test_helper_{index}.py"),
+                   f"from utils.helper_{index} import *\n\n\ndef test_import():\n    assert True\n")
+
+    # Noise that must be excluded before it reaches the prompt
+    _write(os.path.join(plugin_dir, "_assets", "icon.svg"),
+           '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><path d="M0 0h24v24H0z"/></svg>\n')
+    for index in range(asset_count):
+        _write(os.path.join(plugin_dir, "_assets", f"screenshot_{index}.png"),
+               b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randint(2048, 65536)), mode="wb")
+    if vendored_bytes:
+        line = "function(a,b){return a.map(function(c){return c*b})}," * 4 + "\n"
+        vendored = "!function(){var e=[" + line * (vendored_bytes // len(line)) + "]}();\n"
+        _write(os.path.join(plugin_dir, "static", "vendor", "bundle.min.js"), vendored)
+        _write(os.path.join(plugin_dir, "static", "vendor", "bundle.min.js.map"),
+               '{"version":3,"mappings":"' + "A" * (vendored_bytes // 4) + '"}')
+        _write(os.path.join(plugin_dir, "static", "yarn.lock"), "dependency@^1.0.0:\n  version 1.0.0\n" * 1000)
+
+    return plugin_dir
+
+
+def generate_corpus(root, sizes=("small", "medium", "large"), count=1, seed=0):
+    """Write ``count`` plugins of each size and return their directories"""
+    plugin_dirs = []
+    for size in sizes:
+        for index in range(count):
+            plugin_dirs.append(generate_plugin(root, f"bench_{size}_{index}", size, seed))
+    return plugin_dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Dify plugins for benchmarks.')
+    parser.add_argument('output', help='Directory to write the plugins into')
+    parser.add_argument('--size', choices=sorted(SIZES), action='append',
+                        help='Plugin size; repeat for several sizes (default: small, medium and large)')
+    parser.add_argument('--count', type=int, default=1, help='Plugins per size (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    plugin_dirs = generate_corpus(args.output, args.size or ("small", "medium", "large"), args.count, args.seed)
+    for plugin_dir in plugin_dirs:
+        print(plugin_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
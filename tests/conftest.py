@@ -0,0 +1,40 @@
+"""
+Shared fixtures: the fake Dify server and an isolated working directory
+"""
+import os
+import sys
+
+import pytest
+
+# Setup import path for local modules, like the assistant and benchmark scripts
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "benchmarks"))
+
+# The clients send whatever key is set; the fake server accepts any
+os.environ.setdefault("DIFY_API_KEY", "test")
+
+from fake_dify_server import FakeDifyServer
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, so plugins/ and .cache/ are not shared between tests"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("BLOB_STORE_DIR", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_server():
+    """Start a fake Dify server with the given options; stopped after the test"""
+    servers = []
+
+    def start(**options):
+        server = FakeDifyServer(answer_bytes=2000, chunk_size=64, **options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,38 @@
+from utils.api_handler import RESUMED_CODE, call_dify_api
+from utils.dify_client import DifyClient
+from utils.rate_limiter import estimate_request_tokens
+from utils.retry_policy import RetryPolicy
+
+INPUTS = {"name": "demo", "code_files": "def handler():\n    return 1\n" * 500}
+QUERY = "Generate README.md and PRIVACY.md for this Dify plugin"
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, tokens):
+        self.acquired.append(tokens)
+
+
+def test_resume_sends_neither_the_code_nor_its_tokens_again(workdir, fake_server, monkeypatch):
+    server = fake_server()
+    outcomes = ["dropped"]
+    draw = server._draw
+    monkeypatch.setattr(server, "_draw", lambda: outcomes.pop(0) if outcomes else draw())
+    limiter = RecordingLimiter()
+
+    api_response, error_details = call_dify_api(
+        str(workdir), {}, INPUTS, QUERY, save_docs=False, max_resumes=1, retry_policy=RetryPolicy(),
+        rate_limiter=limiter, client=DifyClient(base_url=server.base_url, pool_size=1)
+    )
+    assert error_details == ""
+    assert api_response["readme_complete"] and api_response["privacy_complete"]
+
+    first, resume = server.received
+    assert first["inputs"] == INPUTS and first["conversation_id"] is None
+    assert resume["conversation_id"]
+    assert resume["inputs"] == dict(INPUTS, code_files=RESUMED_CODE)
+    assert limiter.acquired == [estimate_request_tokens(INPUTS, QUERY),
+                                estimate_request_tokens(resume["inputs"], resume["query"])]
+    assert limiter.acquired[1] < limiter.acquired[0]
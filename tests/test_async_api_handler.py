@@ -0,0 +1,111 @@
+import time
+import asyncio
+
+from utils.async_api_handler import AsyncDifyClient
+from utils.retry_policy import RetryPolicy
+
+INPUTS = {"name": "demo", "code_files": "print('hi')"}
+QUERY = "Generate README.md and PRIVACY.md for this Dify plugin"
+
+
+def policy(max_retries=0):
+    # No shared circuit breaker, so tests don't affect each other
+    return RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=0.05, deadline=10)
+
+
+def call(server, plugin_dir, calls=1, pool_size=4, max_retries=0, max_resumes=0):
+    async def run():
+        async with AsyncDifyClient(base_url=server.base_url, api_key="test", pool_size=pool_size) as client:
+            session = client.session
+            results = await asyncio.gather(*(
+                client.call_dify_api(plugin_dir, {"name": "demo"}, INPUTS, QUERY, save_docs=False,
+                                     max_resumes=max_resumes, retry_policy=policy(max_retries))
+                for _ in range(calls)
+            ))
+            assert client.session is session
+            return results
+
+    return asyncio.run(run())
+
+
+def test_full_stream(workdir, fake_server):
+    server = fake_server()
+    [(api_response, error_details)] = call(server, str(workdir))
+    assert error_details == ""
+    assert api_response["readme_complete"] and api_response["privacy_complete"]
+    assert api_response["readme_content"].startswith("# demo")
+    assert "</privacy_policy>" in api_response["answer"]
+
+
+def test_dropped_stream_returns_the_partial_answer(workdir, fake_server):
+    server = fake_server(drop_rate=1.0)
+    [(api_response, error_details)] = call(server, str(workdir))
+    assert error_details
+    assert api_response is not None
+    assert api_response["answer"]
+    assert not api_response["privacy_complete"]
+
+
+def test_dropped_stream_is_resumed(workdir, fake_server, monkeypatch):
+    # Only the first stream is cut off; the follow-up request completes the answer
+    server = fake_server()
+    outcomes = ["dropped"]
+    draw = server._draw
+    monkeypatch.setattr(server, "_draw", lambda: outcomes.pop(0) if outcomes else draw())
+
+    [(api_response, error_details)] = call(server, str(workdir), max_resumes=1)
+    assert error_details == ""
+    assert api_response["readme_complete"] and api_response["privacy_complete"]
+    assert not outcomes
+    first, resume = server.received
+    assert resume["conversation_id"] and resume["inputs"]["code_files"] != first["inputs"]["code_files"]
+
+
+def test_fatal_status_is_not_retried(workdir, fake_server):
+    server = fake_server(statuses=[401])
+    [(api_response, error_details)] = call(server, str(workdir), max_retries=2)
+    assert api_response is None
+    assert "401" in error_details
+    assert server.stats["requests"] == 1
+
+
+def test_server_error_is_retried(workdir, fake_server):
+    server = fake_server(statuses=[500, 429])
+    [(api_response, error_details)] = call(server, str(workdir), max_retries=2)
+    assert error_details == ""
+    assert api_response["readme_complete"] and api_response["privacy_complete"]
+    assert server.stats["requests"] == 3
+
+
+def test_concurrent_calls_share_one_connection_pool(workdir, fake_server):
+    server = fake_server(latency=0.05)
+    results = call(server, str(workdir), calls=12, pool_size=3)
+    assert all(error_details == "" and api_response["readme_complete"] for api_response, error_details in results)
+    assert server.stats["requests"] == 12
+    # Kept-alive connections are reused instead of opening one per call
+    assert server.stats["connections"] <= 3
+
+
+def test_stream_may_outlast_the_request_timeout(workdir, fake_server, monkeypatch):
+    # Each chunk arrives well within the timeout, the whole stream takes several times longer
+    monkeypatch.setattr("utils.async_api_handler.REQUEST_TIMEOUT", 0.5)
+    server = fake_server(chunk_delay=0.05)
+    [(api_response, error_details)] = call(server, str(workdir))
+    assert error_details == ""
+    assert api_response["readme_complete"] and api_response["privacy_complete"]
+
+
+def test_deadline_bounds_a_stream_in_progress(workdir, fake_server):
+    server = fake_server(chunk_delay=0.05)
+
+    async def run():
+        async with AsyncDifyClient(base_url=server.base_url, api_key="test", pool_size=2) as client:
+            policy = RetryPolicy(max_retries=2, base_delay=0.01, deadline=0.5)
+            return await client.call_dify_api(str(workdir), {"name": "demo"}, INPUTS, QUERY, save_docs=False,
+                                              max_resumes=2, retry_policy=policy)
+
+    started = time.monotonic()
+    api_response, error_details = asyncio.run(run())
+    assert time.monotonic() - started < 1.0
+    assert not (api_response and api_response["privacy_complete"])
+    assert server.stats["requests"] == 1
@@ -0,0 +1,43 @@
+import os
+
+from utils.batch_runner import discover_plugin_paths, run_batch_async
+from utils.watcher import is_relevant_change
+
+
+def touch(path, content=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_plugins_directory_of_a_monorepo_is_scanned(tmp_path):
+    touch(str(tmp_path / "plugins" / "foo" / "manifest.yaml"), "name: foo\n")
+    touch(str(tmp_path / "tools" / "bar" / "manifest.yaml"), "name: bar\n")
+    touch(str(tmp_path / "node_modules" / "baz" / "manifest.yaml"), "name: baz\n")
+    assert discover_plugin_paths(str(tmp_path)) == [
+        str(tmp_path / "plugins" / "foo"), str(tmp_path / "tools" / "bar")
+    ]
+
+
+def test_edits_under_plugins_directory_are_watched(tmp_path):
+    plugin_path = str(tmp_path / "foo")
+    assert is_relevant_change(plugin_path, os.path.join(plugin_path, "plugins", "provider.py"))
+    assert not is_relevant_change(plugin_path, os.path.join(plugin_path, "node_modules", "x.py"))
+
+
+def test_split_streams_overlap_at_batch_concurrency(workdir, fake_server, monkeypatch):
+    server = fake_server(chunk_delay=0.01)
+    monkeypatch.setenv("DIFY_BASE_URL", server.base_url)
+    monkeypatch.delenv("DIFY_POOL_SIZE", raising=False)
+
+    def prepare(plugin_path):
+        job = {"plugin_dir": str(workdir), "manifest_info": {"name": "demo"}, "inputs": {"name": "demo"},
+               "query": "Generate the docs", "split_documents": True}
+        return {"status": "prepared"}, job
+
+    def finalize(result, job, api_response, error_details):
+        return {"status": "success" if not error_details else "failed", "error": error_details}
+
+    [result] = run_batch_async(["demo"], prepare, finalize, concurrency=1, streams_per_plugin=2)
+    assert result["status"] == "success", result["error"]
+    assert server.stats["peak_streams"] == 2
@@ -0,0 +1,50 @@
+import os
+import json
+
+from synthetic_plugins import generate_plugin
+from utils.code_analyzer import generate_code_structure
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_incremental_update_matches_a_full_run(workdir):
+    plugin_path = generate_plugin(str(workdir / "corpus"), "incremental", "small")
+    output_file = str(workdir / "incremental_structure.txt")
+    generate_code_structure(plugin_path, output_file, incremental=True)
+
+    # A file gitingest ignores by default, a new source file and a changed one
+    write(os.path.join(plugin_path, "package-lock.json"), json.dumps({"lockfileVersion": 3}))
+    write(os.path.join(plugin_path, "tools", "added.py"), "def added():\n    return 1\n")
+    with open(os.path.join(plugin_path, "main.py"), "a", encoding="utf-8") as f:
+        f.write("\n# changed\n")
+
+    updated = generate_code_structure(plugin_path, output_file, incremental=True)
+    full = generate_code_structure(plugin_path, str(workdir / "full_structure.txt"))
+    assert "FILE: package-lock.json" not in updated
+    assert "FILE: tools/added.py" in updated
+    assert updated == full
+    with open(output_file, encoding="utf-8") as f:
+        assert f.read() == full
+
+    # The ignored file stays out of later runs too
+    assert generate_code_structure(plugin_path, output_file, incremental=True) == full
+
+
+def test_negated_ignore_rules_apply_to_full_and_blob_runs(workdir):
+    plugin_path = generate_plugin(str(workdir / "corpus"), "negation", "small")
+    # gitingest never reads .difyignore; only the filter's own result can keep keep.txt
+    write(os.path.join(plugin_path, ".difyignore"), "*.txt\n!keep.txt\nbuild/\n")
+    write(os.path.join(plugin_path, "keep.txt"), "kept\n")
+    write(os.path.join(plugin_path, "drop.txt"), "dropped\n")
+    write(os.path.join(plugin_path, "build", "out.py"), "built = 1\n")
+
+    full = generate_code_structure(plugin_path, str(workdir / "full_structure.txt"))
+    blob = generate_code_structure(plugin_path, str(workdir / "blob_structure.txt"), blob_store=True)
+    assert "FILE: keep.txt" in full
+    assert "FILE: drop.txt" not in full
+    assert "FILE: build/out.py" not in full
+    assert blob == full
@@ -0,0 +1,35 @@
+import pytest
+
+from utils import dify_client
+from utils.dify_client import get_dify_client, pool_size_for
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    monkeypatch.delenv("DIFY_POOL_SIZE", raising=False)
+    monkeypatch.setattr(dify_client, "_clients", {})
+
+
+def pool_maxsize(client):
+    return client.session.get_adapter(client.base_url)._pool_maxsize
+
+
+def test_pool_is_sized_from_concurrency_and_streams(clients):
+    assert pool_size_for(8) == 8
+    assert pool_size_for(8, streams_per_plugin=2) == 16
+    client = get_dify_client(pool_size_for(8, streams_per_plugin=2))
+    assert pool_maxsize(client) == 16
+
+
+def test_shared_client_grows_but_never_shrinks(clients):
+    small = get_dify_client()
+    assert get_dify_client() is small
+    large = get_dify_client(small.pool_size + 6)
+    assert large is not small and pool_maxsize(large) == small.pool_size + 6
+    assert get_dify_client(1) is large
+
+
+def test_pool_size_env_overrides(clients, monkeypatch):
+    monkeypatch.setenv("DIFY_POOL_SIZE", "3")
+    assert pool_size_for(8, streams_per_plugin=2) == 3
+    assert pool_maxsize(get_dify_client(pool_size_for(8, streams_per_plugin=2))) == 3
@@ -0,0 +1,37 @@
+import os
+import sys
+
+from synthetic_plugins import generate_plugin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assistant"))
+from readme_privacy_generator import process_plugin
+
+
+def generate_then_change(workdir, fake_server, monkeypatch, added_lines):
+    server = fake_server()
+    monkeypatch.setenv("DIFY_BASE_URL", server.base_url)
+    plugin_path = generate_plugin(str(workdir / "corpus"), "updated", "small")
+    assert process_plugin(plugin_path, non_interactive=True, use_cache=False)["status"] == "success"
+    with open(os.path.join(plugin_path, "main.py"), "a", encoding="utf-8") as f:
+        f.writelines(f"SETTING_{index} = {index}  # a changed line of the plugin\n" for index in range(added_lines))
+    return plugin_path
+
+
+def test_update_sends_only_the_changes(workdir, fake_server, monkeypatch):
+    plugin_path = generate_then_change(workdir, fake_server, monkeypatch, added_lines=2)
+    result = process_plugin(plugin_path, non_interactive=True, use_cache=False, update=True)
+    values = result["metrics"].to_dict()["values"]
+    assert result["status"] == "success"
+    assert values["update_tokens"] < values["structure_tokens"] / 10
+    assert result["tokens"] == values["update_tokens"]
+
+
+def test_update_above_the_token_limit_is_packed_from_scratch(workdir, fake_server, monkeypatch):
+    plugin_path = generate_then_change(workdir, fake_server, monkeypatch, added_lines=600)
+    monkeypatch.setenv("TOKEN_LIMIT", "2000")
+    result = process_plugin(plugin_path, non_interactive=True, use_cache=False, update=True)
+    values = result["metrics"].to_dict()["values"]
+    assert result["status"] == "success"
+    assert values["update_tokens"] > 2000
+    assert values["packed_tokens"] <= 2000
+    assert result["tokens"] == values["packed_tokens"]
@@ -0,0 +1,42 @@
+import os
+import stat
+
+import pytest
+
+from utils.file_operations import write_if_changed
+
+
+@pytest.fixture
+def umask_027():
+    previous = os.umask(0o027)
+    yield
+    os.umask(previous)
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_the_umask_default_mode(tmp_path, umask_027):
+    path = tmp_path / "README.md"
+    assert write_if_changed(str(path), "# Demo\n")
+    assert path.read_text(encoding="utf-8") == "# Demo\n"
+    assert mode(path) == 0o640
+
+
+def test_existing_file_keeps_its_mode(tmp_path, umask_027):
+    path = tmp_path / "PRIVACY.md"
+    path.write_text("old\n", encoding="utf-8")
+    os.chmod(path, 0o600)
+    assert write_if_changed(str(path), "new\n")
+    assert path.read_text(encoding="utf-8") == "new\n"
+    assert mode(path) == 0o600
+
+
+def test_unchanged_file_is_not_rewritten(tmp_path):
+    path = tmp_path / "README.md"
+    write_if_changed(str(path), "# Demo\n")
+    before = os.stat(path).st_mtime_ns
+    assert not write_if_changed(str(path), "# Demo\n")
+    assert os.stat(path).st_mtime_ns == before
+    assert os.listdir(tmp_path) == ["README.md"]
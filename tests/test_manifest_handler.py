@@ -0,0 +1,13 @@
+from synthetic_plugins import generate_plugin
+from utils.manifest_handler import extract_manifest_info
+
+
+def test_indexed_files_are_kept_apart_from_the_categories(tmp_path):
+    plugin_path = generate_plugin(str(tmp_path), "indexed", "small")
+    info = extract_manifest_info(plugin_path)
+
+    assert info["plugins"]
+    for category, providers in info["plugins"].items():
+        assert isinstance(providers, list) and all(isinstance(provider, dict) for provider in providers), category
+    assert "provider/indexed.yaml" in info["plugin_files"]
+    assert info["plugin_files"] == sorted(info["plugin_files"])
@@ -0,0 +1,18 @@
+from synthetic_plugins import generate_plugin
+from utils.code_analyzer import generate_code_structure, split_structure
+from utils.payload_packer import pack_code_structure
+
+
+def test_packed_structure_never_exceeds_the_budget(workdir):
+    plugin_path = generate_plugin(str(workdir / "corpus"), "packed", "medium")
+    structure = generate_code_structure(plugin_path, str(workdir / "packed_structure.txt"))
+    tree, _ = split_structure(structure)
+
+    # Characters as tokens: every part of the payload adds up exactly
+    omitted_any = False
+    for budget in range(len(tree) + 200, len(structure) + 200, 97):
+        packed, report = pack_code_structure(structure, budget, count=len)
+        assert len(packed) <= budget, budget
+        assert report["tokens"] == len(packed)
+        omitted_any = omitted_any or bool(report["omitted"])
+    assert omitted_any
@@ -0,0 +1,42 @@
+import os
+import sys
+
+from synthetic_plugins import generate_plugin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assistant"))
+from readme_privacy_generator import process_plugin
+
+
+def test_second_run_on_unchanged_plugin_is_a_cache_hit(workdir, fake_server, monkeypatch):
+    server = fake_server()
+    monkeypatch.setenv("DIFY_BASE_URL", server.base_url)
+    plugin_path = generate_plugin(str(workdir / "corpus"), "cached", "small")
+
+    first = process_plugin(plugin_path, non_interactive=True)
+    assert first["status"] == "success"
+    # The generated documents are now in the plugin source, but must not change the request
+    assert os.path.isfile(os.path.join(plugin_path, "README.md"))
+    assert server.stats["requests"] == 1
+
+    second = process_plugin(plugin_path, non_interactive=True)
+    assert second["status"] == "success"
+    assert server.stats["requests"] == 1
+    assert second["metrics"].to_dict()["values"]["cache_hit"] == 1
+
+
+def test_generated_documents_are_not_analyzed(workdir):
+    from utils.code_analyzer import generate_code_structure
+
+    plugin_path = generate_plugin(str(workdir / "corpus"), "docs", "small")
+    for filename in ("README.md", "PRIVACY.md", "README_zh_Hans.md"):
+        with open(os.path.join(plugin_path, filename), "w", encoding="utf-8") as f:
+            f.write("# Generated\n")
+    os.makedirs(os.path.join(plugin_path, "docs"), exist_ok=True)
+    with open(os.path.join(plugin_path, "docs", "README.md"), "w", encoding="utf-8") as f:
+        f.write("# Nested docs are source\n")
+
+    structure = generate_code_structure(plugin_path, str(workdir / "structure.txt"))
+    assert "FILE: README.md" not in structure
+    assert "FILE: PRIVACY.md" not in structure
+    assert "FILE: README_zh_Hans.md" not in structure
+    assert "FILE: docs/README.md" in structure
@@ -0,0 +1,75 @@
+import time
+import threading
+
+from utils.api_handler import call_dify_api
+from utils.dify_client import DifyClient
+from utils.retry_policy import CircuitBreaker, RetryPolicy
+
+INPUTS = {"name": "demo", "code_files": "print('hi')"}
+QUERY = "Generate README.md and PRIVACY.md for this Dify plugin"
+
+
+def half_open_breaker(reset_timeout=0.2):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    time.sleep(reset_timeout + 0.05)
+    return breaker
+
+
+def test_fatal_probe_releases_the_half_open_circuit(workdir, fake_server):
+    # The probe is answered 401 after 0.3s; a caller arriving meanwhile must still get through
+    server = fake_server(statuses=[401], latency=0.3)
+    client = DifyClient(base_url=server.base_url, pool_size=2)
+    breaker = half_open_breaker()
+    results = {}
+
+    def call(key):
+        policy = RetryPolicy(max_retries=0, deadline=5, circuit_breaker=breaker)
+        results[key] = call_dify_api(str(workdir), {}, INPUTS, QUERY, save_docs=False, max_resumes=0,
+                                     retry_policy=policy, client=client)
+
+    probe = threading.Thread(target=call, args=("probe",))
+    probe.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    call("waiting")
+    probe.join()
+
+    assert results["probe"][0] is None
+    assert results["waiting"][0] is not None
+    assert results["waiting"][0]["readme_complete"]
+    assert time.monotonic() - started < 3
+    assert breaker.opened_at is None and not breaker.probing
+
+
+def test_release_probe_lets_the_next_request_probe():
+    breaker = half_open_breaker(reset_timeout=0.05)
+    assert breaker.before_request() == 0.0
+    assert breaker.before_request() > 0
+    breaker.release_probe()
+    assert breaker.before_request() == 0.0
+
+
+def test_deadline_bounds_a_stream_in_progress(workdir, fake_server):
+    # About 30 chunks 0.05s apart; the deadline passes a third of the way through
+    server = fake_server(chunk_delay=0.05)
+    client = DifyClient(base_url=server.base_url, pool_size=2)
+    policy = RetryPolicy(max_retries=2, base_delay=0.01, deadline=0.5)
+    started = time.monotonic()
+    api_response, error_details = call_dify_api(str(workdir), {}, INPUTS, QUERY, save_docs=False, max_resumes=2,
+                                                retry_policy=policy, client=client)
+    assert time.monotonic() - started < 1.0
+    assert "Deadline reached" in error_details
+    assert not (api_response and api_response["privacy_complete"])
+    assert server.stats["requests"] == 1
+
+
+def test_calls_sharing_a_spent_deadline_send_nothing(workdir, fake_server):
+    server = fake_server()
+    client = DifyClient(base_url=server.base_url, pool_size=2)
+    api_response, error_details = call_dify_api(str(workdir), {}, INPUTS, QUERY, save_docs=False, client=client,
+                                                retry_policy=RetryPolicy(deadline=60), split_documents=True,
+                                                deadline=time.monotonic() - 1)
+    assert api_response is None
+    assert "Deadline reached" in error_details
+    assert server.stats["requests"] == 0
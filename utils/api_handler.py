@@ -2,10 +2,16 @@
 API handling utilities for Dify
 """
 import os
-import requests
 import json
 import time
-from utils.formatting import print_error, print_info, print_success, print_warning, print_progress
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.formatting import print_error, print_info, print_success, print_warning, print_progress, get_logger
+from utils.stream_extractor import StreamingTagExtractor, DOCUMENTS
+from utils.retry_policy import RetryPolicy, parse_retry_after, time_left, check_deadline
+from utils.rate_limiter import get_rate_limiter, estimate_request_tokens
+from utils.dify_client import get_dify_client, REQUEST_TIMEOUT
+from utils.metrics import timed, count, record_duration, set_value
 
 def extract_content_from_response(full_response, plugin_dir=None, save_docs=True):
     """
@@ -19,60 +25,164 @@ def extract_content_from_response(full_response, plugin_dir=None, save_docs=True
     Returns:
         tuple: (readme_content, privacy_content, readme_complete, privacy_complete)
     """
-    # 保存完整响应但不输出日志
-    if plugin_dir:
-        full_response_path = os.path.join(plugin_dir, "full_response.txt")
-        try:
-            with open(full_response_path, "w") as f:
-                f.write(full_response)
-        except Exception as e:
-            pass  # 忽略保存错误
-    
-    # Initialize variables
-    readme_content = ""
-    privacy_content = ""
-    readme_complete = False
-    privacy_complete = False
-    
-    # Extract README content
-    readme_start = full_response.lower().find("<readme>")
-    if readme_start != -1:
-        readme_start += len("<readme>")
-        readme_end = full_response.lower().find("</readme>", readme_start)
-        if readme_end != -1:
-            readme_content = full_response[readme_start:readme_end].strip()
-            readme_complete = True
-        else:
-            # Try to get partial content if no end tag
-            readme_content = full_response[readme_start:].strip()
-    
-    # Extract PRIVACY content
-    privacy_start = full_response.lower().find("<privacy_policy>")
-    if privacy_start != -1:
-        privacy_start += len("<privacy_policy>")
-        privacy_end = full_response.lower().find("</privacy_policy>", privacy_start)
-        if privacy_end != -1:
-            privacy_content = full_response[privacy_start:privacy_end].strip()
-            privacy_complete = True
+    extractor = StreamingTagExtractor(plugin_dir, save_docs)
+    extractor.feed(full_response)
+    return extractor.finish()
+
+
+def build_request_data(inputs, query, conversation_id=None):
+    """Build the JSON body for a streaming chat-messages request
+
+    Args:
+        inputs (dict): App inputs
+        query (str): User query
+        conversation_id (str): Continue an existing conversation instead of starting one
+    """
+    return {
+        "inputs": inputs,
+        "query": query,
+        "response_mode": "streaming",  # Changed from blocking to streaming
+        "conversation_id": conversation_id,
+        "user": "readme-generator"
+    }
+
+
+# Sent instead of the code structure when resuming; the conversation already holds it
+RESUMED_CODE = "(Code structure omitted: it was sent earlier in this conversation.)"
+
+
+def build_resume_inputs(inputs):
+    """Return the inputs of a follow-up request, without resending the code structure"""
+    if "code_files" not in inputs:
+        return inputs
+    return dict(inputs, code_files=RESUMED_CODE)
+
+
+def build_resume_query(missing_documents):
+    """Build the follow-up query asking the model to finish a truncated answer
+
+    Args:
+        missing_documents (list): (label, opening tag, closing tag) of the
+            documents that did not arrive complete
+
+    Returns:
+        str: Query for the same conversation
+    """
+    wanted = " and ".join(
+        f"the complete {label} document wrapped in {open_tag} and {close_tag} tags"
+        for label, open_tag, close_tag in missing_documents
+    )
+    return (
+        "Your previous response was cut off. Continue from the last complete section: "
+        f"output only {wanted}, following the same instructions and format as before. "
+        "Do not repeat documents that were already complete."
+    )
+
+
+def build_document_query(document):
+    """Build the query asking for a single document in split mode
+
+    Args:
+        document (str): Key from ``DOCUMENTS`` ("readme" or "privacy")
+
+    Returns:
+        str: Query for a new conversation
+    """
+    _, filename, _, open_tag, close_tag = next(entry for entry in DOCUMENTS if entry[0] == document)
+    others = " or ".join(entry[1] for entry in DOCUMENTS if entry[0] != document)
+    return (
+        f"Generate only {filename} for this Dify plugin, wrapped in {open_tag} and {close_tag} tags. "
+        f"Do not write {others}."
+    )
+
+
+def merge_split_responses(responses):
+    """Merge the per-document results of a split generation
+
+    Args:
+        responses (dict): Document key -> (api_response, error_details)
+
+    Returns:
+        tuple: (api_response, error_details) in the shape of a single call's
+        result; api_response is None if no document call returned a response
+    """
+    merged = {"answer": "", "readme_content": "", "privacy_content": "",
+              "readme_complete": False, "privacy_complete": False}
+    answers = []
+    errors = []
+    for key, _, label, _, _ in DOCUMENTS:
+        api_response, error_details = responses.get(key, (None, ""))
+        if error_details:
+            errors.append(f"{label}: {error_details}")
+        if not api_response:
+            continue
+        answers.append(api_response["answer"].strip())
+        merged[f"{key}_content"] = api_response[f"{key}_content"]
+        merged[f"{key}_complete"] = api_response[f"{key}_complete"]
+
+    if not answers:
+        return None, "\n".join(errors)
+    # Both tagged documents in one answer, so a cached replay extracts them the usual way
+    merged["answer"] = "\n\n".join(answers)
+    return merged, "\n".join(errors)
+
+
+def get_max_resumes():
+    """Return how many follow-up requests may be sent to finish a truncated answer"""
+    return int(os.getenv("MAX_RESUMES", "1"))
+
+
+def parse_sse_line(line_text):
+    """Parse one line of the SSE stream
+
+    Args:
+        line_text (str): Decoded line without the trailing newline
+
+    Returns:
+        dict: Parsed event data, or None for non-data lines (keep-alives, comments)
+
+    Raises:
+        json.JSONDecodeError: If the data line does not contain valid JSON
+    """
+    # Handle SSE format - lines start with 'data: '
+    if not line_text.startswith('data: '):
+        return None
+    return json.loads(line_text[6:])  # Skip 'data: '
+
+
+def build_api_response(answer, plugin_dir, save_docs=True, extractor=None):
+    """Extract documentation from a collected answer and build the response object
+
+    Args:
+        answer (str): Concatenated answer chunks from the stream
+        plugin_dir (str): Directory to save extracted files
+        save_docs (bool): Whether to save extracted content to files
+        extractor (StreamingTagExtractor): Extractor that was fed the stream; its
+            state is reused instead of scanning the answer again
+
+    Returns:
+        dict: API response with the answer and extracted README/PRIVACY content
+    """
+    with timed("extraction"):
+        if extractor is not None:
+            readme_content, privacy_content, readme_complete, privacy_complete = extractor.finish()
         else:
-            # Try to get partial content if no end tag
-            privacy_content = full_response[privacy_start:].strip()
-    
-    # Save extracted content to files if requested
-    if save_docs and plugin_dir:
-        from utils.file_operations import save_documentation_file
-        
-        # 简化文件保存日志
-        if readme_content:
-            save_documentation_file(plugin_dir, "README.md", readme_content, "README")
-        
-        if privacy_content:
-            save_documentation_file(plugin_dir, "PRIVACY.md", privacy_content, "PRIVACY")
-    
-    return readme_content, privacy_content, readme_complete, privacy_complete
+            readme_content, privacy_content, readme_complete, privacy_complete = extract_content_from_response(
+                answer, plugin_dir, save_docs
+            )
+    set_value("answer_chars", len(answer))
+    return {
+        "answer": answer,
+        "readme_content": readme_content,
+        "privacy_content": privacy_content,
+        "readme_complete": readme_complete,
+        "privacy_complete": privacy_complete
+    }
 
 
-def call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries=0, save_docs=True):
+def call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries=0, save_docs=True, max_resumes=None,
+                  retry_policy=None, rate_limiter=None, client=None, split_documents=False, documents=None,
+                  locale=None, deadline=None):
     """Call Dify API with extracted information
     
     Args:
@@ -81,130 +191,110 @@ def call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries=0, save_
         inputs: Dictionary of inputs for the API call
         query: Query string for the API call
         max_retries: Maximum number of retries for API call
+        max_resumes: Maximum number of follow-up requests in the same conversation
+            to finish a truncated answer (default: ``MAX_RESUMES``)
+        retry_policy: RetryPolicy deciding which failures are retried and how long
+            to wait (default: built from the environment with ``max_retries``)
+        rate_limiter: RateLimiter admitting requests within the RPM/TPM budget
+            (default: the shared limiter configured by ``RATE_LIMIT_*``, if any)
+        client: DifyClient whose pooled session sends the requests (default: the
+            shared client configured by ``DIFY_*``)
+        split_documents: Generate README and PRIVACY with two concurrent requests,
+            each retried and resumed on its own, and merge the results
+        documents: Keys of the documents this request asks for (default: all)
+        locale: Save the documents as translations for this locale (README_<locale>.md)
+        deadline: Monotonic time by which the call, its resumes and split requests
+            must finish (default: the retry policy's deadline, started now)
     
     Returns:
         API response if successful, None otherwise
     """
-    # Get API credentials and settings from environment variables
-    dify_base_url = os.getenv("DIFY_BASE_URL", "https://api.dify.ai/v1")
-    dify_api_key = os.getenv("DIFY_API_KEY")
+    # Connections to DIFY_BASE_URL are pooled and reused across calls and retries
+    client = client or get_dify_client()
     
-    # API endpoint for chat completions
-    endpoint = f"{dify_base_url}/chat-messages"
+    # Retry settings; the circuit breaker is shared with concurrent calls
+    policy = retry_policy or RetryPolicy.from_env(max_retries)
+    if deadline is None:
+        deadline = policy.start()
+    if split_documents:
+        return _call_split(plugin_dir, manifest_info, inputs, max_retries=max_retries, save_docs=save_docs,
+                           max_resumes=max_resumes, retry_policy=retry_policy, rate_limiter=rate_limiter,
+                           client=client, deadline=deadline)
+    if max_resumes is None:
+        max_resumes = get_max_resumes()
     
-    # Headers for API request
-    headers = {
-        "Authorization": f"Bearer {dify_api_key}",
-        "Content-Type": "application/json"
-    }
+    # Every request, retries and resumes included, counts against the quotas
+    rate_limiter = rate_limiter or get_rate_limiter()
+    request_tokens = estimate_request_tokens(inputs, query) if rate_limiter else 0
     
     # Current attempt counter
     current_attempt = 0
-    max_attempts = max_retries + 1
+    max_attempts = policy.max_attempts
     
     # Variable to store error details
     error_details = ""
     
     while current_attempt < max_attempts:
+        if time_left(deadline) == 0:
+            print_warning("Retry deadline reached, giving up")
+            error_details = error_details or "Deadline reached before the API request was sent"
+            break
+        
+        # Wait while the API is failing for every worker
+        breaker_delay = policy.breaker_delay(deadline)
+        if breaker_delay is None:
+            break
+        if breaker_delay:
+            record_duration("breaker_wait", breaker_delay)
+            time.sleep(breaker_delay)
+            continue
+        
         current_attempt += 1
+        retryable = True
+        retry_after = None
         
         # Debug information
         print_progress(f"API Call Attempt {current_attempt}/{max_attempts}")
+        count("api_attempts")
+        
+        if rate_limiter:
+            rate_limiter.acquire(request_tokens)
         
         try:
             # Prepare request data
-            data = {
-                "inputs": inputs,
-                "query": query,
-                "response_mode": "streaming",  # Changed from blocking to streaming
-                "conversation_id": None,
-                "user": "readme-generator"
-            }
+            data = build_request_data(inputs, query)
             
             # 显示代码结构大小，确保发送完整内容
             code_size = len(str(inputs.get('code_files', ''))) if 'code_files' in inputs else 0
             print_info(f"Sending API request to Dify with {code_size} characters of code structure...")
             
             # For streaming mode, we need to process the response differently
-            response = requests.post(
-                endpoint,
-                headers=headers,
-                json=data,
-                stream=True,  # Enable streaming
-                timeout=60 * 10  # 10 minute timeout
-            )
+            request_started = time.perf_counter()
+            response = client.post_chat_message(data, _request_timeout(deadline))
+            record_duration("api_headers", time.perf_counter() - request_started)
             
             # Check if response is successful
             if response.status_code == 200:
                 # 简化API响应日志
                 print_success(f"API Response: {response.status_code} OK (Streaming)")
                 
-                # Initialize variables to collect the response
-                full_response = ""
-                answer = ""
-                
-                # We'll collect the full response and extract content later
-                # No need to track XML tags during streaming
+                # Documents are extracted while streaming; README.md is written
+                # as soon as its closing tag arrives
+                extractor = StreamingTagExtractor(plugin_dir, save_docs, documents, locale=locale)
                 
                 # Process the streaming response
                 try:
-                    for line in response.iter_lines():
-                        if line:
-                            # Debug raw response for troubleshooting
-                            line_text = line.decode('utf-8')
-                            # Only print data lines with actual content
-                            if line_text.startswith('data:') and len(line_text) > 10 and not 'event' in line_text:
-                                print_info(f"Data received: {len(line_text)} chars")
-                            
-                            # Handle SSE format - lines start with 'data: '
-                            if line_text.startswith('data: '):
-                                # Extract the JSON part
-                                json_str = line_text[6:]  # Skip 'data: '
-                                try:
-                                    # Parse the JSON data
-                                    line_data = json.loads(json_str)
-                                    
-                                    # 不再打印进度信息
-                                    pass
-                                    
-                                    # Extract the answer based on event type
-                                    if 'event' in line_data:
-                                        if line_data['event'] == 'message':
-                                            # Direct answer chunk in the message event
-                                            if 'answer' in line_data:
-                                                answer_chunk = line_data['answer']
-                                                answer += answer_chunk
-                                                full_response += answer_chunk
-                                                
-                                                # 完全删除处理块的信息输出
-                                                
-                                                # 不再输出任何标签信息
-                                        
-                                        # Check for end of stream
-                                        elif line_data['event'] == 'message_end':
-                                            print_success("Response received successfully")
-                                            break
-                                except json.JSONDecodeError as e:
-                                    print_warning(f"Skipping invalid JSON in stream: {e}")
-                            else:
-                                # Skip non-data lines (like empty lines for keep-alive)
-                                pass
+                    _read_stream(response, extractor, request_started, deadline)
+                    policy.record(success=True)
                     
-                    print_info("Extracting documentation content...")
+                    if extractor.missing_documents() and max_resumes:
+                        extractor = _resume_generation(
+                            client, inputs, extractor, max_resumes, rate_limiter, deadline
+                        )
                     
-                    # 使用新的提取函数处理完整响应
-                    readme_content, privacy_content, readme_complete, privacy_complete = extract_content_from_response(
-                        answer, plugin_dir, save_docs
-                    )
+                    print_info("Extracting documentation content...")
                     
-                    # 创建响应对象
-                    api_response = {
-                        "answer": answer,
-                        "readme_content": readme_content,
-                        "privacy_content": privacy_content,
-                        "readme_complete": readme_complete,
-                        "privacy_complete": privacy_complete
-                    }
+                    api_response = build_api_response(extractor.answer, plugin_dir, save_docs, extractor)
                     
                     # Return successful response and empty error details
                     return api_response, ""
@@ -214,48 +304,41 @@ def call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries=0, save_
                     error_message = f"Error processing streaming response: {str(e)}"
                     print_error(error_message)
                     error_details = error_message
+                    policy.record(success=False)
                     
                     # 如果收集到了一些响应，尝试使用它
+                    if extractor.answer and max_resumes:
+                        extractor = _resume_generation(
+                            client, inputs, extractor, max_resumes, rate_limiter, deadline
+                        )
+                        if not extractor.missing_documents():
+                            error_details = ""
+                    
+                    answer = extractor.answer
                     if answer:
-                        print_warning("Using partial response due to streaming error")
+                        if error_details:
+                            print_warning("Using partial response due to streaming error")
                         
                         # 尝试从部分响应中提取内容
-                        readme_content, privacy_content, readme_complete, privacy_complete = extract_content_from_response(
-                            answer, plugin_dir, save_docs
-                        )
-                        
-                        # 创建部分响应对象
-                        partial_response = {
-                            "answer": answer,
-                            "readme_content": readme_content,
-                            "privacy_content": privacy_content,
-                            "readme_complete": readme_complete,
-                            "privacy_complete": privacy_complete
-                        }
+                        partial_response = build_api_response(answer, plugin_dir, save_docs, extractor)
                         
                         return partial_response, error_details
                 
-                # If we get here without returning, there was an issue with the response format
+                # If we get here without returning, the stream broke before any answer arrived
                 error_message = "API streaming response format is unexpected"
                 print_error(error_message)
-                error_details = f"{error_message}\nPartial Response: {full_response[:500]}..."
-                
-                # Retry if this is not the last attempt
-                if current_attempt < max_attempts:
-                    print_warning(f"Retrying API call ({current_attempt}/{max_attempts})...")
-                    time.sleep(2)  # Wait 2 seconds before retrying
-                    continue
+                error_details = f"{error_message}\nPartial Response: {extractor.answer[:500]}..."
             else:
                 # Log error
                 error_message = f"API request failed with status code: {response.status_code}"
                 print_error(error_message)
                 error_details = f"{error_message}\nResponse: {response.text}"
                 
-                # Retry if this is not the last attempt
-                if current_attempt < max_attempts:
-                    print_warning(f"Retrying API call ({current_attempt}/{max_attempts})...")
-                    time.sleep(2)  # Wait 2 seconds before retrying
-                    continue
+                # Rate limits and server errors are retried, other client errors are not
+                retryable = policy.is_retryable_status(response.status_code)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retryable:
+                    policy.record(success=False)
         
         except Exception as e:
             # Log error
@@ -263,12 +346,148 @@ def call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries=0, save_
             print_error(error_message)
             error_details = error_message
             
-            # Retry if this is not the last attempt
-            if current_attempt < max_attempts:
-                print_warning(f"Retrying API call ({current_attempt}/{max_attempts})...")
-                time.sleep(2)  # Wait 2 seconds before retrying
-                continue
+            retryable = policy.is_retryable_exception(e)
+            if retryable:
+                policy.record(success=False)
+        
+        if not retryable:
+            print_error("API error is not retryable, giving up")
+            policy.release()
+            return None, error_details
+        
+        # Retry with backoff if attempts and time are left
+        delay = policy.next_delay(current_attempt, deadline, retry_after)
+        if delay is None:
+            break
+        print_warning(f"Retrying API call in {delay:.1f}s ({current_attempt}/{max_attempts})...")
+        count("api_retries")
+        record_duration("retry_backoff", delay)
+        time.sleep(delay)
     
     # All attempts failed
-    print_error(f"All API call attempts failed ({max_attempts} attempts)")
+    print_error(f"All API call attempts failed ({current_attempt} attempts)")
     return None, error_details
+
+
+def _call_split(plugin_dir, manifest_info, inputs, **kwargs):
+    """Generate each document with its own request, concurrently, and merge the results"""
+    def call(document):
+        return call_dify_api(plugin_dir, manifest_info, inputs, build_document_query(document),
+                             documents=[document], **kwargs)
+
+    print_info(f"Generating {' and '.join(label for _, _, label, _, _ in DOCUMENTS)} with concurrent requests")
+    with ThreadPoolExecutor(max_workers=len(DOCUMENTS)) as executor:
+        # Each call records into the metrics of the calling plugin
+        futures = {
+            key: executor.submit(contextvars.copy_context().run, call, key)
+            for key, *_ in DOCUMENTS
+        }
+        responses = {key: future.result() for key, future in futures.items()}
+    return merge_split_responses(responses)
+
+
+def _request_timeout(deadline):
+    """Return the connect and read timeout, capped at the time left until ``deadline``"""
+    left = time_left(deadline)
+    return REQUEST_TIMEOUT if left is None else max(0.01, min(REQUEST_TIMEOUT, left))
+
+
+def _read_stream(response, extractor, request_started=None, deadline=None):
+    """Feed answer chunks from an SSE response to the extractor until message_end or EOF
+
+    Time to the first answer chunk (from ``request_started``) and the stream
+    duration are recorded as metrics. Raises TimeoutError once ``deadline``
+    passes, however steadily the stream is still arriving.
+    """
+    stream_started = time.perf_counter()
+    first_chunk = True
+    logger = get_logger()
+    received = 0
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            check_deadline(deadline)
+            received += len(line)
+            logger.stream_progress(extractor, received)
+            line_text = line.decode('utf-8')
+
+            # Handle SSE format - lines start with 'data: '
+            try:
+                line_data = parse_sse_line(line_text)
+            except json.JSONDecodeError as e:
+                print_warning(f"Skipping invalid JSON in stream: {e}")
+                continue
+            # Skip non-data lines (like empty lines for keep-alive)
+            if not line_data or 'event' not in line_data:
+                continue
+            
+            if line_data.get('conversation_id'):
+                extractor.conversation_id = line_data['conversation_id']
+            
+            # Extract the answer based on event type
+            if line_data['event'] == 'message':
+                # Direct answer chunk in the message event
+                if 'answer' in line_data:
+                    if first_chunk and request_started is not None:
+                        record_duration("api_first_chunk", time.perf_counter() - request_started)
+                        first_chunk = False
+                    extractor.feed(line_data['answer'])
+            
+            # Check for end of stream
+            elif line_data['event'] == 'message_end':
+                print_success("Response received successfully")
+                # Read the rest of the body so the connection returns to the pool
+                for _ in response.iter_content(chunk_size=65536):
+                    pass
+                break
+    finally:
+        logger.end_stream(extractor)
+        record_duration("api_stream", time.perf_counter() - stream_started)
+
+
+def _resume_generation(client, inputs, extractor, max_resumes, rate_limiter=None, deadline=None):
+    """Ask the model to finish a truncated answer in the same conversation
+
+    Only the missing documents are requested; the continuation is stitched
+    onto the answer up to the last complete document. A continuation is kept
+    only if it completes more documents than the answer it resumes. The code
+    structure is not sent again, and only the follow-up query counts against
+    the rate limits.
+
+    Returns:
+        StreamingTagExtractor: The best extractor obtained
+    """
+    for attempt in range(1, max_resumes + 1):
+        if not extractor.conversation_id or not extractor.missing_documents():
+            break
+        if time_left(deadline) == 0:
+            print_warning("Deadline reached, not resuming generation")
+            break
+        
+        resumed = extractor.continuation()
+        missing = resumed.missing_documents()
+        count("api_resumes")
+        print_progress(f"Resuming generation {attempt}/{max_resumes} for {', '.join(label for label, _, _ in missing)}")
+        
+        resume_inputs, query = build_resume_inputs(inputs), build_resume_query(missing)
+        if rate_limiter:
+            rate_limiter.acquire(estimate_request_tokens(resume_inputs, query))
+        try:
+            response = client.post_chat_message(
+                build_request_data(resume_inputs, query, resumed.conversation_id),
+                _request_timeout(deadline)
+            )
+            if response.status_code != 200:
+                print_error(f"Resume request failed with status code: {response.status_code}")
+                break
+            _read_stream(response, resumed, deadline=deadline)
+        except Exception as e:
+            print_error(f"Error resuming generation: {str(e)}")
+        
+        if len(resumed.missing_documents()) >= len(extractor.missing_documents()):
+            print_warning("Resumed generation did not complete any missing document")
+            break
+        extractor = resumed
+    
+    return extractor
@@ -0,0 +1,338 @@
+"""
+Asyncio API client for Dify
+
+Runs many streaming generations on a single event loop that share one
+connection pool, instead of blocking a thread per in-flight request.
+"""
+import os
+import json
+import time
+import asyncio
+import aiohttp
+from utils.formatting import print_error, print_info, print_success, print_warning, print_progress, get_logger
+from utils.api_handler import (
+    build_request_data, parse_sse_line, build_api_response, build_resume_inputs, build_resume_query,
+    get_max_resumes, build_document_query, merge_split_responses
+)
+from utils.stream_extractor import StreamingTagExtractor, DOCUMENTS
+from utils.retry_policy import RetryPolicy, parse_retry_after, time_left
+from utils.rate_limiter import get_rate_limiter, estimate_request_tokens
+from utils.dify_client import REQUEST_TIMEOUT, encode_request_body, env_flag
+from utils.metrics import count, record_duration
+
+# Largest single SSE line accepted from the stream
+MAX_LINE_SIZE = 2 ** 20
+
+
+class AsyncDifyClient:
+    """Dify API client owning a shared aiohttp session
+
+    Use as an async context manager so the connection pool is closed when
+    all generations are done::
+
+        async with AsyncDifyClient(pool_size=16) as client:
+            api_response, error_details = await client.call_dify_api(...)
+    """
+
+    def __init__(self, base_url=None, api_key=None, pool_size=10, keep_alive=None, compress=None):
+        self.base_url = base_url or os.getenv("DIFY_BASE_URL", "https://api.dify.ai/v1")
+        self.api_key = api_key or os.getenv("DIFY_API_KEY")
+        self.pool_size = pool_size
+        self.keep_alive = env_flag("DIFY_KEEP_ALIVE", "true") if keep_alive is None else keep_alive
+        self.compress = env_flag("DIFY_GZIP_REQUESTS") if compress is None else compress
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, force_close=not self.keep_alive),
+            # Like requests, bound connecting and each read, not the whole stream
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT),
+            read_bufsize=MAX_LINE_SIZE
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the underlying connection pool"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def call_dify_api(self, plugin_dir, manifest_info, inputs, query, max_retries=0, save_docs=True,
+                            max_resumes=None, retry_policy=None, rate_limiter=None, split_documents=False,
+                            documents=None, locale=None, deadline=None):
+        """Call Dify API with extracted information
+
+        Same contract as ``utils.api_handler.call_dify_api``.
+
+        Returns:
+            tuple: (api_response, error_details); api_response is None if all attempts failed
+        """
+        policy = retry_policy or RetryPolicy.from_env(max_retries)
+        if deadline is None:
+            deadline = policy.start()
+        if split_documents:
+            # One request per document on the same event loop, merged like a single answer
+            results = await asyncio.gather(*(
+                self.call_dify_api(plugin_dir, manifest_info, inputs, build_document_query(key), max_retries,
+                                   save_docs, max_resumes, retry_policy, rate_limiter, documents=[key],
+                                   deadline=deadline)
+                for key, *_ in DOCUMENTS
+            ))
+            return merge_split_responses({key: result for (key, *_), result in zip(DOCUMENTS, results)})
+
+        endpoint = f"{self.base_url}/chat-messages"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        name = manifest_info.get("name", "") if manifest_info else ""
+        if max_resumes is None:
+            max_resumes = get_max_resumes()
+
+        # Every request, retries and resumes included, counts against the quotas
+        rate_limiter = rate_limiter or get_rate_limiter()
+        request_tokens = estimate_request_tokens(inputs, query) if rate_limiter else 0
+
+        current_attempt = 0
+        max_attempts = policy.max_attempts
+        error_details = ""
+
+        while current_attempt < max_attempts:
+            if time_left(deadline) == 0:
+                print_warning(f"[{name}] Retry deadline reached, giving up")
+                error_details = error_details or "Deadline reached before the API request was sent"
+                break
+
+            # Wait while the API is failing for every worker
+            breaker_delay = policy.breaker_delay(deadline)
+            if breaker_delay is None:
+                break
+            if breaker_delay:
+                record_duration("breaker_wait", breaker_delay)
+                await asyncio.sleep(breaker_delay)
+                continue
+
+            current_attempt += 1
+            retryable = True
+            retry_after = None
+            print_progress(f"[{name}] API Call Attempt {current_attempt}/{max_attempts}")
+            count("api_attempts")
+            if rate_limiter:
+                await rate_limiter.acquire_async(request_tokens)
+
+            extractor = StreamingTagExtractor(plugin_dir, save_docs, documents, locale=locale)
+            stream_error = None
+            try:
+                data = build_request_data(inputs, query)
+                code_size = len(str(inputs.get('code_files', ''))) if 'code_files' in inputs else 0
+                print_info(f"[{name}] Sending API request to Dify with {code_size} characters of code structure...")
+
+                request_started = time.perf_counter()
+                async with self._post(endpoint, headers, data, deadline) as response:
+                    record_duration("api_headers", time.perf_counter() - request_started)
+                    if response.status != 200:
+                        error_message = f"API request failed with status code: {response.status}"
+                        print_error(f"[{name}] {error_message}")
+                        error_details = f"{error_message}\nResponse: {await response.text()}"
+                        streamed = False
+
+                        # Rate limits and server errors are retried, other client errors are not
+                        retryable = policy.is_retryable_status(response.status)
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if retryable:
+                            policy.record(success=False)
+                    else:
+                        print_success(f"[{name}] API Response: {response.status} OK (Streaming)")
+                        streamed = True
+                        try:
+                            await self._read_stream(response, name, extractor, request_started)
+                            policy.record(success=True)
+                        except Exception as e:
+                            stream_error = f"Error processing streaming response: {str(e)}"
+                            print_error(f"[{name}] {stream_error}")
+                            error_details = stream_error
+                            policy.record(success=False)
+
+                # Resume outside the response context so its connection is back in the pool
+                if streamed and (stream_error is None or extractor.answer):
+                    if extractor.missing_documents() and max_resumes:
+                        extractor = await self._resume_generation(
+                            endpoint, headers, inputs, extractor, max_resumes, name, rate_limiter, deadline
+                        )
+                        if not extractor.missing_documents():
+                            stream_error = None
+
+                    if stream_error is None:
+                        print_info(f"[{name}] Extracting documentation content...")
+                        return build_api_response(extractor.answer, plugin_dir, save_docs, extractor), ""
+                    # Use whatever was collected before the stream broke
+                    print_warning(f"[{name}] Using partial response due to streaming error")
+                    return build_api_response(extractor.answer, plugin_dir, save_docs, extractor), error_details
+
+            except Exception as e:
+                error_message = f"Exception during API call: {str(e)}"
+                print_error(f"[{name}] {error_message}")
+                error_details = error_message
+
+                retryable = policy.is_retryable_exception(e)
+                if retryable:
+                    policy.record(success=False)
+
+            if not retryable:
+                print_error(f"[{name}] API error is not retryable, giving up")
+                policy.release()
+                return None, error_details
+
+            # Retry with backoff if attempts and time are left
+            delay = policy.next_delay(current_attempt, deadline, retry_after)
+            if delay is None:
+                break
+            print_warning(f"[{name}] Retrying API call in {delay:.1f}s ({current_attempt}/{max_attempts})...")
+            count("api_retries")
+            record_duration("retry_backoff", delay)
+            await asyncio.sleep(delay)
+
+        print_error(f"[{name}] All API call attempts failed ({current_attempt} attempts)")
+        return None, error_details
+
+    def _post(self, endpoint, headers, data, deadline=None):
+        """Start a chat-messages request, gzip-compressing large bodies if enabled
+
+        With a ``deadline``, the whole request, streamed body included, must
+        finish by then.
+        """
+        body, extra_headers = encode_request_body(data, self.compress)
+        options = {}
+        left = time_left(deadline)
+        if left is not None:
+            options["timeout"] = aiohttp.ClientTimeout(total=max(0.01, left), sock_connect=REQUEST_TIMEOUT,
+                                                       sock_read=REQUEST_TIMEOUT)
+        return self.session.post(endpoint, headers={**headers, **extra_headers}, data=body, **options)
+
+    async def _read_stream(self, response, name, extractor, request_started=None):
+        """Feed answer chunks from an SSE response to the extractor until message_end or EOF
+
+        The extractor is owned by the caller so a partial answer survives a
+        broken stream. Time to the first answer chunk and the stream duration
+        are recorded as metrics.
+        """
+        stream_started = time.perf_counter()
+        first_chunk = True
+        logger = get_logger()
+        received = 0
+        try:
+            async for line in response.content:
+                line_text = line.decode('utf-8').rstrip('\r\n')
+                if not line_text:
+                    continue
+                received += len(line)
+                logger.stream_progress(extractor, received)
+                try:
+                    line_data = parse_sse_line(line_text)
+                except json.JSONDecodeError as e:
+                    print_warning(f"[{name}] Skipping invalid JSON in stream: {e}")
+                    continue
+                if not line_data or 'event' not in line_data:
+                    continue
+                if line_data.get('conversation_id'):
+                    extractor.conversation_id = line_data['conversation_id']
+
+                if line_data['event'] == 'message':
+                    if first_chunk and request_started is not None:
+                        record_duration("api_first_chunk", time.perf_counter() - request_started)
+                        first_chunk = False
+                    extractor.feed(line_data.get('answer', ''))
+                elif line_data['event'] == 'message_end':
+                    print_success(f"[{name}] Response received successfully")
+                    # Read the rest of the body so the connection returns to the pool
+                    await response.content.read()
+                    break
+        finally:
+            logger.end_stream(extractor)
+            record_duration("api_stream", time.perf_counter() - stream_started)
+
+    async def _resume_generation(self, endpoint, headers, inputs, extractor, max_resumes, name,
+                                 rate_limiter=None, deadline=None):
+        """Ask the model to finish a truncated answer in the same conversation
+
+        Same behavior as ``utils.api_handler._resume_generation``.
+
+        Returns:
+            StreamingTagExtractor: The best extractor obtained
+        """
+        for attempt in range(1, max_resumes + 1):
+            if not extractor.conversation_id or not extractor.missing_documents():
+                break
+            if time_left(deadline) == 0:
+                print_warning(f"[{name}] Deadline reached, not resuming generation")
+                break
+
+            resumed = extractor.continuation()
+            missing = resumed.missing_documents()
+            count("api_resumes")
+            print_progress(
+                f"[{name}] Resuming generation {attempt}/{max_resumes} for {', '.join(label for label, _, _ in missing)}"
+            )
+
+            resume_inputs, query = build_resume_inputs(inputs), build_resume_query(missing)
+            if rate_limiter:
+                await rate_limiter.acquire_async(estimate_request_tokens(resume_inputs, query))
+            data = build_request_data(resume_inputs, query, resumed.conversation_id)
+            try:
+                async with self._post(endpoint, headers, data, deadline) as response:
+                    if response.status != 200:
+                        print_error(f"[{name}] Resume request failed with status code: {response.status}")
+                        break
+                    await self._read_stream(response, name, resumed)
+            except Exception as e:
+                print_error(f"[{name}] Error resuming generation: {str(e)}")
+
+            if len(resumed.missing_documents()) >= len(extractor.missing_documents()):
+                print_warning(f"[{name}] Resumed generation did not complete any missing document")
+                break
+            extractor = resumed
+
+        return extractor
+
+
+async def call_dify_api_async(plugin_dir, manifest_info, inputs, query, max_retries=0, save_docs=True,
+                              split_documents=False, deadline=None):
+    """Call Dify API once using a temporary async client"""
+    async with AsyncDifyClient(pool_size=len(DOCUMENTS) if split_documents else 1) as client:
+        return await client.call_dify_api(plugin_dir, manifest_info, inputs, query, max_retries, save_docs,
+                                          split_documents=split_documents, deadline=deadline)
+
+
+def call_dify_api_sync(plugin_dir, manifest_info, inputs, query, max_retries=0, save_docs=True,
+                       split_documents=False, deadline=None):
+    """Blocking wrapper around the async client with the ``call_dify_api`` signature"""
+    return asyncio.run(
+        call_dify_api_async(plugin_dir, manifest_info, inputs, query, max_retries, save_docs, split_documents,
+                            deadline)
+    )
+
+
+def run_dify_calls(jobs, concurrency=10, save_docs=True):
+    """Run many Dify calls concurrently on one event loop and connection pool
+
+    Args:
+        jobs (list): Keyword-argument dicts for ``call_dify_api`` (``plugin_dir``,
+            ``manifest_info``, ``inputs``, ``query`` and optionally ``max_retries``)
+        concurrency (int): Maximum number of streams in flight at once
+        save_docs (bool): Whether to save extracted content to files
+
+    Returns:
+        list: (api_response, error_details) tuples in the same order as ``jobs``
+    """
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        async with AsyncDifyClient(pool_size=max(1, concurrency)) as client:
+            async def run_one(job):
+                async with semaphore:
+                    return await client.call_dify_api(save_docs=save_docs, **job)
+            return await asyncio.gather(*(run_one(job) for job in jobs))
+
+    return asyncio.run(run_all())
@@ -0,0 +1,215 @@
+"""
+Batch processing utilities for running the generator over many plugins
+"""
+import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.formatting import print_header, print_error, print_info, print_success, print_warning, print_progress
+from utils.metrics import activate_metrics, timed
+
+# Directories that never contain plugin sources worth scanning
+SKIP_DIRECTORIES = {".git", ".venv", "venv", "node_modules", "__pycache__"}
+
+
+def discover_plugin_paths(source):
+    """Find plugin directories from a root directory or a list file
+
+    A directory is scanned recursively for ``manifest.yaml`` files. Once a
+    manifest is found its directory is treated as a plugin and not descended
+    into any further. A regular file is read as a list of plugin paths, one per
+    line; blank lines and lines starting with ``#`` are ignored.
+
+    Args:
+        source (str): Root directory to scan or path to a list file
+
+    Returns:
+        list: Sorted list of plugin directory paths
+    """
+    source = source.strip('"').strip("'")
+
+    if os.path.isfile(source):
+        plugin_paths = []
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = line.strip()
+                if not entry or entry.startswith("#"):
+                    continue
+                entry = entry.strip('"').strip("'")
+                # Relative entries are resolved against the list file location
+                if not os.path.isabs(entry):
+                    entry = os.path.join(base_dir, entry)
+                plugin_paths.append(os.path.normpath(entry))
+        return plugin_paths
+
+    if not os.path.isdir(source):
+        print_error(f"Batch source not found: {source}")
+        return []
+
+    plugin_paths = []
+    for current_dir, dirnames, filenames in os.walk(source):
+        if "manifest.yaml" in filenames:
+            plugin_paths.append(os.path.normpath(current_dir))
+            # Do not look for nested manifests inside a plugin
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRECTORIES and not d.startswith(".")]
+
+    return sorted(plugin_paths)
+
+
+def run_batch(plugin_paths, worker, concurrency=4):
+    """Run a worker function for every plugin through a bounded thread pool
+
+    Args:
+        plugin_paths (list): Plugin directories to process
+        worker (callable): Function taking a plugin path and returning a result dict
+        concurrency (int): Maximum number of plugins processed at the same time
+
+    Returns:
+        list: Result dicts in the same order as ``plugin_paths``
+    """
+    concurrency = max(1, int(concurrency))
+    results = [None] * len(plugin_paths)
+    total = len(plugin_paths)
+    finished = 0
+
+    print_info(f"Processing {total} plugins with concurrency {concurrency}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(_run_worker, worker, plugin_path): index
+            for index, plugin_path in enumerate(plugin_paths)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            finished += 1
+            print_progress(
+                f"{results[index]['status']}: {plugin_paths[index]}",
+                f"{finished}/{total}"
+            )
+
+    return results
+
+
+def run_batch_async(plugin_paths, prepare, finalize, concurrency=4, streams_per_plugin=1):
+    """Run a batch with all API streams multiplexed on one event loop
+
+    The local stages (``prepare``) run on a bounded thread pool; every API call
+    then goes through a single ``AsyncDifyClient`` so in-flight generations do
+    not each hold a blocked thread.
+
+    Args:
+        plugin_paths (list): Plugin directories to process
+        prepare (callable): Takes a plugin path, returns ``(result, job)``; job is
+            None when the plugin should not be sent to the API
+        finalize (callable): Takes ``(result, job, api_response, error_details)``
+            and returns the final result dict
+        concurrency (int): Maximum number of local stages and plugins calling the API at once
+        streams_per_plugin (int): Streams one API call opens at once (2 in split mode)
+
+    Returns:
+        list: Result dicts in the same order as ``plugin_paths``
+    """
+    import asyncio
+    from utils.async_api_handler import AsyncDifyClient
+    from utils.dify_client import pool_size_for
+    from utils.retry_policy import RetryPolicy
+
+    concurrency = max(1, int(concurrency))
+    total = len(plugin_paths)
+    finished = 0
+
+    print_info(f"Processing {total} plugins with concurrency {concurrency} (async client)")
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Split calls stream every document at once; a smaller pool would queue them
+            async with AsyncDifyClient(pool_size=pool_size_for(concurrency, streams_per_plugin)) as client:
+                async def run_one(plugin_path):
+                    nonlocal finished
+                    start_time = time.monotonic()
+                    try:
+                        result, job = await loop.run_in_executor(executor, prepare, plugin_path)
+                        if job is not None:
+                            # prepare ran on a pool thread; record the API stages in this task
+                            activate_metrics(result.get("metrics"))
+                            async with semaphore:
+                                # One time budget for the call and the translations in finalize
+                                job["deadline"] = RetryPolicy.from_env(job.get("max_retries")).start()
+                                with timed("api"):
+                                    api_response, error_details = await client.call_dify_api(save_docs=True, **job)
+                            # finalize may block (copying files, translation calls); keep it off the loop
+                            result = await loop.run_in_executor(
+                                executor, contextvars.copy_context().run,
+                                finalize, result, job, api_response, error_details
+                            )
+                    except Exception as e:
+                        result = {"status": "failed", "error": f"Unhandled error: {e}"}
+
+                    result.setdefault("plugin_path", plugin_path)
+                    result.setdefault("name", os.path.basename(os.path.normpath(plugin_path)))
+                    result.setdefault("error", "")
+                    result["duration"] = time.monotonic() - start_time
+
+                    finished += 1
+                    print_progress(f"{result['status']}: {plugin_path}", f"{finished}/{total}")
+                    return result
+
+                return await asyncio.gather(*(run_one(plugin_path) for plugin_path in plugin_paths))
+
+    return list(asyncio.run(run_all()))
+
+
+def _run_worker(worker, plugin_path):
+    """Call the worker and turn unexpected exceptions into a failed result"""
+    start_time = time.monotonic()
+    try:
+        result = worker(plugin_path)
+    except BaseException as e:  # SystemExit from legacy code paths must not kill the pool
+        result = {"status": "failed", "error": f"Unhandled error: {e}"}
+
+    result.setdefault("plugin_path", plugin_path)
+    result.setdefault("name", os.path.basename(os.path.normpath(plugin_path)))
+    result.setdefault("error", "")
+    result["duration"] = time.monotonic() - start_time
+    return result
+
+
+def print_batch_summary(results):
+    """Print a per-plugin summary table for a batch run
+
+    Args:
+        results (list): Result dicts returned by ``run_batch``
+
+    Returns:
+        bool: True if every plugin succeeded, False otherwise
+    """
+    print_header("BATCH SUMMARY", "=")
+
+    succeeded = 0
+    for result in results:
+        docs = []
+        if result.get("readme"):
+            docs.append("README")
+        if result.get("privacy"):
+            docs.append("PRIVACY")
+        docs_text = "+".join(docs) if docs else "-"
+        line = f"{result['name']:<32} {result['status']:<8} {docs_text:<15} {result['duration']:7.1f}s"
+
+        if result["status"] == "success":
+            succeeded += 1
+            print_success(line)
+        elif result["status"] == "partial":
+            print_warning(f"{line}  {result['error']}")
+        else:
+            print_error(f"{line}  {result['error']}")
+
+    total_time = sum(result["duration"] for result in results)
+    print_info(f"{succeeded}/{len(results)} plugins succeeded (cumulative plugin time {total_time:.1f}s)")
+    return succeeded == len(results)
@@ -0,0 +1,190 @@
+"""
+Content-addressed store of per-file analysis results
+
+Plugins often vendor the same helper modules and SDK shims. Every file is
+identified by the SHA-256 of its bytes, and the work derived from it (the
+digested text, its token count, outlines) is stored once under that hash
+and shared by every plugin containing the same bytes. Entries are kept in
+memory for the running process and as one JSON file per blob on disk, so
+both CPU time and disk use grow with unique code rather than total code.
+"""
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from utils.formatting import print_info, print_warning
+from utils.metrics import count
+
+# Default location of the store (relative to the working directory, like plugins/)
+DEFAULT_BLOB_DIR = os.path.join(".cache", "blobs")
+
+# Maximum number of entries kept in memory
+MEMORY_ENTRIES = 20000
+
+
+def get_blob_dir():
+    """Return the blob store directory"""
+    return os.getenv("BLOB_STORE_DIR") or os.path.join(os.getcwd(), DEFAULT_BLOB_DIR)
+
+
+def hash_bytes(data):
+    """Return the content address of some bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Fields derived from file contents, keyed by content hash
+
+    Each entry is a dict of named fields, e.g. ``text`` or
+    ``tokens:cl100k_base``. Fields are computed on first use and persisted;
+    writes replace the entry file atomically, so concurrent batch workers
+    never read a partial entry.
+
+    Args:
+        directory (str): Directory of the entry files (default: ``get_blob_dir()``)
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_blob_dir()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def _load(self, digest):
+        """Return the entry of a blob from memory or disk (empty if unknown)"""
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                self._memory.move_to_end(digest)
+                return entry
+
+        path = self._path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Refresh mtime so eviction drops the least recently used blobs first
+            os.utime(path, None)
+        except FileNotFoundError:
+            entry = {}
+        except (OSError, ValueError) as e:
+            print_warning(f"Ignoring unreadable blob {digest[:12]}: {e}")
+            entry = {}
+
+        with self._lock:
+            entry = self._memory.setdefault(digest, entry)
+            self._evict_memory()
+        return entry
+
+    def _evict_memory(self):
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def get(self, digest, field, compute=None):
+        """Return a field of a blob, computing and storing it if missing
+
+        Args:
+            digest (str): Content hash from ``hash_bytes``
+            field (str): Field name
+            compute (callable): Returns the value when the field is not stored yet
+
+        Returns:
+            The value, or None if it is missing and no ``compute`` was given
+        """
+        entry = self._load(digest)
+        if field in entry:
+            count("blob_hits")
+            return entry[field]
+        count("blob_misses")
+        if compute is None:
+            return None
+        value = compute()
+        self.put(digest, field, value)
+        return value
+
+    def put(self, digest, field, value):
+        """Store a field of a blob"""
+        entry = self._load(digest)
+        with self._lock:
+            entry[field] = value
+            payload = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+            path = self._path(digest)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(payload)
+                    os.replace(temp_path, path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            except OSError as e:
+                print_warning(f"Failed to write blob {digest[:12]}: {e}")
+
+    def clear_memory(self):
+        """Forget the entries held in memory (the files on disk stay)"""
+        with self._lock:
+            self._memory.clear()
+
+    def evict(self, max_bytes=None):
+        """Remove the least recently used entry files until under the size limit
+
+        Args:
+            max_bytes (int): Size limit; defaults to ``BLOB_STORE_MAX_MB``
+
+        Returns:
+            int: Number of entries removed
+        """
+        if max_bytes is None:
+            max_bytes = float(os.getenv("BLOB_STORE_MAX_MB", "500")) * 1024 * 1024
+
+        entries = []
+        try:
+            for bucket in os.scandir(self.directory):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return 0
+
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by a concurrent process
+            total_size -= size
+            removed += 1
+
+        if removed:
+            print_info(f"Evicted {removed} blob store entries")
+        return removed
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Return the store shared by all plugins processed with the configured directory
+
+    Old entries are evicted when a store is first opened in the process.
+    """
+    directory = get_blob_dir()
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = BlobStore(directory)
+            store.evict()
+    return store
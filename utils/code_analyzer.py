@@ -2,55 +2,556 @@
 Code analysis utilities
 """
 import os
-import gitingest
 import json
+import hashlib
+import tempfile
 from utils.formatting import print_error, print_info, print_success, print_progress, print_warning
+from utils.file_filter import FileFilter, collect_exclusions
+from utils.file_operations import write_if_changed
+from utils.metrics import timed
 
-def generate_code_structure(plugin_path, output_file):
-    """Analyze code structure using gitingest"""
+# Separator gitingest puts around each file header
+SEPARATOR = "=" * 48
+
+# Bump when the manifest layout or filter semantics change so stale manifests trigger a full run
+MANIFEST_VERSION = 3
+
+# Tree entry markers used by gitingest's directory listing
+TREE_MARKERS = ("├── ", "└── ")
+
+# Files whose changes alter what gitingest includes; any change forces a full run
+RULE_FILES = {".gitignore", ".difyignore"}
+
+# gitingest's own limit, used when MAX_FILE_SIZE_KB is 0 (no limit of ours)
+GITINGEST_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+
+def generate_code_structure(plugin_path, output_file, incremental=False, blob_store=False):
+    """Analyze code structure using gitingest
+
+    Args:
+        plugin_path (str): Path to the plugin source directory
+        output_file (str): Path of the ``<name>_structure.txt`` output
+        incremental (bool): Re-digest only files that changed since the last run,
+            using the manifest kept next to the output file
+        blob_store (bool): Assemble the structure from the shared blob store
+            instead of running gitingest; files already digested for any plugin
+            are not digested or token-counted again (``incremental`` is ignored)
+
+    Returns:
+        str: The filtered code structure, or None on failure
+    """
     print_progress("Analyzing code structure")
-    
+
+    if incremental and not blob_store:
+        try:
+            with timed("incremental_update"):
+                content = _update_code_structure(plugin_path, output_file)
+            if content is not None:
+                return content
+        except Exception as e:
+            print_warning(f"Incremental update failed ({e}), running full analysis")
+
+    try:
+        # Decide what to skip before gitingest reads anything
+        with timed("exclusions"):
+            file_filter, included, excluded = collect_exclusions(plugin_path)
+    except Exception as e:
+        print_error(f"Failed to scan plugin files: {e}")
+        return None
+
+    if blob_store:
+        return _assemble_code_structure(plugin_path, output_file, file_filter, included)
+
+    content = _ingest_code_structure(plugin_path, output_file, file_filter, excluded)
+
+    if content is not None and incremental:
+        try:
+            _write_manifest(plugin_path, output_file, content, file_filter, included)
+        except Exception as e:
+            print_warning(f"Failed to write structure manifest: {e}")
+
+    return content
+
+
+def _ingest_code_structure(plugin_path, output_file, file_filter, excluded):
+    """Run a full gitingest pass with pre-computed exclusions and filter the output"""
     try:
         # Print information about ignored extensions
-        ignore_extensions = os.getenv("IGNORE_EXTENSIONS", ".min.js,.min.css,.map,.lock")
-        print_info(f"Note: We'll manually filter files with extensions: {ignore_extensions}")
-        
-        # Call the ingest function from gitingest
+        ignore_extensions = ",".join(file_filter.extensions)
+        print_info(f"Note: We'll skip files with extensions: {ignore_extensions}")
+
+        # Call the ingest function from gitingest (imported here: it is slow to import)
+        import gitingest
         print_progress("Running code analysis", "1/3")
-        summary, tree, content = gitingest.ingest(plugin_path, output=output_file)
-        
-        # Read the generated file to get content
+        with timed("gitingest"):
+            summary, tree, content = gitingest.ingest(
+                plugin_path,
+                max_file_size=file_filter.max_file_size or GITINGEST_MAX_FILE_SIZE,
+                exclude_patterns=file_filter.gitingest_patterns(excluded),
+                # The filter already applied the ignore files, negations included
+                include_gitignored=True,
+                output=output_file
+            )
+
+        # Filter the generated file in a single streaming pass
         print_progress("Extracting file information", "2/3")
         if os.path.exists(output_file):
-            with open(output_file, 'r', encoding='utf-8') as f:
-                file_content = f.read()
-                
-            # Filter out content related to ignored extensions
             print_progress("Filtering content", "3/3")
-            ignore_extensions = os.getenv("IGNORE_EXTENSIONS", ".min.js,.min.css,.map,.lock").split(',')
-            filtered_lines = []
-            for line in file_content.split('\n'):
-                # Skip lines containing ignored extensions
-                should_include = True
-                for ext in ignore_extensions:
-                    if ext in line.lower():
-                        should_include = False
-                        break
-                if should_include:
-                    filtered_lines.append(line)
-            
-            # Write filtered content back to file
-            filtered_content = '\n'.join(filtered_lines)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(filtered_content)
-            
+            with timed("filter"):
+                filter_structure_file(output_file, build_suffix_matcher(ignore_extensions))
+
+            with open(output_file, 'r', encoding='utf-8') as f:
+                filtered_content = f.read()
+
             print_success("Code structure generated successfully!")
             print_info(f"Output file: {output_file}")
             return filtered_content
         else:
             print_error(f"Output file not found: {output_file}")
             return None
-    
+
     except Exception as e:
         print_error(f"Failed to analyze code structure: {e}")
         return None
+
+
+def build_suffix_matcher(ignore_extensions):
+    """Build a case-insensitive path suffix matcher
+
+    Args:
+        ignore_extensions (str): Comma-separated suffixes, e.g. ".min.js,.map"
+
+    Returns:
+        callable: Takes a path and returns True if it ends with an ignored suffix
+    """
+    suffixes = tuple(
+        ext.strip().lower() if ext.strip().startswith('.') else f".{ext.strip().lower()}"
+        for ext in ignore_extensions.split(',')
+        if ext.strip()
+    )
+    if not suffixes:
+        return lambda path: False
+    return lambda path: path.lower().endswith(suffixes)
+
+
+def filter_structure_lines(lines, is_ignored):
+    """Drop ignored files from a gitingest dump, one line at a time
+
+    Whole file sections are skipped based on their ``FILE:`` headers, and the
+    matching entries are removed from the directory tree. Only one pending
+    separator line is buffered, so memory does not grow with the input.
+
+    Args:
+        lines (iterable): Lines of the dump, with or without trailing newlines
+        is_ignored (callable): Suffix matcher from ``build_suffix_matcher``
+
+    Yields:
+        str: The lines that are kept, unchanged
+    """
+    in_tree = True
+    skipping = False
+    pending_separator = None
+
+    for line in lines:
+        text = line.rstrip('\r\n')
+
+        if pending_separator is not None:
+            if text.startswith("FILE: "):
+                # A new section starts; decide once for all of its lines
+                in_tree = False
+                skipping = is_ignored(text[len("FILE: "):])
+                if not skipping:
+                    yield pending_separator
+                    yield line
+                pending_separator = None
+                continue
+            if not skipping:
+                yield pending_separator
+            pending_separator = None
+
+        if text == SEPARATOR:
+            pending_separator = line
+            continue
+
+        if in_tree:
+            marker_index = max(text.find(TREE_MARKERS[0]), text.find(TREE_MARKERS[1]))
+            if marker_index != -1:
+                name = text[marker_index + len(TREE_MARKERS[0]):]
+                if not name.endswith('/') and is_ignored(name):
+                    continue
+            yield line
+        elif not skipping:
+            yield line
+
+    if pending_separator is not None and not skipping:
+        yield pending_separator
+
+
+def filter_structure_file(output_file, is_ignored):
+    """Filter a structure dump in place through a temp file and atomic rename"""
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with open(output_file, 'r', encoding='utf-8', newline='') as source, \
+                os.fdopen(fd, 'w', encoding='utf-8', newline='') as target:
+            target.writelines(filter_structure_lines(source, is_ignored))
+        os.replace(temp_path, output_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _manifest_path(output_file):
+    """Return the manifest path kept next to a structure output file"""
+    return f"{os.path.splitext(output_file)[0]}.manifest.json"
+
+
+def _file_hash(file_path):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _rule_hashes(plugin_path, files):
+    """Hash every ignore-rule file among the scanned files"""
+    return {
+        rel_path: _file_hash(os.path.join(plugin_path, rel_path))
+        for rel_path in files
+        if os.path.basename(rel_path) in RULE_FILES
+    }
+
+
+def split_structure(content):
+    """Split a structure dump into its tree header and per-file sections
+
+    Returns:
+        tuple: (tree, sections) where sections maps relative path -> section text
+    """
+    lines = content.split('\n')
+    tree_lines = []
+    sections = {}
+    current_path = None
+    current_lines = None
+    index = 0
+
+    while index < len(lines):
+        line = lines[index]
+        if line == SEPARATOR and index + 1 < len(lines):
+            next_line = lines[index + 1]
+            header_follows = (
+                next_line.startswith("FILE: ")
+                and index + 2 < len(lines)
+                and lines[index + 2] == SEPARATOR
+            )
+            if header_follows:
+                if current_lines is not None:
+                    sections[current_path] = '\n'.join(current_lines)
+                current_path = next_line[len("FILE: "):]
+                current_lines = lines[index:index + 3]
+                index += 3
+                continue
+
+        if current_lines is None:
+            tree_lines.append(line)
+        else:
+            current_lines.append(line)
+        index += 1
+
+    if current_lines is not None:
+        sections[current_path] = '\n'.join(current_lines)
+
+    # The trailing empty line is the blank line gitingest puts between tree and sections
+    return '\n'.join(tree_lines), sections
+
+
+def digest_body(raw):
+    """Render file bytes as the body of a gitingest-style section"""
+    if not raw:
+        return "[Empty file]"
+    try:
+        raw[:8192].decode('utf-8')
+        return raw.decode('utf-8', errors='replace')
+    except UnicodeDecodeError:
+        return "[Binary file]"
+
+
+def _section(rel_path, body):
+    return '\n'.join([SEPARATOR, f"FILE: {rel_path}", SEPARATOR, body]) + '\n\n'
+
+
+def _digest_file(plugin_path, rel_path):
+    """Render one file as a gitingest-style section"""
+    full_path = os.path.join(plugin_path, rel_path)
+    try:
+        with open(full_path, 'rb') as f:
+            body = digest_body(f.read())
+    except OSError:
+        body = "Error reading file"
+    return _section(rel_path, body)
+
+
+def _gitingest_ignore_matcher():
+    """Match paths gitingest leaves out by default (images, lock files, ...)"""
+    try:
+        from gitingest.utils.ignore_patterns import DEFAULT_IGNORE_PATTERNS
+    except ImportError:
+        return lambda rel_path: False
+    import pathspec
+    spec = pathspec.GitIgnoreSpec.from_lines(sorted(DEFAULT_IGNORE_PATTERNS))
+    return spec.match_file
+
+
+def _assemble_code_structure(plugin_path, output_file, file_filter, included):
+    """Build the structure from per-file blobs instead of running gitingest
+
+    The output matches a gitingest pass over the same files. Every file is
+    hashed; its digested text and token count come from the blob store and
+    are only computed for content no plugin had before.
+    """
+    from utils.blob_store import get_blob_store, hash_bytes
+    from utils.token_counter import ENCODING_NAME, get_encoding, count_tokens_by_section, remember_count
+
+    store = get_blob_store()
+    token_field = f"tokens:{ENCODING_NAME}"
+    try:
+        print_progress("Assembling code structure from the blob store", "1/2")
+        is_ignored = _gitingest_ignore_matcher()
+        max_file_size = file_filter.max_file_size or GITINGEST_MAX_FILE_SIZE
+        paths = sorted(
+            (rel_path for rel_path, (size, _) in included.items()
+             if size <= max_file_size and not is_ignored(rel_path)),
+            key=path_sort_key
+        )
+
+        blobs = {}
+        new_blobs = set()
+        with timed("blob_digest"):
+            for rel_path in paths:
+                with open(os.path.join(plugin_path, rel_path), 'rb') as f:
+                    raw = f.read()
+                digest = hash_bytes(raw)
+                body = store.get(digest, "text")
+                if body is None:
+                    body = digest_body(raw)
+                    store.put(digest, "text", body)
+                    new_blobs.add(digest)
+                blobs[rel_path] = (digest, body)
+
+        root_line = f"└── {os.path.basename(os.path.abspath(plugin_path))}/"
+        content = render_tree(root_line, paths) + '\n' + '\n'.join(
+            _section(rel_path, body) for rel_path, (_, body) in blobs.items()
+        )
+
+        # Token counts of unseen blobs are computed in one batch; only exact counts are stored
+        print_progress("Counting tokens of new files", "2/2")
+        with timed("blob_tokens"):
+            counts = {digest: store.get(digest, token_field) for digest, _ in blobs.values()}
+            missing = {digest: body for digest, body in blobs.values() if counts[digest] is None}
+            if missing:
+                counts.update(count_tokens_by_section(missing))
+                if get_encoding() is not None:
+                    for digest in missing:
+                        store.put(digest, token_field, counts[digest])
+            # Seed the section counts used by count_structure_tokens: header and padding plus stored body
+            _, sections = split_structure(content)
+            for rel_path, text in sections.items():
+                digest, body = blobs[rel_path]
+                prefix = '\n'.join([SEPARATOR, f"FILE: {rel_path}", SEPARATOR]) + '\n'
+                if text.startswith(prefix + body):
+                    frame = prefix + text[len(prefix) + len(body):]
+                    remember_count(text, count_tokens_by_section({"": frame})[""] + counts[digest])
+
+        write_if_changed(output_file, content)
+    except Exception as e:
+        print_error(f"Failed to assemble code structure: {e}")
+        return None
+
+    print_success(f"Code structure assembled from {len({digest for digest, _ in blobs.values()})} unique files "
+                  f"({len(new_blobs)} new)")
+    print_info(f"Output file: {output_file}")
+    return content
+
+
+def path_sort_key(rel_path):
+    """Sort key reproducing gitingest's ordering (README, files, hidden files, dirs)"""
+    parts = rel_path.lower().split('/')
+    key = []
+    for part in parts[:-1]:
+        key.append((4 if part.startswith('.') else 3, part))
+    name = parts[-1]
+    if name == "readme" or name.startswith("readme."):
+        key.append((0, name))
+    else:
+        key.append((2 if name.startswith('.') else 1, name))
+    return key
+
+
+def render_tree(root_line, paths):
+    """Render a gitingest-style directory tree for the given file paths"""
+    root = {}
+    for rel_path in paths:
+        node = root
+        parts = rel_path.split('/')
+        for part in parts[:-1]:
+            node = node.setdefault(part + '/', {})
+        node[parts[-1]] = None
+
+    def sort_key(name):
+        is_dir = name.endswith('/')
+        plain = name.rstrip('/').lower()
+        if is_dir:
+            return (4 if plain.startswith('.') else 3, plain)
+        if plain == "readme" or plain.startswith("readme."):
+            return (0, plain)
+        return (2 if plain.startswith('.') else 1, plain)
+
+    lines = ["Directory structure:", root_line]
+
+    def render(node, prefix):
+        names = sorted(node, key=sort_key)
+        for i, name in enumerate(names):
+            is_last = i == len(names) - 1
+            lines.append(f"{prefix}{'└── ' if is_last else '├── '}{name}")
+            if node[name]:
+                render(node[name], prefix + ("    " if is_last else "│   "))
+
+    render(root, "    ")
+    return '\n'.join(lines) + '\n'
+
+
+def _write_manifest(plugin_path, output_file, content, file_filter, files):
+    """Record per-file size, mtime and content hash after a full run"""
+    _, sections = split_structure(content)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "filter": file_filter.signature(),
+        "files": {},
+        # Files passing our filter that gitingest's own defaults left out; not treated as new next run
+        "excluded": sorted(path for path in files if path not in sections),
+        "rules": _rule_hashes(plugin_path, files)
+    }
+    for rel_path in sections:
+        if rel_path in files:
+            size, mtime_ns = files[rel_path]
+            manifest["files"][rel_path] = {
+                "size": size,
+                "mtime": mtime_ns,
+                "sha256": _file_hash(os.path.join(plugin_path, rel_path))
+            }
+
+    _save_manifest(output_file, manifest)
+
+
+def _save_manifest(output_file, manifest):
+    """Write the manifest atomically, so an interrupted run never leaves a truncated one"""
+    write_if_changed(_manifest_path(output_file), json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def _update_code_structure(plugin_path, output_file):
+    """Splice changed files into the cached structure
+
+    Returns:
+        str: The updated structure, or None if a full run is required
+    """
+    manifest_file = _manifest_path(output_file)
+    if not os.path.exists(manifest_file) or not os.path.exists(output_file):
+        print_info("No structure manifest found, running full analysis")
+        return None
+
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    file_filter = FileFilter(plugin_path)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("filter") != file_filter.signature():
+        print_info("Structure manifest is outdated, running full analysis")
+        return None
+
+    print_progress("Checking for changed files", "1/3")
+    known = manifest["files"]
+    excluded = set(manifest.get("excluded", []))
+    # Files excluded by size or content since the last run show up as deleted
+    current, _ = file_filter.scan(
+        known={rel_path: (entry["size"], entry["mtime"]) for rel_path, entry in known.items()}
+    )
+
+    changed, added = [], []
+    for rel_path, (size, mtime_ns) in current.items():
+        entry = known.get(rel_path)
+        if entry is None:
+            if rel_path not in excluded:
+                added.append(rel_path)
+            continue
+        if entry["size"] == size and entry["mtime"] == mtime_ns:
+            continue
+        # Only hash files whose metadata changed; touched-but-identical files are not re-digested
+        content_hash = _file_hash(os.path.join(plugin_path, rel_path))
+        entry["size"], entry["mtime"] = size, mtime_ns
+        if content_hash != entry["sha256"]:
+            entry["sha256"] = content_hash
+            changed.append(rel_path)
+    deleted = [rel_path for rel_path in known if rel_path not in current]
+
+    # A full run leaves out gitingest's default patterns (lock files, images, ...); so does an update
+    is_ignored = _gitingest_ignore_matcher()
+    ignored = [rel_path for rel_path in added + changed if is_ignored(rel_path)]
+    if ignored:
+        added = [rel_path for rel_path in added if rel_path not in ignored]
+        changed = [rel_path for rel_path in changed if rel_path not in ignored]
+        deleted += [rel_path for rel_path in ignored if rel_path in known]
+        manifest["excluded"] = sorted(excluded.union(ignored))
+
+    if _rule_hashes(plugin_path, current) != manifest.get("rules", {}):
+        print_info("Ignore rules changed, running full analysis")
+        return None
+
+    touched = changed + added + deleted
+
+    with open(output_file, 'r', encoding='utf-8') as f:
+        cached_content = f.read()
+
+    if not touched:
+        # Persist refreshed mtimes so the next run skips hashing again
+        _save_manifest(output_file, manifest)
+        print_success("Code structure unchanged, reusing cached output")
+        print_info(f"Output file: {output_file}")
+        return cached_content
+
+    print_progress(
+        f"Re-digesting {len(changed)} changed, {len(added)} added, {len(deleted)} deleted files", "2/3"
+    )
+    tree, sections = split_structure(cached_content)
+
+    for rel_path in deleted:
+        sections.pop(rel_path, None)
+        del known[rel_path]
+    for rel_path in changed + added:
+        sections[rel_path] = _digest_file(plugin_path, rel_path)
+        if rel_path in added:
+            size, mtime_ns = current[rel_path]
+            known[rel_path] = {
+                "size": size,
+                "mtime": mtime_ns,
+                "sha256": _file_hash(os.path.join(plugin_path, rel_path))
+            }
+
+    ordered_paths = sorted(sections, key=path_sort_key)
+    if added or deleted:
+        tree_lines = tree.split('\n')
+        root_line = tree_lines[1] if len(tree_lines) > 1 else f"└── {os.path.basename(os.path.abspath(plugin_path))}/"
+        tree = render_tree(root_line, ordered_paths)
+
+    print_progress("Writing structure", "3/3")
+    content = tree + '\n' + '\n'.join(sections[rel_path] for rel_path in ordered_paths)
+
+    # Structure first: a run stopped in between leaves the old manifest, so the next run re-splices the changes
+    write_if_changed(output_file, content)
+    _save_manifest(output_file, manifest)
+
+    print_success("Code structure updated incrementally!")
+    print_info(f"Output file: {output_file}")
+    return content
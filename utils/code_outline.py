@@ -0,0 +1,343 @@
+"""
+Compact code outline as an alternative to the full code structure
+
+Instead of whole file bodies, the outline sends what the documentation is
+written from. For Python files (parsed with ``ast``) that is the module
+docstring, class and public function signatures, third-party imports,
+credential keys and the hosts contacted over HTTP. For tool and provider
+YAML files it is the declaration with English labels only and one line per
+parameter or credential field. Dependency files are kept as they are; other
+files only appear in the directory tree.
+
+Outlines are kept in the blob store by file content hash, so unchanged
+files are not parsed again, across runs and across plugins.
+"""
+import os
+import re
+import ast
+import sys
+from utils.formatting import print_error, print_info, print_progress, print_success, print_warning
+from utils.file_filter import collect_exclusions
+from utils.code_analyzer import SEPARATOR, path_sort_key, render_tree
+from utils.manifest_handler import parse_yaml
+from utils.file_operations import write_if_changed
+from utils.blob_store import get_blob_store, hash_bytes
+from utils.metrics import timed
+
+# Bump when the outline format changes so cached outlines are rebuilt
+OUTLINE_VERSION = 1
+
+# Files sent verbatim: they list the plugin's dependencies
+VERBATIM_FILES = {"requirements.txt", "pyproject.toml"}
+
+# Longest docstring kept in full; longer ones are cut after their first paragraph
+MAX_DOCSTRING_CHARS = 400
+
+# YAML keys that carry nothing the documentation needs
+YAML_DROP_KEYS = {"icon", "icon_dark", "background", "placeholder"}
+
+# Keys of a field spec summarized on the field's line, in this order
+FIELD_KEYS = ("type", "required", "form", "default", "scope")
+
+# Keys holding a field list or mapping, e.g. tool parameters and provider credentials
+FIELD_SECTIONS = {"parameters", "credentials_for_provider", "credential_form_schemas", "settings"}
+
+# Underscore methods the Dify plugin SDK calls; other private helpers are only listed by name
+SDK_HOOKS = {
+    "_invoke", "_validate_credentials", "_get_runtime_parameters", "_oauth_get_authorization_url",
+    "_oauth_get_credentials", "_oauth_refresh_credentials", "_invoke_error_mapping", "_get_num_tokens",
+    "_get_customizable_model_schema", "_invoke_endpoint",
+}
+
+# Sent instead of the outline of a YAML file that the manifest index already covers
+INDEXED_NOTE = "(Declaration indexed under \"plugins\" in manifest_info)"
+
+URL_HOST_RE = re.compile(r"https?://([A-Za-z0-9.-]+(?::\d+)?)")
+
+# I18n objects in Dify YAML files, e.g. {"en_US": ..., "zh_Hans": ...}
+LOCALE_KEY_RE = re.compile(r"^[a-z]{2}_[A-Za-z]+$")
+
+def _first_paragraph(docstring):
+    docstring = docstring.strip()
+    if len(docstring) > MAX_DOCSTRING_CHARS:
+        docstring = docstring.split("\n\n", 1)[0][:MAX_DOCSTRING_CHARS].rstrip()
+    return docstring
+
+
+def _signature(node):
+    """Render ``def name(args) -> returns`` for a function node"""
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _outline_body(nodes, indent, lines):
+    """Append the classes, functions and annotated fields among ``nodes``"""
+    helpers = []
+    for node in nodes:
+        if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("_")
+                and not node.name.endswith("__") and node.name not in SDK_HOOKS):
+            helpers.append(node.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            for decorator in node.decorator_list:
+                lines.append(f"{indent}@{ast.unparse(decorator)}")
+            if isinstance(node, ast.ClassDef):
+                bases = ", ".join(ast.unparse(base) for base in node.bases + node.keywords)
+                lines.append(f"{indent}class {node.name}({bases}):" if bases else f"{indent}class {node.name}:")
+            else:
+                lines.append(f"{indent}{_signature(node)}")
+            docstring = ast.get_docstring(node)
+            if docstring:
+                lines.append(f'{indent}    """{docstring.strip().splitlines()[0]}"""')
+            if isinstance(node, ast.ClassDef):
+                _outline_body(node.body, indent + "    ", lines)
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and indent:
+            # Class fields, e.g. of dataclasses and pydantic models
+            lines.append(f"{indent}{node.target.id}: {ast.unparse(node.annotation)}")
+    if helpers:
+        lines.append(f"{indent}# private helpers: {', '.join(helpers)}")
+
+
+def _credential_keys(tree):
+    """Return the keys read from ``...credentials[...]`` and ``...credentials.get(...)``"""
+    keys = set()
+    for node in ast.walk(tree):
+        target, key = None, None
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant):
+            target, key = node.value, node.slice.value
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "get"
+              and node.args and isinstance(node.args[0], ast.Constant)):
+            target, key = node.func.value, node.args[0].value
+        if not isinstance(key, str) or target is None:
+            continue
+        name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+        if "credential" in name.lower():
+            keys.add(key)
+    return sorted(keys)
+
+
+def _http_hosts(tree):
+    """Return the hosts of all http(s) URLs in string literals, f-strings included"""
+    hosts = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            hosts.update(URL_HOST_RE.findall(node.value))
+    return sorted(hosts)
+
+
+def outline_python(source):
+    """Outline a Python module
+
+    Args:
+        source (str): Module source code
+
+    Returns:
+        str: The outline, or None if the source does not parse
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = []
+    docstring = ast.get_docstring(tree)
+    if docstring:
+        lines.append(f'"""{_first_paragraph(docstring)}"""')
+
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.add(node.module.split(".")[0])
+    # Third-party packages hint at the services and data flows; the standard library does not
+    imports -= set(getattr(sys, "stdlib_module_names", ())) | {"__future__"}
+    if imports:
+        lines.append(f"# imports: {', '.join(sorted(imports))}")
+    credential_keys = _credential_keys(tree)
+    if credential_keys:
+        lines.append(f"# credentials used: {', '.join(credential_keys)}")
+    hosts = _http_hosts(tree)
+    if hosts:
+        lines.append(f"# HTTP hosts: {', '.join(hosts)}")
+
+    _outline_body(tree.body, "", lines)
+    return "\n".join(lines)
+
+
+def _simplify_yaml(value):
+    """Keep only English texts and drop presentation-only keys"""
+    if isinstance(value, dict):
+        if value and all(isinstance(key, str) and LOCALE_KEY_RE.match(key) for key in value):
+            return _simplify_yaml(value.get("en_US", next(iter(value.values()))))
+        return {key: _simplify_yaml(item) for key, item in value.items() if key not in YAML_DROP_KEYS}
+    if isinstance(value, list):
+        return [_simplify_yaml(item) for item in value]
+    return value
+
+
+def _describe_field(spec):
+    """Summarize a parameter or credential spec on one line"""
+    if not isinstance(spec, dict):
+        return spec
+    details = []
+    for key in FIELD_KEYS:
+        if key not in spec:
+            continue
+        if key == "required":
+            details.append("required" if spec[key] else "optional")
+        else:
+            details.append(f"{key}={spec[key]}")
+    options = spec.get("options")
+    if isinstance(options, list) and options:
+        values = [str(option.get("value", option)) if isinstance(option, dict) else str(option) for option in options]
+        details.append(f"options={'|'.join(values)}")
+    description = (spec.get("human_description") or spec.get("llm_description") or spec.get("help")
+                   or spec.get("label") or spec.get("description"))
+    text = ", ".join(details)
+    if isinstance(description, str) and description.strip():
+        text = f"{text} - {description.strip()}" if text else description.strip()
+    return text
+
+
+def _outline_fields(value):
+    """Collapse field lists and mappings into ``{name: one-line summary}``"""
+    if isinstance(value, dict):
+        return {key: _describe_field(spec) for key, spec in value.items()}
+    if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+        fields = {}
+        for index, item in enumerate(value):
+            name = item.get("name") or item.get("variable") or f"#{index}"
+            fields[name] = _describe_field(item)
+        return fields
+    return value
+
+
+def _outline_yaml_value(value):
+    if isinstance(value, dict):
+        if set(value) == {"human", "llm"}:
+            # Tool descriptions: the human one is what users read, the llm one repeats it for the model
+            return value["human"]
+        return {
+            key: _outline_fields(item) if key in FIELD_SECTIONS else _outline_yaml_value(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_outline_yaml_value(item) for item in value]
+    return value
+
+
+def outline_yaml(source):
+    """Outline a Dify YAML declaration (manifest, provider, tool, endpoint, model)
+
+    Args:
+        source (str): YAML text
+
+    Returns:
+        str: The outline, or None if the YAML does not parse
+    """
+    import yaml
+
+    try:
+        data = parse_yaml(source)
+    except yaml.YAMLError:
+        return None
+    if not isinstance(data, (dict, list)):
+        return None
+    data = _outline_yaml_value(_simplify_yaml(data))
+    # libyaml's dumper is several times faster when PyYAML was built with it
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(data, Dumper=dumper, sort_keys=False, allow_unicode=True, default_flow_style=False,
+                     width=1000).rstrip()
+
+
+def outline_source(rel_path, source):
+    """Outline one file by type
+
+    Returns:
+        str: The outline, the source itself for dependency files, or None for
+        files that only appear in the directory tree
+    """
+    name = rel_path.rsplit("/", 1)[-1].lower()
+    if name in VERBATIM_FILES:
+        return source.strip()
+    if name.endswith(".py"):
+        outline = outline_python(source)
+    elif name.endswith((".yaml", ".yml")):
+        outline = outline_yaml(source)
+    else:
+        return None
+    if outline is None:
+        # Unparseable files are sent whole rather than dropped
+        print_warning(f"Could not parse {rel_path}, sending it in full")
+        return source
+    return outline
+
+
+def outline_file(plugin_path, rel_path):
+    """Outline a plugin file, reusing the stored outline when its content was seen before
+
+    Returns:
+        str: The outline, or None if the file is not outlined
+    """
+    name = rel_path.rsplit("/", 1)[-1].lower()
+    if name in VERBATIM_FILES:
+        kind = "verbatim"
+    elif name.endswith(".py"):
+        kind = "python"
+    elif name.endswith((".yaml", ".yml")):
+        kind = "yaml"
+    else:
+        return None
+    with open(os.path.join(plugin_path, rel_path), "rb") as f:
+        raw = f.read()
+
+    # Stored under the content hash, so identical files share the outline across plugins
+    return get_blob_store().get(
+        hash_bytes(raw), f"outline:{kind}:v{OUTLINE_VERSION}",
+        lambda: outline_source(rel_path, raw.decode("utf-8", errors="replace"))
+    )
+
+
+def generate_code_outline(plugin_path, output_file, indexed_files=None):
+    """Write a compact outline of the plugin in the code structure format
+
+    The output has the same directory tree and ``FILE:`` sections as the
+    gitingest structure, so token counting and packing work unchanged.
+
+    Args:
+        plugin_path (str): Path to the plugin source directory
+        output_file (str): Path of the ``<name>_outline.txt`` output
+        indexed_files (list): YAML files already described by the manifest
+            index (``manifest_info["plugin_files"]``); only a pointer is sent for them
+
+    Returns:
+        str: The outline, or None on failure
+    """
+    print_progress("Outlining code structure")
+    try:
+        with timed("exclusions"):
+            _, included, _ = collect_exclusions(plugin_path)
+
+        sections = []
+        with timed("outline"):
+            paths = sorted(included, key=path_sort_key)
+            indexed_files = set(indexed_files or ())
+            for rel_path in paths:
+                if rel_path in indexed_files:
+                    outline = INDEXED_NOTE
+                else:
+                    outline = outline_file(plugin_path, rel_path)
+                if outline is not None:
+                    sections.append("\n".join([SEPARATOR, f"FILE: {rel_path}", SEPARATOR, outline]) + "\n\n")
+
+        root_line = f"└── {os.path.basename(os.path.abspath(plugin_path))}/"
+        content = render_tree(root_line, paths) + "\n" + "".join(sections)
+        write_if_changed(output_file, content)
+    except Exception as e:
+        print_error(f"Failed to outline code structure: {e}")
+        return None
+
+    print_success(f"Code outline generated for {len(sections)} of {len(included)} files")
+    print_info(f"Output file: {output_file}")
+    return content
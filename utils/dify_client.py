@@ -0,0 +1,132 @@
+"""
+Pooled HTTP client for the Dify API
+
+A single ``requests.Session`` is shared by all calls in the process, so
+attempts, retries and concurrent batch workers reuse kept-alive connections
+instead of doing a TCP and TLS handshake per request.
+"""
+import os
+import gzip
+import json
+import threading
+from utils.metrics import count
+
+# Timeout for connecting and for each read of a streaming request (not the whole stream)
+REQUEST_TIMEOUT = 60 * 10
+
+# Request bodies smaller than this are sent uncompressed even when gzip is enabled
+GZIP_MIN_BYTES = 16 * 1024
+
+
+def env_flag(name, default="false"):
+    """Read a boolean setting from the environment"""
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_size_for(concurrency, streams_per_plugin=1):
+    """Return the connections needed to keep every concurrent stream on a pooled connection
+
+    Args:
+        concurrency (int): Plugins processed at the same time
+        streams_per_plugin (int): Streams one plugin opens at once (2 in split mode)
+
+    Returns:
+        int: ``DIFY_POOL_SIZE`` if set, otherwise ``concurrency * streams_per_plugin``
+    """
+    override = int(os.getenv("DIFY_POOL_SIZE") or 0)
+    return override or max(1, concurrency) * max(1, streams_per_plugin)
+
+
+def encode_request_body(data, compress=False):
+    """Serialize a request body, gzip-compressing it if enabled and worthwhile
+
+    Args:
+        data (dict): JSON request body
+        compress (bool): Whether large bodies may be gzip-compressed
+
+    Returns:
+        tuple: (body bytes, extra headers)
+    """
+    body = json.dumps(data).encode("utf-8")
+    if compress and len(body) >= GZIP_MIN_BYTES:
+        body, headers = gzip.compress(body, compresslevel=6), {"Content-Encoding": "gzip"}
+    else:
+        headers = {}
+    count("request_bytes", len(body))
+    return body, headers
+
+
+class DifyClient:
+    """Blocking Dify API client owning a pooled, kept-alive session
+
+    Args:
+        base_url (str): API base URL (default: ``DIFY_BASE_URL``)
+        api_key (str): API key (default: ``DIFY_API_KEY``)
+        pool_size (int): Connections kept per host (default: ``DIFY_POOL_SIZE`` or 10)
+        keep_alive (bool): Reuse connections between requests (default: ``DIFY_KEEP_ALIVE``)
+        compress (bool): Gzip large request bodies (default: ``DIFY_GZIP_REQUESTS``)
+    """
+
+    def __init__(self, base_url=None, api_key=None, pool_size=None, keep_alive=None, compress=None):
+        self.base_url = base_url or os.getenv("DIFY_BASE_URL", "https://api.dify.ai/v1")
+        self.api_key = api_key or os.getenv("DIFY_API_KEY")
+        self.pool_size = pool_size or int(os.getenv("DIFY_POOL_SIZE") or 10)
+        self.keep_alive = env_flag("DIFY_KEEP_ALIVE", "true") if keep_alive is None else keep_alive
+        self.compress = env_flag("DIFY_GZIP_REQUESTS") if compress is None else compress
+        self.endpoint = f"{self.base_url}/chat-messages"
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        if not self.keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def post_chat_message(self, data, timeout=None):
+        """Send a streaming chat-messages request
+
+        Args:
+            data (dict): Request body
+            timeout (float): Connect and read timeout (default: ``REQUEST_TIMEOUT``)
+
+        Returns:
+            requests.Response: The response, with the body not yet read
+        """
+        body, headers = encode_request_body(data, self.compress)
+        return self.session.post(
+            self.endpoint,
+            data=body,
+            headers=headers,
+            stream=True,  # Enable streaming
+            timeout=timeout or REQUEST_TIMEOUT
+        )
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_dify_client(pool_size=None):
+    """Return the client shared by all blocking API calls to the configured Dify app
+
+    Args:
+        pool_size (int): Connections the caller needs, e.g. from ``pool_size_for``;
+            a shared client with a smaller pool is replaced by a larger one
+    """
+    key = (os.getenv("DIFY_BASE_URL", "https://api.dify.ai/v1"), os.getenv("DIFY_API_KEY"))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or (pool_size and client.pool_size < pool_size):
+            _clients[key] = DifyClient(base_url=key[0], api_key=key[1], pool_size=pool_size)
+        return _clients[key]
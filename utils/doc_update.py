@@ -0,0 +1,267 @@
+"""
+Diff-aware updates of previously generated documentation
+
+After every complete generation, a snapshot of the code payload and the
+manifest information it was made from is saved next to the generated
+documents. In update mode the current payload is compared with that snapshot
+file by file. Dify then receives only unified diffs of the changed files,
+the manifest delta and the current README and PRIVACY, and is asked for a
+revision instead of documents written from scratch. Sections the revision
+leaves unchanged are written back byte-identical.
+"""
+import os
+import re
+import json
+import difflib
+import hashlib
+from utils.formatting import print_info, print_warning
+from utils.code_analyzer import split_structure, path_sort_key
+from utils.file_operations import write_if_changed, save_documentation_file
+from utils.stream_extractor import DOCUMENTS
+
+# Bump when the snapshot layout changes so old snapshots trigger a full generation
+SNAPSHOT_VERSION = 1
+
+# Unchanged lines shown around each change in the file diffs
+DIFF_CONTEXT_LINES = 3
+
+# Sent instead of the code diff or manifest delta when only the other one changed
+NO_CODE_CHANGES = "(No file changed since the documentation was generated.)"
+NO_MANIFEST_CHANGES = "(The manifest information is unchanged.)"
+
+HEADING_RE = re.compile(r"^#{1,6}\s")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+def snapshot_path(plugin_dir, name):
+    """Return the snapshot path kept next to the generated documents"""
+    return os.path.join(plugin_dir, f"{name}_snapshot.json")
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(plugin_dir, manifest_info, code_structure, payload_format):
+    """Record the payload a complete generation was made from
+
+    Args:
+        plugin_dir (str): Directory of the generated documents
+        manifest_info (dict): Manifest information sent with the request
+        code_structure (str): Full (unpacked) code structure or outline
+        payload_format (str): "structure" or "outline"; snapshots only diff
+            against payloads of the same format
+
+    Returns:
+        bool: True if the snapshot was saved
+    """
+    _, sections = split_structure(code_structure)
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "format": payload_format,
+        "manifest_info": manifest_info,
+        "files": {rel_path: {"sha256": _hash(text), "section": text} for rel_path, text in sections.items()},
+    }
+    try:
+        write_if_changed(snapshot_path(plugin_dir, manifest_info["name"]),
+                         json.dumps(snapshot, indent=1, sort_keys=True, ensure_ascii=False))
+        return True
+    except OSError as e:
+        print_warning(f"Failed to save generation snapshot: {e}")
+        return False
+
+
+def load_snapshot(plugin_dir, name, payload_format):
+    """Load the snapshot of the last complete generation
+
+    Returns:
+        dict: The snapshot, or None if there is none for this payload format
+    """
+    path = snapshot_path(plugin_dir, name)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        print_info("No snapshot of an earlier generation found")
+        return None
+    except (OSError, ValueError) as e:
+        print_warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("format") != payload_format:
+        print_info("The last generation used another payload format")
+        return None
+    return snapshot
+
+
+def read_documents(plugin_path, plugin_dir):
+    """Read the current documents, preferring the copies in the plugin source
+
+    Returns:
+        dict: Document key -> markdown content, for the documents that exist
+    """
+    documents = {}
+    for key, filename, _, _, _ in DOCUMENTS:
+        for directory in (plugin_path, plugin_dir):
+            try:
+                with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            if content.strip():
+                documents[key] = content
+                break
+    return documents
+
+
+def _unified_diff(before, after, from_file, to_file):
+    # Sections don't end with a newline; without one the last lines of both sides would run together
+    before = (before + "\n").splitlines(True) if before else []
+    after = (after + "\n").splitlines(True) if after else []
+    return "".join(difflib.unified_diff(before, after, from_file, to_file, n=DIFF_CONTEXT_LINES))
+
+
+def diff_structure(snapshot, code_structure):
+    """Diff the current code payload against a snapshot, file by file
+
+    Returns:
+        tuple: (diff, changed) where diff holds one unified diff per added,
+        changed or deleted file and changed lists their relative paths
+    """
+    _, sections = split_structure(code_structure)
+    known = snapshot["files"]
+    parts, changed = [], []
+    for rel_path in sorted(set(known) | set(sections), key=path_sort_key):
+        entry = known.get(rel_path)
+        section = sections.get(rel_path)
+        if entry and section is not None and entry["sha256"] == _hash(section):
+            continue
+        parts.append(_unified_diff(
+            entry["section"] if entry else "", section or "",
+            f"a/{rel_path}" if entry else "/dev/null", f"b/{rel_path}" if section is not None else "/dev/null"
+        ))
+        changed.append(rel_path)
+    return "".join(parts), changed
+
+
+def diff_manifest(previous_info, manifest_info):
+    """Return a unified diff of the manifest information, or "" if it is unchanged"""
+    def dump(info):
+        return json.dumps(info, indent=2, sort_keys=True, ensure_ascii=False)
+    return _unified_diff(dump(previous_info), dump(manifest_info), "a/manifest_info", "b/manifest_info")
+
+
+def prepare_update(plugin_path, plugin_dir, manifest_info, code_structure, payload_format):
+    """Compare the plugin with its last complete generation
+
+    Args:
+        plugin_path (str): Path to the plugin source directory
+        plugin_dir (str): Directory of the generated documents
+        manifest_info (dict): Current manifest information
+        code_structure (str): Current full code structure or outline
+        payload_format (str): "structure" or "outline"
+
+    Returns:
+        dict: ``documents`` (key -> current markdown), ``code_diff``,
+        ``manifest_delta`` (both "" when unchanged) and ``changed`` (relative
+        paths), or None if the documents must be generated from scratch
+    """
+    snapshot = load_snapshot(plugin_dir, manifest_info["name"], payload_format)
+    if snapshot is None:
+        return None
+    documents = read_documents(plugin_path, plugin_dir)
+    missing = [label for key, _, label, _, _ in DOCUMENTS if key not in documents]
+    if missing:
+        print_info(f"No existing {' or '.join(missing)} to revise")
+        return None
+
+    code_diff, changed = diff_structure(snapshot, code_structure)
+    manifest_delta = diff_manifest(snapshot["manifest_info"], manifest_info)
+    if len(code_diff) + len(manifest_delta) >= len(code_structure):
+        print_info("The changes are as large as the code itself")
+        return None
+    return {
+        "documents": documents,
+        "code_diff": code_diff,
+        "manifest_delta": manifest_delta,
+        "changed": changed,
+    }
+
+
+def build_update_query(documents):
+    """Build the query asking for a revision of the current documents
+
+    Args:
+        documents (dict): Document key -> current markdown content
+
+    Returns:
+        str: Query carrying the documents to revise
+    """
+    parts = [
+        "The code of this Dify plugin changed since the documentation below was written. "
+        "code_files holds the changes as unified diffs of the changed files, and manifest_info "
+        "the changes to the manifest information. Revise the documents so they reflect these changes. "
+        "Only change the parts the changes affect and keep all other text exactly as it is. "
+        "Return each complete revised document wrapped in the same tags as below and nothing else."
+    ]
+    for key, _, _, open_tag, close_tag in DOCUMENTS:
+        if key in documents:
+            parts.append(f"{open_tag}\n{documents[key]}\n{close_tag}")
+    return "\n\n".join(parts)
+
+
+def _split_sections(markdown):
+    """Split markdown at headings outside code blocks into (heading, text) pairs"""
+    sections = []
+    heading, lines = None, []
+    in_fence = False
+    for line in markdown.splitlines(True):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and HEADING_RE.match(line):
+            sections.append((heading, "".join(lines)))
+            heading, lines = line.strip(), []
+        lines.append(line)
+    sections.append((heading, "".join(lines)))
+    return sections
+
+
+def merge_unchanged_sections(previous, revised):
+    """Keep the previous text of every section the revision did not really change
+
+    Sections are matched by heading. When a revised section differs from the
+    previous one only in whitespace, the previous text is kept as it was.
+
+    Returns:
+        str: The revised document with unchanged sections byte-identical
+    """
+    def normalize(text):
+        return " ".join(text.split())
+
+    if normalize(previous) == normalize(revised):
+        return previous
+    previous_sections = {}
+    for heading, text in _split_sections(previous):
+        previous_sections.setdefault(heading, text)
+    merged = []
+    for heading, text in _split_sections(revised):
+        old_text = previous_sections.get(heading)
+        merged.append(old_text if old_text is not None and normalize(old_text) == normalize(text) else text)
+    return "".join(merged)
+
+
+def keep_unchanged_sections(api_response, documents, plugin_dir):
+    """Restore unchanged sections in the revised documents of an update response
+
+    Args:
+        api_response (dict): Response from ``call_dify_api``; contents are updated in place
+        documents (dict): Document key -> markdown the revision was made from
+        plugin_dir (str): Directory the revised documents were saved to
+    """
+    for key, filename, label, _, _ in DOCUMENTS:
+        revised = api_response.get(f"{key}_content")
+        if not revised or key not in documents:
+            continue
+        merged = merge_unchanged_sections(documents[key], revised)
+        if merged != revised:
+            api_response[f"{key}_content"] = merged
+            save_documentation_file(plugin_dir, filename, merged, label)
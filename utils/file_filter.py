@@ -0,0 +1,221 @@
+"""
+Pre-ingest file exclusion utilities
+
+Decides which plugin files gitingest should never read: the documents this
+tool writes back into the plugin, ignored extensions, glob patterns,
+``.gitignore``/``.difyignore`` rules, oversized files and binary files.
+Rule-based checks only look at paths, so matching files are never opened;
+only the remaining candidates are stat'ed and sniffed.
+"""
+import os
+import hashlib
+from utils.formatting import print_info
+
+# Ignore files read from the plugin root (gitwildmatch syntax)
+IGNORE_FILES = (".gitignore", ".difyignore")
+
+# Directories never worth walking (gitingest ignores them too)
+SKIP_DIRECTORIES = {".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+DEFAULT_IGNORE_EXTENSIONS = ".min.js,.min.css,.map,.lock"
+
+# Documents generated into the plugin root (README.md, PRIVACY_<locale>.md, ...); analyzing
+# them would make every run's payload depend on the previous run's answer
+GENERATED_DOC_PATTERNS = ["/README.md", "/PRIVACY.md", "/README_*.md", "/PRIVACY_*.md"]
+
+
+class FileFilter:
+    """Exclusion rules for one plugin directory
+
+    Settings default to the ``IGNORE_EXTENSIONS``, ``IGNORE_PATTERNS``,
+    ``MAX_FILE_SIZE_KB`` and ``BINARY_SNIFF_BYTES`` environment variables.
+    """
+
+    def __init__(self, plugin_path, ignore_extensions=None, ignore_patterns=None,
+                 max_file_size=None, sniff_bytes=None):
+        self.plugin_path = plugin_path
+        if ignore_extensions is None:
+            ignore_extensions = os.getenv("IGNORE_EXTENSIONS", DEFAULT_IGNORE_EXTENSIONS)
+        if ignore_patterns is None:
+            ignore_patterns = os.getenv("IGNORE_PATTERNS", "")
+        if max_file_size is None:
+            max_file_size = int(os.getenv("MAX_FILE_SIZE_KB", "512")) * 1024
+        if sniff_bytes is None:
+            sniff_bytes = int(os.getenv("BINARY_SNIFF_BYTES", "8192"))
+
+        self.extensions = sorted({
+            ext.strip().lower() if ext.strip().startswith('.') else f".{ext.strip().lower()}"
+            for ext in ignore_extensions.split(',')
+            if ext.strip()
+        })
+        self.globs = sorted({pattern.strip() for pattern in ignore_patterns.split(',') if pattern.strip()})
+        self.rule_lines = _read_ignore_files(plugin_path)
+        self.max_file_size = max_file_size
+        self.sniff_bytes = sniff_bytes
+
+        self._suffixes = tuple(self.extensions)
+        import pathspec
+        self._spec = pathspec.GitIgnoreSpec.from_lines(GENERATED_DOC_PATTERNS + self.globs + self.rule_lines)
+
+    def signature(self):
+        """Return a fingerprint of the settings; changes mean earlier results are stale"""
+        digest = hashlib.sha256()
+        for part in (GENERATED_DOC_PATTERNS, self.extensions, self.globs, self.rule_lines,
+                     [self.max_file_size, self.sniff_bytes]):
+            digest.update(repr(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def match_rules(self, rel_path, is_dir=False):
+        """Check a relative POSIX path against extensions, globs and ignore files (no I/O)"""
+        if not is_dir and rel_path.lower().endswith(self._suffixes):
+            return True
+        return self._spec.match_file(f"{rel_path}/" if is_dir else rel_path)
+
+    def exclusion_reason(self, rel_path, size=None):
+        """Return why a file is excluded, or None if it should be ingested
+
+        Args:
+            rel_path (str): Path relative to the plugin root, with forward slashes
+            size (int): File size if already known, to avoid another stat
+
+        Returns:
+            str: "rules", "size" or "binary", or None
+        """
+        if self.match_rules(rel_path):
+            return "rules"
+
+        full_path = os.path.join(self.plugin_path, rel_path)
+        if size is None:
+            size = os.path.getsize(full_path)
+        if self.max_file_size and size > self.max_file_size:
+            return "size"
+        if size and is_binary_file(full_path, self.sniff_bytes):
+            return "binary"
+        return None
+
+    def scan(self, known=None):
+        """Walk the plugin once, pruning excluded directories
+
+        Args:
+            known (dict): Relative path -> (size, mtime_ns) of files included on an
+                earlier run; unchanged ones are not sniffed again
+
+        Returns:
+            tuple: (included, excluded) where included maps relative path ->
+            (size, mtime_ns) and excluded maps relative path -> reason; pruned
+            directories are excluded with a trailing slash
+        """
+        included = {}
+        excluded = {}
+        for current_dir, dirnames, filenames in os.walk(self.plugin_path):
+            rel_dir = os.path.relpath(current_dir, self.plugin_path).replace(os.sep, '/')
+            rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+
+            kept = []
+            for d in dirnames:
+                if d in SKIP_DIRECTORIES:
+                    continue
+                if self.match_rules(f"{rel_dir}{d}", is_dir=True):
+                    excluded[f"{rel_dir}{d}/"] = "rules"
+                else:
+                    kept.append(d)
+            dirnames[:] = kept
+            for filename in filenames:
+                rel_path = f"{rel_dir}{filename}"
+                if self.match_rules(rel_path):
+                    excluded[rel_path] = "rules"
+                    continue
+                full_path = os.path.join(current_dir, filename)
+                if not os.path.isfile(full_path):
+                    continue
+                stat = os.stat(full_path)
+                if known and known.get(rel_path) == (stat.st_size, stat.st_mtime_ns):
+                    included[rel_path] = (stat.st_size, stat.st_mtime_ns)
+                    continue
+                reason = self.exclusion_reason(rel_path, stat.st_size)
+                if reason:
+                    excluded[rel_path] = reason
+                else:
+                    included[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        return included, excluded
+
+    def gitingest_patterns(self, excluded):
+        """Build exclude patterns for ``gitingest.ingest``
+
+        Every path ``scan`` excluded is passed as an anchored pattern, so
+        gitingest reads exactly the files the filter included. Passing the
+        rules themselves would lose their order, and with it ``!`` negations.
+        """
+        return {_anchored_pattern(rel_path) for rel_path in excluded}
+
+
+def is_binary_file(file_path, sniff_bytes=8192):
+    """Guess whether a file is binary from its first ``sniff_bytes`` bytes"""
+    try:
+        with open(file_path, 'rb') as f:
+            chunk = f.read(sniff_bytes)
+    except OSError:
+        return True
+
+    if b'\0' in chunk:
+        return True
+    try:
+        chunk.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still text
+        return e.start < len(chunk) - 3
+    return False
+
+
+def collect_exclusions(plugin_path):
+    """Scan a plugin and report what will be excluded before ingest
+
+    Returns:
+        tuple: (file_filter, included, excluded) as returned by ``FileFilter.scan``
+    """
+    file_filter = FileFilter(plugin_path)
+    included, excluded = file_filter.scan()
+
+    if excluded:
+        reasons = {}
+        for rel_path, reason in excluded.items():
+            key = "directories" if rel_path.endswith("/") else f"files by {reason}"
+            reasons[key] = reasons.get(key, 0) + 1
+        summary = ", ".join(f"{count} {key}" for key, count in sorted(reasons.items()))
+        print_info(f"Excluding before analysis: {summary}")
+
+    return file_filter, included, excluded
+
+
+def _read_ignore_files(plugin_path):
+    """Read pattern lines from the ignore files in the plugin root"""
+    lines = []
+    for filename in IGNORE_FILES:
+        ignore_path = os.path.join(plugin_path, filename)
+        if not os.path.isfile(ignore_path):
+            continue
+        with open(ignore_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    lines.append(line)
+    return lines
+
+
+def _anchored_pattern(rel_path):
+    """Turn a relative path into a gitwildmatch pattern matching only that file
+
+    gitingest splits patterns on commas and whitespace and rewrites
+    backslashes, so those characters are replaced by the single-character
+    wildcard.
+    """
+    escaped = []
+    for char in rel_path:
+        if char in "*?":
+            escaped.append(f"[{char}]")
+        elif char in "[]\\, \t":
+            # Brackets and backslashes cannot be escaped safely through gitingest
+            escaped.append("?")
+        else:
+            escaped.append(char)
+    return "/" + "".join(escaped)
@@ -3,8 +3,75 @@ File and directory operations utilities
 """
 import os
 import sys
+import hashlib
+import secrets
 from pathlib import Path
 from utils.formatting import print_error, print_info, print_success
+from utils.metrics import count
+
+
+def _create_temp_file(path):
+    """Create an empty temporary file next to ``path``
+
+    Created with mode 0o666 so the kernel applies the process umask, exactly
+    as ``open(path, "w")`` would for a new file (``tempfile.mkstemp`` always
+    uses 0o600).
+
+    Returns:
+        tuple: (fd, temp_path)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        temp_path = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(6)}.tmp")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def write_if_changed(path, content):
+    """Write a text file only if its content differs from what is on disk
+
+    The content is written to a temporary file next to the target, which
+    then replaces the target in one step, so readers never see a partial
+    file. An identical existing file is left alone, mtime included, so
+    watchers and packaging steps downstream are not triggered.
+
+    Args:
+        path (str): Target file
+        content (str): Text to write (UTF-8)
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    data = content.encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                    count("files_unchanged")
+                    return False
+        # Keep the permissions of the file being replaced
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = None
+
+    fd, temp_path = _create_temp_file(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    count("files_written")
+    return True
 
 def find_manifest_file(directory):
     """Find manifest.yaml file in the given directory"""
@@ -45,8 +112,7 @@ def create_reminder_file(plugin_dir, plugin_name):
     reminder_path = os.path.join(plugin_dir, "IMPORTANT_NOTE.txt")
     
     try:
-        with open(reminder_path, "w") as f:
-            f.write(f"""IMPORTANT NOTE FOR {plugin_name.upper()} PLUGIN DEVELOPER
+        written = write_if_changed(reminder_path, f"""IMPORTANT NOTE FOR {plugin_name.upper()} PLUGIN DEVELOPER
 =====================================================
 
 The README.md and PRIVACY.md files have been automatically generated 
@@ -70,7 +136,8 @@ For any issues with the generated documentation, please report to the Dify team.
 Generated on: {os.path.basename(__file__)} tool
 =====================================================
 """)
-        print_success(f"Created reminder file: {os.path.basename(reminder_path)}")
+        if written:
+            print_success(f"Created reminder file: {os.path.basename(reminder_path)}")
         return True
     except Exception as e:
         print_error(f"Failed to create reminder file: {e}")
@@ -121,55 +188,53 @@ def save_documentation_file(plugin_dir, filename, content, file_type="markdown")
     cleaned_content = clean_xml_tags(content)
     
     try:
-        with open(file_path, "w") as f:
-            f.write(cleaned_content)
-        print_success(f"Created {file_type} file: {filename}")
+        if write_if_changed(file_path, cleaned_content):
+            print_success(f"Created {file_type} file: {filename}")
+        else:
+            print_info(f"{file_type} file unchanged: {filename}")
         return True
     except Exception as e:
         print_error(f"Failed to create {file_type} file: {e}")
         return False
 
 
-def copy_docs_to_source(plugin_dir, source_dir, readme_success=False, privacy_success=False):
-    """Copy generated documentation files to the source plugin directory
-    
+def localized_filename(filename, locale=None):
+    """Return the file name of a translated document, e.g. README_zh_Hans.md"""
+    if not locale:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{locale}{ext}"
+
+
+def write_docs_to_source(source_dir, readme_content="", privacy_content="", locale=None):
+    """Write generated documentation into the source plugin directory
+
+    The documents are written directly (not copied from the generated
+    plugin directory), and only if they differ from the files already there.
+
     Args:
-        plugin_dir (str): Path to the generated plugin directory
         source_dir (str): Path to the original source plugin directory
-        readme_success (bool): Whether README.md was successfully generated
-        privacy_success (bool): Whether PRIVACY.md was successfully generated
-        
+        readme_content (str): README content; nothing is written if empty
+        privacy_content (str): PRIVACY content; nothing is written if empty
+        locale (str): Write the translated documents of this locale instead
+
     Returns:
-        tuple: (readme_copied, privacy_copied) indicating success status
+        tuple: (readme_written, privacy_written), True if the file in the
+        source directory holds the document, whether it was rewritten or not
     """
-    readme_copied = False
-    privacy_copied = False
-    
-    # Only copy files that were successfully generated
-    if readme_success:
-        readme_src = os.path.join(plugin_dir, "README.md")
-        readme_dst = os.path.join(source_dir, "README.md")
-        
-        if os.path.exists(readme_src):
-            try:
-                import shutil
-                shutil.copy2(readme_src, readme_dst)
-                print_success(f"Copied README.md to source directory: {source_dir}")
-                readme_copied = True
-            except Exception as e:
-                print_error(f"Failed to copy README.md to source directory: {e}")
-    
-    if privacy_success:
-        privacy_src = os.path.join(plugin_dir, "PRIVACY.md")
-        privacy_dst = os.path.join(source_dir, "PRIVACY.md")
-        
-        if os.path.exists(privacy_src):
-            try:
-                import shutil
-                shutil.copy2(privacy_src, privacy_dst)
-                print_success(f"Copied PRIVACY.md to source directory: {source_dir}")
-                privacy_copied = True
-            except Exception as e:
-                print_error(f"Failed to copy PRIVACY.md to source directory: {e}")
-    
-    return readme_copied, privacy_copied
+    results = []
+    for filename, content in (("README.md", readme_content), ("PRIVACY.md", privacy_content)):
+        filename = localized_filename(filename, locale)
+        if not content:
+            results.append(False)
+            continue
+        try:
+            if write_if_changed(os.path.join(source_dir, filename), clean_xml_tags(content)):
+                print_success(f"Wrote {filename} to source directory: {source_dir}")
+            else:
+                print_info(f"{filename} in source directory is up to date")
+            results.append(True)
+        except Exception as e:
+            print_error(f"Failed to write {filename} to source directory: {e}")
+            results.append(False)
+    return tuple(results)
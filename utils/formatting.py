@@ -1,66 +1,244 @@
 """
 Formatting utilities for console output
+
+All ``print_*`` helpers go through one console logger, which supports log
+levels, a quiet mode (warnings and errors only) and a JSON-lines mode for
+machines. Each message is a single write; colors are only used on a
+terminal, and streamed API responses show one refreshing progress line
+instead of a line per chunk.
 """
 
 import os
+import sys
+import json
+import time
+import threading
 try:
     from colorama import init, Fore, Back, Style
-    # Initialize colorama
-    init(autoreset=True)
+    try:
+        from colorama import just_fix_windows_console
+        # Only translates ANSI codes on legacy Windows consoles, no stream wrapping elsewhere
+        just_fix_windows_console()
+    except ImportError:
+        init()
     COLORS_AVAILABLE = True
 except ImportError:
     # If colorama is not available, define dummy color constants
     class DummyFore:
         def __getattr__(self, name):
             return ''
-    
+
     class DummyBack:
         def __getattr__(self, name):
             return ''
-    
+
     class DummyStyle:
         def __getattr__(self, name):
             return ''
-    
+
     Fore = DummyFore()
     Back = DummyBack()
     Style = DummyStyle()
     COLORS_AVAILABLE = False
 
-
-
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# Minimum seconds between redraws of the stream progress line
+PROGRESS_INTERVAL = 0.5
+
+
+class ConsoleLogger:
+    """Leveled console output in text or JSON-lines format
+
+    Args:
+        stream: Output stream (default: ``sys.stdout`` at write time)
+        level (str): Minimum level written: debug, info, warning or error
+        log_format (str): "text" or "json"
+    """
+
+    def __init__(self, stream=None, level="info", log_format="text"):
+        self.stream = stream
+        self.level = LEVELS.get(level, LEVELS["info"])
+        self.log_format = log_format
+        self._lock = threading.Lock()
+        self._progress_shown = False
+        self._streams = {}
+        self._last_draw = 0.0
+
+    @property
+    def output(self):
+        return self.stream or sys.stdout
+
+    @property
+    def interactive(self):
+        try:
+            return self.output.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    @property
+    def colors(self):
+        return COLORS_AVAILABLE and self.interactive and not os.getenv("NO_COLOR")
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def log(self, level, kind, message, color="", prefix=""):
+        """Write one message
+
+        Args:
+            level (str): Log level
+            kind (str): Message kind for JSON output (info, success, progress, ...)
+            message (str): The message
+            color (str): ANSI color prefix for text output
+            prefix (str): Symbol shown before the message in text output
+        """
+        if not self.enabled(level):
+            return
+        if self.log_format == "json":
+            if message.strip():
+                self._write_json({"level": level, "kind": kind, "message": message.strip()})
+            return
+        if self.colors and color:
+            text = f"{color}{prefix}{message}{Style.RESET_ALL}\n"
+        else:
+            text = f"{prefix}{message}\n"
+        with self._lock:
+            self._clear_progress()
+            self.output.write(text)
+            if self.interactive:
+                self.output.flush()
+
+    def stream_progress(self, key, received):
+        """Report ``received`` bytes so far for the stream ``key``
+
+        Text output on a terminal shows one refreshing line with the total
+        over all active streams, redrawn at most every ``PROGRESS_INTERVAL``
+        seconds; other outputs only get the summary from ``end_stream``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            started = self._streams.get(key, (now, 0))[0]
+            self._streams[key] = (started, received)
+            if (self.log_format != "text" or not self.enabled("info")
+                    or now - self._last_draw < PROGRESS_INTERVAL or not self.interactive):
+                return
+            elapsed = now - min(start for start, _ in self._streams.values())
+            if elapsed < PROGRESS_INTERVAL:
+                return
+            self._last_draw = now
+            total = sum(size for _, size in self._streams.values())
+            streams = f"{len(self._streams)} streams" if len(self._streams) > 1 else "response"
+            line = f"→ Receiving {streams}: {_format_bytes(total)} ({_format_bytes(total / elapsed)}/s)"
+            if self.colors:
+                line = f"{Fore.MAGENTA}{line}{Style.RESET_ALL}"
+            self.output.write(f"\r{line}\033[K")
+            self.output.flush()
+            self._progress_shown = True
+
+    def end_stream(self, key):
+        """Forget a finished stream and log its size and rate
+
+        Returns:
+            int: Bytes received on the stream
+        """
+        with self._lock:
+            started, received = self._streams.pop(key, (time.monotonic(), 0))
+            if not self._streams:
+                self._clear_progress()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.log("debug", "progress",
+                 f"Received {_format_bytes(received)} in {elapsed:.1f}s ({_format_bytes(received / elapsed)}/s)",
+                 Fore.MAGENTA, "→ ")
+        return received
+
+    def _clear_progress(self):
+        if self._progress_shown:
+            self.output.write("\r\033[K")
+            self._progress_shown = False
+
+    def _write_json(self, record):
+        record = {"time": round(time.time(), 3), **record}
+        # Tag messages with the plugin being processed, so batch logs can be split
+        from utils.metrics import current_metrics
+        metrics = current_metrics()
+        if metrics is not None:
+            record["plugin"] = metrics.plugin
+        with self._lock:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def configure_output(level=None, log_format=None, quiet=False):
+    """Configure console output
+
+    Args:
+        level (str): Minimum level (default: ``CONSOLE_LOG_LEVEL`` or info)
+        log_format (str): "text" or "json" (default: ``CONSOLE_LOG_FORMAT`` or text)
+        quiet (bool): Only show warnings and errors
+    """
+    global _logger
+    level = "warning" if quiet else (level or os.getenv("CONSOLE_LOG_LEVEL", "info")).lower()
+    log_format = (log_format or os.getenv("CONSOLE_LOG_FORMAT", "text")).lower()
+    _logger = ConsoleLogger(level=level, log_format=log_format)
+
+
+configure_output()
+
+
+def get_logger():
+    """Return the console logger behind the ``print_*`` helpers"""
+    return _logger
 
 
 def print_header(message, symbol='='):
     """Print a formatted header with color"""
+    if _logger.log_format == "json":
+        _logger.log("info", "header", message)
+        return
     width = 70
-    print(f"\n{Fore.CYAN}{Style.BRIGHT}{symbol * width}")
-    print(f"{message.center(width)}")
-    print(f"{symbol * width}{Style.RESET_ALL}")
+    _logger.log("info", "header", f"\n{symbol * width}\n{message.center(width)}\n{symbol * width}",
+                f"{Fore.CYAN}{Style.BRIGHT}")
+
+
+def print_plain(message=""):
+    """Print an uncolored info line"""
+    _logger.log("info", "info", message)
 
 
 def print_success(message):
     """Print a success message"""
-    print(f"{Fore.GREEN}{Style.BRIGHT}✓ {message}{Style.RESET_ALL}")
+    _logger.log("info", "success", message, f"{Fore.GREEN}{Style.BRIGHT}", "✓ ")
 
 
 def print_info(message):
     """Print an info message"""
-    print(f"{Fore.BLUE}ℹ {message}{Style.RESET_ALL}")
+    _logger.log("info", "info", message, Fore.BLUE, "ℹ ")
+
+
+def print_debug(message):
+    """Print a debug message (shown with CONSOLE_LOG_LEVEL=debug)"""
+    _logger.log("debug", "debug", message, Style.DIM, "· ")
 
 
 def print_warning(message):
     """Print a warning message"""
-    print(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}")
+    _logger.log("warning", "warning", message, Fore.YELLOW, "⚠ ")
 
 
 def print_error(message):
     """Print an error message"""
-    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+    _logger.log("error", "error", message, Fore.RED, "✗ ")
 
 
 def print_progress(message, progress=""):
     """Print a progress message"""
     if progress:
         progress = f"[{progress}] "
-    print(f"{Fore.MAGENTA}→ {progress}{message}{Style.RESET_ALL}")
+    _logger.log("info", "progress", f"{progress}{message}", Fore.MAGENTA, "→ ")
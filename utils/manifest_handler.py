@@ -1,24 +1,232 @@
 """
 Manifest file handling utilities
+
+Besides the top-level ``manifest.yaml`` keys, the provider YAML files listed
+under ``plugins`` and the tool, endpoint and strategy YAML files they list
+in turn are indexed into providers, declarations, parameters and credential
+fields. Parsed YAML files are cached by path and modification time, so
+repeated runs in one process (batch, watch mode) do not parse them again.
 """
 import os
-import yaml
 import json
-from utils.formatting import print_error, print_info, print_success, print_progress
+import threading
+from utils.formatting import print_error, print_info, print_success, print_progress, print_warning
+from utils.metrics import count
+
+# Keys of a provider YAML that list its declaration files, per manifest plugin category
+DECLARATION_KEYS = ("tools", "endpoints", "strategies")
+
+# Keys of a provider YAML holding its credential or settings fields
+CREDENTIAL_KEYS = ("credentials_for_provider", "settings")
+
+_yaml_cache = {}
+_yaml_cache_lock = threading.Lock()
+
+
+def parse_yaml(text):
+    """Parse YAML text or a stream, with libyaml's loader when PyYAML was built with it"""
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def load_yaml(path):
+    """Load a YAML file, reusing the parsed result while the file is unchanged
+
+    The returned data is shared between callers and must not be modified.
+
+    Raises:
+        OSError: If the file cannot be read
+        yaml.YAMLError: If the file is not valid YAML
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _yaml_cache_lock:
+        cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        count("yaml_cache_hits")
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = parse_yaml(f)
+    count("yaml_parsed")
+    with _yaml_cache_lock:
+        _yaml_cache[path] = (signature, data)
+    return data
+
+
+def _text(value):
+    """Return the English text of an i18n object such as {"en_US": ..., "zh_Hans": ...}"""
+    if isinstance(value, dict):
+        value = value.get("en_US", next(iter(value.values()), ""))
+    return value if isinstance(value, str) else ""
+
+
+def _index_field(name, spec):
+    """Normalize a parameter, credential or setting spec"""
+    field = {
+        "name": name,
+        "type": spec.get("type", ""),
+        "required": bool(spec.get("required", False)),
+        "label": _text(spec.get("label")),
+        "description": _text(spec.get("human_description") or spec.get("help") or spec.get("description")),
+    }
+    if spec.get("form"):
+        field["form"] = spec["form"]
+    if spec.get("default") is not None:
+        field["default"] = spec["default"]
+    options = spec.get("options")
+    if isinstance(options, list) and options:
+        field["options"] = [option.get("value") if isinstance(option, dict) else option for option in options]
+    return field
+
+
+def _index_fields(value):
+    """Normalize a field mapping ({name: spec}) or list ([{name|variable: ...}])"""
+    if isinstance(value, dict):
+        return [_index_field(name, spec or {}) for name, spec in value.items()]
+    if isinstance(value, list):
+        return [
+            _index_field(spec.get("name") or spec.get("variable", ""), spec)
+            for spec in value if isinstance(spec, dict)
+        ]
+    return []
+
+
+def _source(data):
+    """Return the Python file implementing a declaration"""
+    return ((data.get("extra") or {}).get("python") or {}).get("source", "")
+
+
+def _index_declaration(rel_path, data):
+    """Index a tool, endpoint or agent strategy YAML"""
+    identity = data.get("identity") or {}
+    description = data.get("description")
+    if isinstance(description, dict) and ("human" in description or "llm" in description):
+        description = description.get("human") or description.get("llm")
+    entry = {
+        "file": rel_path,
+        "name": identity.get("name", "") or data.get("path", ""),
+        "label": _text(identity.get("label")),
+        "description": _text(description),
+        "parameters": _index_fields(data.get("parameters")),
+        "source": _source(data),
+    }
+    # Endpoints are declared by route instead of identity
+    if data.get("path"):
+        entry["path"] = data["path"]
+        entry["method"] = data.get("method", "")
+    return entry
+
+
+def _resolve(plugin_path, rel_path, referrer_dir):
+    """Find a referenced YAML file relative to the plugin root or the referring file"""
+    for base in (plugin_path, referrer_dir):
+        full_path = os.path.join(base, rel_path)
+        if os.path.isfile(full_path):
+            return full_path
+    return None
+
+
+def _index_provider(plugin_path, rel_path, files):
+    """Index a provider YAML and the declaration files it lists"""
+    full_path = _resolve(plugin_path, rel_path, plugin_path)
+    if full_path is None:
+        print_warning(f"Provider file not found: {rel_path}")
+        return None
+    rel_path = os.path.relpath(full_path, plugin_path).replace(os.sep, "/")
+    data = load_yaml(full_path) or {}
+    files.append(rel_path)
+
+    identity = data.get("identity") or {}
+    provider = {
+        "file": rel_path,
+        "name": identity.get("name", "") or data.get("provider", ""),
+        "label": _text(identity.get("label") or data.get("label")),
+        "description": _text(identity.get("description") or data.get("description")),
+        "credentials": [],
+        "source": _source(data),
+    }
+    for key in CREDENTIAL_KEYS:
+        provider["credentials"] += _index_fields(data.get(key))
+    # Model providers nest their credential form
+    schema = data.get("provider_credential_schema") or {}
+    provider["credentials"] += _index_fields(schema.get("credential_form_schemas"))
+    if data.get("supported_model_types"):
+        provider["model_types"] = data["supported_model_types"]
+
+    for key in DECLARATION_KEYS:
+        references = data.get(key)
+        if not isinstance(references, list):
+            continue
+        declarations = []
+        for reference in references:
+            if not isinstance(reference, str):
+                continue
+            declaration_path = _resolve(plugin_path, reference, os.path.dirname(full_path))
+            if declaration_path is None:
+                print_warning(f"Declaration file not found: {reference}")
+                continue
+            declaration_rel = os.path.relpath(declaration_path, plugin_path).replace(os.sep, "/")
+            try:
+                declarations.append(_index_declaration(declaration_rel, load_yaml(declaration_path) or {}))
+                files.append(declaration_rel)
+            except Exception as e:
+                print_warning(f"Failed to index {declaration_rel}: {e}")
+        provider[key] = declarations
+    return provider
+
+
+def build_plugin_index(plugin_path, manifest_data):
+    """Index the providers a manifest declares under ``plugins``
+
+    Args:
+        plugin_path (str): Path to the plugin source directory
+        manifest_data (dict): Parsed ``manifest.yaml``
+
+    Returns:
+        tuple: (index, files) where index maps each manifest category (tools,
+        models, endpoints, agent_strategies) to a list of providers, each with
+        ``name``, ``label``, ``description``, ``credentials`` (fields with
+        ``name``, ``type``, ``required``, ...), ``source`` and its declarations
+        (``tools``, ``endpoints`` or ``strategies``, each with ``parameters``);
+        files lists the relative paths of all indexed YAML files
+    """
+    index = {}
+    files = []
+    categories = manifest_data.get("plugins") or {}
+    for category, references in categories.items():
+        if not isinstance(references, list):
+            continue
+        providers = []
+        for rel_path in references:
+            if not isinstance(rel_path, str):
+                continue
+            try:
+                provider = _index_provider(plugin_path, rel_path, files)
+            except Exception as e:
+                print_warning(f"Failed to index {rel_path}: {e}")
+                continue
+            if provider is not None:
+                providers.append(provider)
+        if providers:
+            index[category] = providers
+    return index, sorted(set(files))
+
 
 def extract_manifest_info(plugin_path):
-    """Extract information from manifest.yaml"""
+    """Extract information from manifest.yaml and the provider and tool YAMLs it references"""
     manifest_path = os.path.join(plugin_path, "manifest.yaml")
-    
+
     try:
         # Attempt to open and parse the manifest file
         print_progress(f"Reading manifest from: {manifest_path}")
-        with open(manifest_path, "r") as f:
-            manifest_data = yaml.safe_load(f)
-        
+        manifest_data = load_yaml(manifest_path)
+
         # Debug output of parsed manifest
         print_info(f"Successfully parsed manifest for plugin: {manifest_data.get('name', 'Unknown')}")
-        
+
         # Extract essential information
         info = {
             "name": manifest_data.get("name", ""),
@@ -28,7 +236,7 @@ def extract_manifest_info(plugin_path):
             "type": manifest_data.get("type", ""),
             "repository": manifest_data.get("repository", {}).get("url", "")
         }
-        
+
         # Add other useful information if available
         if "ui" in manifest_data:
             info["ui"] = manifest_data["ui"]
@@ -36,10 +244,19 @@ def extract_manifest_info(plugin_path):
             info["api"] = manifest_data["api"]
         if "dependencies" in manifest_data:
             info["dependencies"] = manifest_data["dependencies"]
-        
+
+        # Index the declared providers, tools, parameters and credentials
+        plugins, plugin_files = build_plugin_index(plugin_path, manifest_data)
+        if plugins:
+            info["plugins"] = plugins
+            info["plugin_files"] = plugin_files
+            providers = [provider for value in plugins.values() for provider in value]
+            declarations = sum(len(provider.get(key, [])) for provider in providers for key in DECLARATION_KEYS)
+            print_info(f"Indexed {len(providers)} provider(s) and {declarations} declaration(s)")
+
         print_success(f"Extracted manifest info for: {info['name']} v{info['version']}")
         return info
-    
+
     except Exception as e:
         print_error(f"Failed to extract manifest info: {e}")
         return None
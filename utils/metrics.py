@@ -0,0 +1,214 @@
+"""
+Lightweight per-plugin metrics
+
+Stage durations, counters and values are recorded into the metrics object
+of the plugin being processed. The object is bound to the current thread
+or asyncio task with ``activate_metrics``, so helpers deep in ``utils/`` can
+record without it being passed around; when nothing is active, recording is
+a no-op. Collected records can be exported as JSON lines or in the
+Prometheus text format.
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRIC_PREFIX = "dify_docgen"
+
+_current = ContextVar("plugin_metrics", default=None)
+
+
+class PluginMetrics:
+    """Metrics of one plugin run
+
+    ``stages`` holds accumulated seconds per stage, ``counters`` accumulated
+    counts (attempts, bytes, ...) and ``values`` the last value set (token
+    counts, sizes).
+    """
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.values = {}
+        # Split generations record into the same plugin from two threads
+        self._lock = threading.Lock()
+
+    def add_duration(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_value(self, name, value):
+        self.values[name] = value
+
+    def to_dict(self, **extra):
+        """Return a JSON-serializable record of the metrics"""
+        record = {
+            "type": "plugin",
+            "plugin": self.plugin,
+            "timestamp": round(self.started, 3),
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "values": dict(self.values),
+        }
+        record.update(extra)
+        return record
+
+
+def activate_metrics(metrics):
+    """Make ``metrics`` the target of recording in the current thread or asyncio task"""
+    _current.set(metrics)
+
+
+def current_metrics():
+    """Return the active metrics object, or None"""
+    return _current.get()
+
+
+@contextmanager
+def timed(stage):
+    """Time a block as ``stage`` of the active plugin"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_duration(stage, time.perf_counter() - started)
+
+
+def record_duration(stage, seconds):
+    """Add a duration measured by the caller to a stage of the active plugin"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_duration(stage, seconds)
+
+
+def count(name, value=1):
+    """Increment a counter of the active plugin"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def set_value(name, value):
+    """Set a value of the active plugin"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.set_value(name, value)
+
+
+def summarize_batch(records, wall_time):
+    """Aggregate plugin records into a batch record
+
+    Args:
+        records (list): Plugin records from ``PluginMetrics.to_dict``
+        wall_time (float): Elapsed seconds of the whole batch
+
+    Returns:
+        dict: Batch record with plugin counts by status and summed stages and counters
+    """
+    statuses = {}
+    stages = {}
+    counters = {}
+    for record in records:
+        status = record.get("status", "unknown")
+        statuses[status] = statuses.get(status, 0) + 1
+        for stage, seconds in record["stages"].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        for name, value in record["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        "type": "batch",
+        "timestamp": round(time.time(), 3),
+        "plugins": len(records),
+        "statuses": statuses,
+        "wall_seconds": round(wall_time, 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "counters": counters,
+    }
+
+
+def format_jsonl(records):
+    """Render records as JSON lines"""
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def format_prometheus(records):
+    """Render records in the Prometheus text exposition format"""
+    samples = {}
+
+    def add(metric, help_text, labels, value):
+        label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+        samples.setdefault((metric, help_text), []).append(f"{metric}{{{label_text}}} {value}")
+
+    for record in records:
+        if record["type"] == "batch":
+            for status, number in record["statuses"].items():
+                add(f"{METRIC_PREFIX}_batch_plugins", "Plugins in the batch by final status", {"status": status}, number)
+            add(f"{METRIC_PREFIX}_batch_wall_seconds", "Elapsed time of the batch", {}, record["wall_seconds"])
+            for stage, seconds in record["stages"].items():
+                add(f"{METRIC_PREFIX}_batch_stage_seconds", "Summed stage time over all plugins",
+                    {"stage": stage}, seconds)
+            for name, value in record["counters"].items():
+                add(f"{METRIC_PREFIX}_batch_{name}_total", f"Summed {name} over all plugins", {}, value)
+            continue
+
+        labels = {"plugin": record["plugin"]}
+        if "status" in record:
+            labels["status"] = record["status"]
+        for stage, seconds in record["stages"].items():
+            add(f"{METRIC_PREFIX}_stage_seconds", "Time spent per pipeline stage", {**labels, "stage": stage}, seconds)
+        for name, value in record["counters"].items():
+            add(f"{METRIC_PREFIX}_{name}_total", f"Count of {name}", labels, value)
+        for name, value in record["values"].items():
+            if isinstance(value, (int, float)):
+                add(f"{METRIC_PREFIX}_{name}", f"Last {name}", labels, value)
+
+    lines = []
+    for (metric, help_text), metric_samples in samples.items():
+        metric_type = "counter" if metric.endswith("_total") else "gauge"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        lines.extend(metric_samples)
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(path, records):
+    """Write metric records to a file
+
+    Files ending in ``.prom`` are (re)written in the Prometheus text format,
+    suitable for the node exporter's textfile collector; any other file
+    gets the records appended as JSON lines.
+
+    Returns:
+        bool: True if the records were written
+    """
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if path.endswith(".prom"):
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(format_prometheus(records))
+            os.replace(temp_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(format_jsonl(records))
+        return True
+    except OSError:
+        return False
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,204 @@
+"""
+Token-budget packing of the code structure sent to Dify
+"""
+import re
+from utils.formatting import print_info, print_warning
+from utils.code_analyzer import SEPARATOR, split_structure
+from utils.token_counter import count_tokens_cached, count_tokens_by_section
+
+# Importance tiers, lower is sent first
+TIER_MANIFEST = 0
+TIER_DECLARATION = 1
+TIER_ENTRY_POINT = 2
+TIER_SOURCE = 3
+TIER_OTHER = 4
+TIER_TEST = 5
+TIER_ASSET = 6
+
+# Python files that act as plugin entry points when at the root
+ENTRY_POINT_FILES = {"main.py", "__main__.py"}
+
+# Directories holding the plugin's declared surface
+DECLARATION_DIRECTORIES = {"provider", "providers", "tools", "endpoints", "models", "agent_strategies"}
+
+ASSET_DIRECTORIES = {"_assets", "assets", "static", "images", "img", "icons", "fonts"}
+
+# Lines kept when a Python file is reduced to an outline
+PYTHON_OUTLINE_RE = re.compile(r"^\s*(?:@|def |async def |class |import |from \S+ import )")
+
+# Maximum lines kept when a non-Python file is reduced to an outline
+GENERIC_OUTLINE_LINES = 20
+
+
+def rank_file(rel_path):
+    """Return the importance tier of a file in the plugin"""
+    lower = rel_path.lower()
+    parts = lower.split('/')
+    name = parts[-1]
+    directories = set(parts[:-1])
+
+    if lower == "manifest.yaml":
+        return TIER_MANIFEST
+    if directories & {"test", "tests"} or name.startswith("test_") or name.endswith("_test.py"):
+        return TIER_TEST
+    if directories & ASSET_DIRECTORIES:
+        return TIER_ASSET
+    if name.endswith((".yaml", ".yml")) and directories & DECLARATION_DIRECTORIES:
+        return TIER_DECLARATION
+    if name.endswith(".py") and (lower in ENTRY_POINT_FILES or directories & DECLARATION_DIRECTORIES):
+        return TIER_ENTRY_POINT
+    if name.endswith((".py", ".yaml", ".yml")) or name in {"requirements.txt", "pyproject.toml"}:
+        return TIER_SOURCE
+    return TIER_OTHER
+
+
+def outline_section(rel_path, section):
+    """Reduce a file section to its signatures
+
+    Python files keep imports, decorators, class and function signatures;
+    YAML files keep keys of the top two nesting levels; other files keep
+    their first lines.
+
+    Returns:
+        str: A section in the same layout, marked as an outline
+    """
+    body_lines = section.split('\n')[3:]
+    lower = rel_path.lower()
+
+    if lower.endswith(".py"):
+        kept = [line for line in body_lines if PYTHON_OUTLINE_RE.match(line)]
+    elif lower.endswith((".yaml", ".yml")):
+        kept = [
+            line[:120] for line in body_lines
+            if line.strip() and len(line) - len(line.lstrip()) <= 4 and not line.lstrip().startswith('#')
+        ]
+    else:
+        kept = [line for line in body_lines if line.strip()][:GENERIC_OUTLINE_LINES]
+
+    body = '\n'.join(kept) if kept else "[Outline empty]"
+    return '\n'.join([SEPARATOR, f"FILE: {rel_path} (outline)", SEPARATOR, body]) + '\n\n'
+
+
+def count_structure_tokens(code_structure):
+    """Count tokens of a structure dump as the sum of its tree and file sections
+
+    Per-section counts are memoized by content, so packing afterwards (or
+    counting again after a few files changed) only encodes new sections.
+    The sum can differ from encoding the whole dump by a few tokens at
+    section boundaries.
+    """
+    tree, sections = split_structure(code_structure)
+    sections[""] = tree
+    return sum(count_tokens_by_section(sections).values())
+
+
+def pack_code_structure(code_structure, token_budget, count=count_tokens_cached):
+    """Fit a code structure into a token budget
+
+    Files are taken in order of importance and included whole until the first
+    one no longer fits; from then on files are included as outlines, and
+    those whose outline does not fit either are left out and listed in a note
+    at the end. The note and the separators between sections count against
+    the budget too: the note names fewer files when space is short, and if
+    even a bare count does not fit, the least important files are left out
+    until it does. The directory tree is always kept and files stay in their
+    original order.
+
+    Args:
+        code_structure (str): Structure dump from ``generate_code_structure``
+        token_budget (int): Maximum number of tokens for the packed structure
+        count (callable): Token counter for a string
+
+    Returns:
+        tuple: (packed_structure, report) where report has ``full``, ``outlined``
+        and ``omitted`` path lists and the packed ``tokens``
+    """
+    tree, sections = split_structure(code_structure)
+    remaining = token_budget - count(tree)
+    # Every section is joined to the previous part with a newline
+    join_tokens = count('\n')
+    if count is count_tokens_cached:
+        # Warm the memo in one batch instead of encoding section by section
+        count_tokens_by_section(sections)
+
+    ranked = sorted(enumerate(sections), key=lambda item: (rank_file(item[1]), item[0]))
+    chosen = {}
+    costs = {}
+    report = {"full": [], "outlined": [], "omitted": [], "tokens": 0}
+    outline_only = False
+
+    for _, rel_path in ranked:
+        section = sections[rel_path]
+        if not outline_only:
+            section_tokens = count(section) + join_tokens
+            if section_tokens <= remaining:
+                chosen[rel_path] = section
+                costs[rel_path] = section_tokens
+                remaining -= section_tokens
+                report["full"].append(rel_path)
+                continue
+            # Less important files must not displace this one's full content
+            outline_only = True
+
+        outline = outline_section(rel_path, section)
+        outline_tokens = count(outline) + join_tokens
+        if outline_tokens <= remaining:
+            chosen[rel_path] = outline
+            costs[rel_path] = outline_tokens
+            remaining -= outline_tokens
+            report["outlined"].append(rel_path)
+        else:
+            report["omitted"].append(rel_path)
+
+    # Make room for the note by leaving out the least important files included
+    note = _fit_omitted_note(report["omitted"], remaining, count)
+    evictable = [rel_path for _, rel_path in reversed(ranked) if rel_path in chosen]
+    while note is None and evictable:
+        rel_path = evictable.pop(0)
+        del chosen[rel_path]
+        remaining += costs[rel_path]
+        report["full" if rel_path in report["full"] else "outlined"].remove(rel_path)
+        report["omitted"].append(rel_path)
+        note = _fit_omitted_note(report["omitted"], remaining, count)
+    if note is None:
+        # Not even the tree fits; send a bare count anyway
+        note = _omitted_note(report["omitted"], 0)
+    remaining -= count(note) if note else 0
+
+    parts = [tree] + [chosen[rel_path] for rel_path in sections if rel_path in chosen]
+    packed = '\n'.join(parts) + note
+    report["tokens"] = token_budget - remaining
+
+    return packed, report
+
+
+def _omitted_note(omitted, listed=50):
+    """Return the note naming up to ``listed`` of the files left out"""
+    if not listed:
+        return f"\n[Omitted to fit the token budget: {len(omitted)} files]\n"
+    names = ', '.join(omitted[:listed])
+    if len(omitted) > listed:
+        names += f" and {len(omitted) - listed} more"
+    return f"\n[Omitted to fit the token budget: {names}]\n"
+
+
+def _fit_omitted_note(omitted, budget, count):
+    """Return the most detailed note within ``budget``, "" if nothing was omitted, or None if none fits"""
+    if not omitted:
+        return ""
+    for listed in range(min(50, len(omitted)), -1, -1):
+        note = _omitted_note(omitted, listed)
+        if count(note) <= budget:
+            return note
+    return None
+
+
+def print_pack_report(report, token_budget):
+    """Print a short summary of what the packer kept"""
+    print_info(
+        f"Packed code structure to ~{report['tokens']} of {token_budget} tokens: "
+        f"{len(report['full'])} full, {len(report['outlined'])} outlined, {len(report['omitted'])} omitted"
+    )
+    if report["omitted"]:
+        print_warning(f"Omitted files: {', '.join(report['omitted'][:10])}"
+                      + (" ..." if len(report["omitted"]) > 10 else ""))
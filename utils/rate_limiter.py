@@ -0,0 +1,181 @@
+"""
+Client-side request and token rate limiting for Dify API calls
+
+Requests are admitted against two token buckets, one for requests per
+minute and one for tokens per minute, so concurrent workers stay within
+the app's quotas instead of running into 429s. Waiting requests are
+admitted smallest first, so one large plugin waiting for token budget does
+not hold up the small ones behind it; a request that has waited longer than
+``starvation_seconds`` goes first regardless of its size.
+"""
+import os
+import time
+import threading
+from utils.formatting import print_info
+from utils.token_counter import count_tokens_cached
+from utils.metrics import record_duration
+
+# Longest sleep between admission checks while other requests are ahead
+POLL_INTERVAL = 0.25
+
+
+def estimate_request_tokens(inputs, query, output_tokens=None):
+    """Estimate the tokens a generation request counts against the TPM quota
+
+    Args:
+        inputs (dict): App inputs; the ``code_files`` payload dominates
+        query (str): User query
+        output_tokens (int): Expected answer size (default: ``RATE_LIMIT_OUTPUT_TOKENS``)
+
+    Returns:
+        int: Estimated prompt plus completion tokens
+    """
+    if output_tokens is None:
+        output_tokens = int(os.getenv("RATE_LIMIT_OUTPUT_TOKENS", "4000"))
+    code_files = inputs.get("code_files", "") if inputs else ""
+    return count_tokens_cached(str(code_files)) + count_tokens_cached(query or "") + output_tokens
+
+
+class RateLimiter:
+    """Token-bucket admission control shared by threads and event loops
+
+    Args:
+        rpm (int): Requests per minute (0 for no limit)
+        tpm (int): Tokens per minute (0 for no limit)
+        starvation_seconds (float): Waiting time after which a request is
+            admitted before smaller ones
+    """
+
+    def __init__(self, rpm=0, tpm=0, starvation_seconds=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.starvation_seconds = starvation_seconds
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._waiting = {}
+        self._next_ticket = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until a request of ``tokens`` estimated tokens may be sent
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        ticket = self._enqueue(tokens)
+        started = time.monotonic()
+        try:
+            while True:
+                delay = self._try_admit(ticket)
+                if delay == 0:
+                    return self._report_wait(started)
+                time.sleep(delay)
+        finally:
+            self._dequeue(ticket)
+
+    async def acquire_async(self, tokens):
+        """Asyncio version of ``acquire``"""
+        import asyncio
+        ticket = self._enqueue(tokens)
+        started = time.monotonic()
+        try:
+            while True:
+                delay = self._try_admit(ticket)
+                if delay == 0:
+                    return self._report_wait(started)
+                await asyncio.sleep(delay)
+        finally:
+            self._dequeue(ticket)
+
+    def _enqueue(self, tokens):
+        """Register a waiting request and return its ticket"""
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            # A request larger than the whole budget is admitted with a full bucket
+            cost = min(tokens, self.tpm) if self.tpm else 0
+            self._waiting[ticket] = (cost, time.monotonic())
+            return ticket
+
+    def _dequeue(self, ticket):
+        with self._lock:
+            self._waiting.pop(ticket, None)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60)
+
+    def _next_in_line(self, now):
+        """Pick the waiting ticket to admit next: the oldest starving one, else the smallest"""
+        starving = [
+            (enqueued, ticket) for ticket, (_, enqueued) in self._waiting.items()
+            if now - enqueued >= self.starvation_seconds
+        ]
+        if starving:
+            return min(starving)[1]
+        return min(self._waiting, key=lambda ticket: (self._waiting[ticket][0], ticket))
+
+    def _try_admit(self, ticket):
+        """Admit a ticket if it is next in line and the budget allows
+
+        Returns:
+            float: 0 if admitted, otherwise seconds to wait before checking again
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._next_in_line(now) != ticket:
+                return POLL_INTERVAL
+
+            cost = self._waiting[ticket][0]
+            delay = 0.0
+            if self.rpm and self._requests < 1:
+                delay = max(delay, (1 - self._requests) * 60 / self.rpm)
+            if self.tpm and self._tokens < cost:
+                delay = max(delay, (cost - self._tokens) * 60 / self.tpm)
+            if delay > 0:
+                return min(delay, POLL_INTERVAL * 4)
+
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= cost
+            del self._waiting[ticket]
+            return 0
+
+    def _report_wait(self, started):
+        waited = time.monotonic() - started
+        record_duration("rate_limit_wait", waited)
+        if waited >= 1:
+            print_info(f"Waited {waited:.1f}s for the API rate limit")
+        return waited
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter from ``RATE_LIMIT_RPM``/``RATE_LIMIT_TPM``
+
+    Returns:
+        RateLimiter: The shared limiter, or None if neither limit is set
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            rpm = int(os.getenv("RATE_LIMIT_RPM", "0"))
+            tpm = int(os.getenv("RATE_LIMIT_TPM", "0"))
+            if not rpm and not tpm:
+                return None
+            _rate_limiter = RateLimiter(
+                rpm=rpm,
+                tpm=tpm,
+                starvation_seconds=float(os.getenv("RATE_LIMIT_STARVATION_SECONDS", "60"))
+            )
+        return _rate_limiter
@@ -0,0 +1,162 @@
+"""
+On-disk cache of Dify responses keyed by request content
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+from utils.formatting import print_info, print_warning
+
+# Default location of cached responses (relative to the working directory, like plugins/)
+DEFAULT_CACHE_DIR = os.path.join(".cache", "responses")
+
+# Directory holding the Dify app DSL, used to derive the app version
+DSL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dify-dsl")
+
+
+def get_cache_dir():
+    """Return the response cache directory"""
+    return os.getenv("RESPONSE_CACHE_DIR", os.path.join(os.getcwd(), DEFAULT_CACHE_DIR))
+
+
+def get_app_version():
+    """Return an identifier for the Dify app the responses come from
+
+    ``DIFY_APP_VERSION`` takes precedence; otherwise a hash of the DSL files
+    shipped in ``dify-dsl/`` is used, so importing a new DSL invalidates the cache.
+    """
+    app_version = os.getenv("DIFY_APP_VERSION")
+    if app_version:
+        return app_version
+
+    digest = hashlib.sha256()
+    if os.path.isdir(DSL_DIR):
+        for filename in sorted(os.listdir(DSL_DIR)):
+            with open(os.path.join(DSL_DIR, filename), "rb") as f:
+                digest.update(filename.encode("utf-8"))
+                digest.update(f.read())
+    return f"dsl-{digest.hexdigest()[:16]}"
+
+
+def make_cache_key(inputs, query, app_version=None):
+    """Build a content hash for an API request
+
+    Args:
+        inputs (dict): Inputs sent to the Dify app
+        query (str): Query sent to the Dify app
+        app_version (str): App identifier; defaults to ``get_app_version()``
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps(
+        {
+            "inputs": inputs,
+            "query": query,
+            "app_version": app_version or get_app_version()
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cached_answer(cache_key):
+    """Load a cached answer
+
+    Args:
+        cache_key (str): Key from ``make_cache_key``
+
+    Returns:
+        str: The cached answer, or None on a miss or an expired entry
+    """
+    cache_file = os.path.join(get_cache_dir(), f"{cache_key}.json")
+    max_age = float(os.getenv("RESPONSE_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+    try:
+        if time.time() - os.path.getmtime(cache_file) > max_age:
+            os.remove(cache_file)
+            return None
+        with open(cache_file, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        # Refresh mtime so size-based eviction drops the least recently used entries first
+        os.utime(cache_file, None)
+        return entry.get("answer") or None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print_warning(f"Ignoring unreadable cache entry {cache_key[:12]}: {e}")
+        return None
+
+
+def save_cached_answer(cache_key, answer, name=""):
+    """Store an answer in the cache and evict old entries
+
+    Args:
+        cache_key (str): Key from ``make_cache_key``
+        answer (str): Full answer text returned by the API
+        name (str): Plugin name, stored for reference only
+
+    Returns:
+        bool: True if the entry was written, False otherwise
+    """
+    cache_dir = get_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        entry = {"name": name, "created": time.time(), "answer": answer}
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(cache_dir, f"{cache_key}.json"))
+    except OSError as e:
+        print_warning(f"Failed to write response cache entry: {e}")
+        return False
+
+    evict_cache()
+    return True
+
+
+def evict_cache(max_bytes=None, max_age_days=None):
+    """Remove expired entries, then the least recently used until under the size limit
+
+    Args:
+        max_bytes (int): Size limit; defaults to ``RESPONSE_CACHE_MAX_MB``
+        max_age_days (float): Age limit; defaults to ``RESPONSE_CACHE_MAX_AGE_DAYS``
+
+    Returns:
+        int: Number of entries removed
+    """
+    cache_dir = get_cache_dir()
+    if max_bytes is None:
+        max_bytes = float(os.getenv("RESPONSE_CACHE_MAX_MB", "200")) * 1024 * 1024
+    if max_age_days is None:
+        max_age_days = float(os.getenv("RESPONSE_CACHE_MAX_AGE_DAYS", "30"))
+
+    entries = []
+    try:
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    total_size = sum(size for _, size, _ in entries)
+    removed = 0
+    # Oldest first: expired entries go regardless, the rest only while over the size limit
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= max_age_days * 86400 and total_size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Already evicted by a concurrent worker
+        total_size -= size
+        removed += 1
+
+    if removed:
+        print_info(f"Evicted {removed} response cache entries")
+    return removed
@@ -0,0 +1,261 @@
+"""
+Retry policy for Dify API calls
+
+Failures are classified as retryable (rate limiting, server errors, dropped
+connections, broken streams) or fatal (other client errors). Retryable
+failures are retried with exponential backoff and full jitter, honoring the
+server's ``Retry-After`` header, until the attempts or the per-plugin
+deadline run out. A circuit breaker shared by all workers in the process
+stops every worker from hammering the API while it is failing.
+"""
+import os
+import sys
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from utils.formatting import print_warning
+
+# HTTP statuses worth retrying; other 4xx responses are fatal
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+RETRYABLE_EXCEPTIONS = (ConnectionError, TimeoutError)
+
+
+def time_left(deadline):
+    """Return the seconds left until ``deadline`` (never negative), or None without one"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_deadline(deadline):
+    """Raise TimeoutError once ``deadline`` has passed"""
+    if time_left(deadline) == 0:
+        raise TimeoutError("Deadline reached while streaming the response")
+
+
+def _client_exceptions():
+    """Retryable exceptions of the HTTP libraries loaded so far
+
+    A library that was never imported cannot have raised anything, so
+    neither ``requests`` nor ``aiohttp`` is imported just to classify errors.
+    """
+    exceptions = []
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        exceptions += [requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                       requests.exceptions.ChunkedEncodingError]
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None:
+        exceptions += [aiohttp.ClientConnectionError, aiohttp.ClientPayloadError]
+    return tuple(exceptions)
+
+
+def parse_retry_after(value):
+    """Parse a ``Retry-After`` header (delay in seconds or an HTTP date)
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Failure counter shared by concurrent workers
+
+    After ``failure_threshold`` consecutive retryable failures the circuit
+    opens and every worker waits ``reset_timeout`` seconds. Then a single
+    probe request is let through; its success closes the circuit, its
+    failure opens it again. A probe ending without a verdict (a fatal
+    client error) is released so the next request can probe instead.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Return how many seconds to wait before sending a request (0 means go)"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                return remaining
+            if not self.probing:
+                self.probing = True
+                return 0.0
+            # Another worker's probe is in flight
+            return min(1.0, self.reset_timeout)
+
+    def record_success(self):
+        """Close the circuit"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self):
+        """Let another request probe after one ended without telling whether the service is healthy"""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self):
+        """Count a retryable failure, opening the circuit at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    print_warning(
+                        f"Circuit breaker open after {self.failures} consecutive failures, "
+                        f"pausing API calls for {self.reset_timeout:.0f}s"
+                    )
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Return the circuit breaker shared by all API calls in this process"""
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                failure_threshold=int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+            )
+        return _circuit_breaker
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a failed API call
+
+    Args:
+        max_retries (int): Retries after the first attempt
+        base_delay (float): Backoff ceiling of the first retry in seconds; it
+            doubles with every further retry
+        max_delay (float): Upper limit of the backoff ceiling
+        deadline (float): Total seconds allowed for one plugin's call, retries
+            included (None for no limit)
+        circuit_breaker (CircuitBreaker): Shared breaker, or None to disable it
+    """
+
+    def __init__(self, max_retries=0, base_delay=2.0, max_delay=60.0, deadline=None, circuit_breaker=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker
+
+    @classmethod
+    def from_env(cls, max_retries=None):
+        """Build the policy from ``MAX_RETRIES``, ``RETRY_*`` and ``CIRCUIT_BREAKER_*`` settings"""
+        if max_retries is None:
+            max_retries = int(os.getenv("MAX_RETRIES", "2"))
+        deadline = float(os.getenv("RETRY_DEADLINE_SECONDS", "1800"))
+        return cls(
+            max_retries=max_retries,
+            base_delay=float(os.getenv("RETRY_BASE_DELAY", "2")),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY", "60")),
+            deadline=deadline if deadline > 0 else None,
+            circuit_breaker=get_circuit_breaker()
+        )
+
+    @property
+    def max_attempts(self):
+        return self.max_retries + 1
+
+    def start(self):
+        """Return the monotonic time by which a plugin's calls must finish, or None
+
+        Start it once per plugin and pass it to every call for that plugin, so
+        resumes, split requests and translations share one budget.
+        """
+        if self.deadline is None:
+            return None
+        return time.monotonic() + self.deadline
+
+    def is_retryable_status(self, status):
+        return status in RETRYABLE_STATUSES
+
+    def is_retryable_exception(self, exc):
+        """Dropped connections, timeouts and broken streams are retryable"""
+        return isinstance(exc, RETRYABLE_EXCEPTIONS + _client_exceptions())
+
+    def record(self, success):
+        """Report the outcome of an attempt to the circuit breaker
+
+        Only successes and retryable failures should be recorded; a fatal
+        client error says nothing about the health of the service.
+        """
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+
+    def release(self):
+        """Report an attempt that ended in a fatal error, releasing a half-open probe"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release_probe()
+
+    def backoff(self, attempt, retry_after=None):
+        """Return the delay before retry number ``attempt`` (1-based)
+
+        Full jitter spreads concurrent workers' retries over the whole backoff
+        window. A ``Retry-After`` from the server is a lower bound.
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, min(1.0, ceiling)))
+        return delay
+
+    def next_delay(self, attempt, deadline, retry_after=None):
+        """Return the delay before the next attempt, or None if no attempt is left
+
+        Args:
+            attempt (int): Number of attempts made so far
+            deadline (float): Value returned by ``start``
+            retry_after (float): Seconds requested by the server, if any
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt, retry_after)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            print_warning("Retry deadline reached, giving up")
+            return None
+        return delay
+
+    def breaker_delay(self, deadline):
+        """Return how long to wait for the circuit breaker, or None if that passes the deadline"""
+        if self.circuit_breaker is None:
+            return 0.0
+        delay = self.circuit_breaker.before_request()
+        if delay and deadline is not None and time.monotonic() + delay >= deadline:
+            print_warning("Circuit breaker open past the retry deadline, giving up")
+            return None
+        return delay
@@ -0,0 +1,170 @@
+"""
+Incremental extraction of README and PRIVACY content from a streamed answer
+"""
+import os
+import re
+from utils.file_operations import save_documentation_file, localized_filename, write_if_changed
+
+# (key, output filename, log label, opening tag, closing tag)
+DOCUMENTS = [
+    ("readme", "README.md", "README", "<readme>", "</readme>"),
+    ("privacy", "PRIVACY.md", "PRIVACY", "<privacy_policy>", "</privacy_policy>"),
+]
+
+
+class StreamingTagExtractor:
+    """State machine that finds document tags as answer chunks arrive
+
+    Each chunk is scanned once, together with a short tail of the previous
+    text so tags split across chunks are still found. As soon as a closing
+    tag arrives, the finished document is written to disk, so README.md is
+    available before the privacy policy has finished streaming.
+
+    Args:
+        plugin_dir (str): Directory the documents are saved to
+        save_docs (bool): Whether to save documents as they complete
+        documents (list): Keys from ``DOCUMENTS`` to look for (default: all)
+        response_file (str): File in ``plugin_dir`` the full answer is written to
+            (default: ``full_response.txt``, or ``full_response_<key>.txt`` when
+            looking for a single document)
+        locale (str): Save translated documents, e.g. ``README_zh_Hans.md`` for "zh_Hans"
+    """
+
+    def __init__(self, plugin_dir=None, save_docs=True, documents=None, response_file=None, locale=None):
+        self.plugin_dir = plugin_dir
+        self.save_docs = save_docs
+        self.documents = list(documents) if documents else [key for key, *_ in DOCUMENTS]
+        self.locale = locale
+        if response_file is None:
+            partial = len(self.documents) < len(DOCUMENTS)
+            response_file = f"full_response_{'_'.join(self.documents)}.txt" if partial else "full_response.txt"
+            response_file = localized_filename(response_file, locale)
+        self.response_file = response_file
+        # Dify conversation the answer belongs to, set by the stream reader
+        self.conversation_id = None
+        self.parts = []
+        self.length = 0
+        self._tail = ""
+        self._overlap = max(max(len(open_tag), len(close_tag)) for _, _, _, open_tag, close_tag in DOCUMENTS) - 1
+        self._states = {}
+        for key, filename, label, open_tag, close_tag in DOCUMENTS:
+            if key not in self.documents:
+                continue
+            self._states[key] = {
+                "filename": localized_filename(filename, locale),
+                "label": f"{label} ({locale})" if locale else label,
+                "tags": (open_tag, close_tag),
+                "open": re.compile(re.escape(open_tag), re.IGNORECASE),
+                "close": re.compile(re.escape(close_tag), re.IGNORECASE),
+                "opened_at": None,
+                "start": None,
+                "end": None,
+                "content": "",
+                "complete": False,
+                "saved": False,
+            }
+
+    def feed(self, chunk):
+        """Add an answer chunk and advance every document's state"""
+        if not chunk:
+            return
+        window_start = self.length - len(self._tail)
+        window = self._tail + chunk
+        self.parts.append(chunk)
+        self.length += len(chunk)
+
+        for state in self._states.values():
+            if state["complete"]:
+                continue
+            if state["start"] is None:
+                match = state["open"].search(window)
+                if match is None:
+                    continue
+                state["opened_at"] = window_start + match.start()
+                state["start"] = window_start + match.end()
+            # The closing tag must come after the opening tag
+            search_from = max(0, state["start"] - window_start)
+
+            match = state["close"].search(window, search_from)
+            if match is None:
+                continue
+
+            state["end"] = window_start + match.end()
+            state["content"] = "".join(self.parts)[state["start"]:window_start + match.start()].strip()
+            state["complete"] = True
+            self._save(state)
+
+        self._tail = window[-self._overlap:]
+
+    @property
+    def answer(self):
+        """The full answer received so far"""
+        return "".join(self.parts)
+
+    def missing_documents(self):
+        """Return (label, opening tag, closing tag) of documents without a closing tag"""
+        return [
+            (state["label"], *state["tags"])
+            for state in self._states.values()
+            if not state["complete"]
+        ]
+
+    def continuation(self):
+        """Start an extractor for a resumed generation
+
+        The new extractor holds the answer up to the end of the last complete
+        document (cut before any document that was left unfinished), so the
+        continuation stream can be fed into it and is stitched onto that
+        prefix. Documents already written to disk are not written again.
+        """
+        unfinished = [
+            state["opened_at"] for state in self._states.values()
+            if not state["complete"] and state["opened_at"] is not None
+        ]
+        if unfinished:
+            resume_point = min(unfinished)
+        else:
+            resume_point = max((state["end"] for state in self._states.values() if state["complete"]), default=0)
+
+        resumed = StreamingTagExtractor(self.plugin_dir, False, self.documents, self.response_file, self.locale)
+        prefix = self.answer[:resume_point].rstrip()
+        if prefix:
+            resumed.feed(prefix + "\n\n")
+        resumed.save_docs = self.save_docs
+        resumed.conversation_id = self.conversation_id
+        for key, state in resumed._states.items():
+            state["saved"] = state["complete"] and self._states[key]["saved"]
+        return resumed
+
+    def finish(self):
+        """Finalize extraction, saving partial documents and the full response
+
+        Returns:
+            tuple: (readme_content, privacy_content, readme_complete, privacy_complete)
+        """
+        answer = self.answer
+
+        if self.plugin_dir:
+            full_response_path = os.path.join(self.plugin_dir, self.response_file)
+            try:
+                write_if_changed(full_response_path, answer)
+            except Exception:
+                pass  # 忽略保存错误
+
+        for state in self._states.values():
+            if not state["complete"] and state["start"] is not None:
+                # Keep partial content if no end tag
+                state["content"] = answer[state["start"]:].strip()
+                self._save(state)
+
+        # Documents this extractor does not look for come back empty and incomplete
+        readme = self._states.get("readme", {"content": "", "complete": False})
+        privacy = self._states.get("privacy", {"content": "", "complete": False})
+        return readme["content"], privacy["content"], readme["complete"], privacy["complete"]
+
+    def _save(self, state):
+        """Write a document to the plugin directory once"""
+        if not (self.save_docs and self.plugin_dir) or state["saved"] or not state["content"]:
+            return
+        save_documentation_file(self.plugin_dir, state["filename"], state["content"], state["label"])
+        state["saved"] = True
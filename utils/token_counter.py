@@ -1,17 +1,149 @@
 """
 Token counting utilities
+
+The tiktoken encoder is loaded once, on first use, and shared by all
+threads. Counts of individual texts (e.g. file sections) are memoized by
+content hash so repeated counting of unchanged files is free.
+
+Approximate counting (``estimate_tokens``) avoids the encoder entirely:
+
+* ``upper_bound=True`` returns the UTF-8 byte length. Every cl100k_base
+  token covers at least one byte, so this never undercounts; use it to
+  decide that a text certainly fits a budget.
+* Otherwise ``len(text) / 4`` is returned. For English prose and typical
+  Python/YAML source, cl100k_base averages about 3.5-4.5 characters per
+  token, so the estimate is usually within +/-25%. It undercounts dense
+  non-ASCII text (CJK can approach one token per character, i.e. up to 4x
+  under) and overcounts long runs of whitespace or repeated characters.
 """
-import tiktoken
-from utils.formatting import print_info, print_error
+import hashlib
+import threading
+from collections import OrderedDict
+from utils.formatting import print_error
+
+ENCODING_NAME = "cl100k_base"  # Used by GPT models
+
+# Maximum number of memoized per-text counts
+CACHE_SIZE = 50000
+
+_encoding = None
+_encoding_error = None
+_encoding_lock = threading.Lock()
+
+_counts = OrderedDict()
+_counts_lock = threading.Lock()
+
+
+def get_encoding():
+    """Return the shared tiktoken encoder, loading it on first use
+
+    Returns:
+        tiktoken.Encoding: The encoder, or None if it cannot be loaded (the
+        failure is remembered so later calls do not retry the download)
+    """
+    global _encoding, _encoding_error
+    if _encoding is not None or _encoding_error is not None:
+        return _encoding
+
+    with _encoding_lock:
+        if _encoding is None and _encoding_error is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+            except Exception as e:
+                _encoding_error = e
+                print_error(f"Error loading tokenizer, using approximate counts: {e}")
+    return _encoding
+
+
+def estimate_tokens(text, upper_bound=False):
+    """Approximate the token count without the encoder (see module docstring for error bounds)"""
+    if upper_bound:
+        return len(text.encode("utf-8"))
+    return len(text) // 4
+
 
 def count_tokens(text):
     """Count the number of tokens in a text using tiktoken"""
+    encoding = get_encoding()
+    if encoding is None:
+        # Return an approximate count as fallback (rough estimate)
+        return estimate_tokens(text)
     try:
-        # Use cl100k_base encoding (used by GPT models)
-        encoding = tiktoken.get_encoding("cl100k_base")
-        tokens = encoding.encode(text)
-        return len(tokens)
+        return len(encoding.encode_ordinary(text))
     except Exception as e:
         print_error(f"Error counting tokens: {e}")
-        # Return an approximate count as fallback (rough estimate)
-        return len(text) // 4  # Very rough approximation
+        return estimate_tokens(text)
+
+
+def count_tokens_cached(text):
+    """Count tokens, memoized by content hash"""
+    key = _content_key(text)
+    with _counts_lock:
+        if key in _counts:
+            _counts.move_to_end(key)
+            return _counts[key]
+
+    count = count_tokens(text)
+    _remember(key, count)
+    return count
+
+
+def count_tokens_by_section(sections):
+    """Count tokens of many texts at once
+
+    Cached counts are reused; the remaining texts are encoded in one
+    multi-threaded batch.
+
+    Args:
+        sections (dict): Key (e.g. file path) -> text
+
+    Returns:
+        dict: Key -> token count
+    """
+    counts = {}
+    missing = {}
+    with _counts_lock:
+        for name, text in sections.items():
+            key = _content_key(text)
+            if key in _counts:
+                _counts.move_to_end(key)
+                counts[name] = _counts[key]
+            else:
+                missing[name] = (key, text)
+
+    if missing:
+        encoding = get_encoding()
+        texts = [text for _, text in missing.values()]
+        if encoding is None:
+            results = [estimate_tokens(text) for text in texts]
+        else:
+            try:
+                results = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+            except Exception as e:
+                print_error(f"Error counting tokens: {e}")
+                results = [estimate_tokens(text) for text in texts]
+        for (name, (key, _)), count in zip(missing.items(), results):
+            counts[name] = count
+            _remember(key, count)
+
+    return counts
+
+
+def remember_count(text, count):
+    """Record a known token count of a text, e.g. one assembled from stored counts"""
+    _remember(_content_key(text), count)
+
+
+def _content_key(text):
+    """Hash a text for the count cache"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _remember(key, count):
+    """Store a count, evicting the least recently used entries"""
+    with _counts_lock:
+        _counts[key] = count
+        _counts.move_to_end(key)
+        while len(_counts) > CACHE_SIZE:
+            _counts.popitem(last=False)
@@ -0,0 +1,115 @@
+"""
+Translation of generated documentation into additional locales
+
+Once README and PRIVACY exist in the primary language, every extra locale
+is requested with a lightweight call that carries only the generated
+markdown instead of the code structure. Locales are translated concurrently
+and saved next to the primary documents as ``README_<locale>.md`` and
+``PRIVACY_<locale>.md``.
+"""
+import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.formatting import print_info, print_warning
+from utils.api_handler import call_dify_api, build_api_response
+from utils.stream_extractor import StreamingTagExtractor, DOCUMENTS
+from utils.response_cache import make_cache_key, load_cached_answer, save_cached_answer
+
+# Locale identifiers as used by Dify, e.g. "ja_JP", "zh_Hans", "pt_BR"
+LOCALE_PATTERN = re.compile(r"^[a-z]{2,3}(_[A-Za-z0-9]+)*$")
+
+# Sent instead of the code structure; translations only need the documents
+OMITTED_CODE = "(Code structure omitted: this request only translates the documentation below.)"
+
+
+def parse_locales(value):
+    """Parse a comma-separated locale list such as "zh_Hans,ja_JP"
+
+    Returns:
+        list: Unique locales in the given order; malformed entries are skipped with a warning
+    """
+    locales = []
+    for locale in (value or "").split(","):
+        locale = locale.strip().replace("-", "_")
+        if not locale:
+            continue
+        if not LOCALE_PATTERN.match(locale):
+            print_warning(f"Ignoring invalid locale: {locale}")
+            continue
+        if locale not in locales:
+            locales.append(locale)
+    return locales
+
+
+def build_translation_query(locale, documents):
+    """Build the query asking for a translation of the generated documents
+
+    Args:
+        locale (str): Target locale
+        documents (dict): Document key -> markdown content
+
+    Returns:
+        str: Query carrying the documents to translate
+    """
+    parts = [
+        f"Translate the following documentation of this Dify plugin into the {locale} locale. "
+        "Keep the Markdown structure, code blocks, links, URLs, identifiers and parameter names unchanged. "
+        "Return each translated document wrapped in the same tags as below and nothing else."
+    ]
+    for key, _, _, open_tag, close_tag in DOCUMENTS:
+        if key in documents:
+            parts.append(f"{open_tag}\n{documents[key]}\n{close_tag}")
+    return "\n\n".join(parts)
+
+
+def translate_documents(plugin_dir, manifest_info, inputs, api_response, locales, max_retries=0, use_cache=True,
+                        deadline=None):
+    """Translate the complete documents of a primary response into each locale
+
+    Args:
+        plugin_dir (str): Directory the primary documents were saved to
+        manifest_info (dict): Manifest information of the plugin
+        inputs (dict): Inputs of the primary request; ``code_files`` is replaced
+        api_response (dict): Primary response from ``call_dify_api``
+        locales (list): Target locales
+        max_retries (int): Retries per translation request
+        use_cache (bool): Replay cached translations of unchanged documents
+        deadline (float): Deadline of the plugin's primary call, shared by the translations
+
+    Returns:
+        dict: Locale -> (api_response, error_details), like ``call_dify_api``
+    """
+    documents = {
+        key: api_response[f"{key}_content"]
+        for key, *_ in DOCUMENTS
+        if api_response.get(f"{key}_complete") and api_response.get(f"{key}_content")
+    }
+    if not documents or not locales:
+        return {}
+
+    translation_inputs = dict(inputs, code_files=OMITTED_CODE)
+    keys = list(documents)
+
+    def translate(locale):
+        query = build_translation_query(locale, documents)
+        cache_key = make_cache_key(translation_inputs, query) if use_cache else None
+        cached_answer = load_cached_answer(cache_key) if cache_key else None
+        if cached_answer:
+            print_info(f"Using cached {locale} translation")
+            extractor = StreamingTagExtractor(plugin_dir, True, keys, locale=locale)
+            extractor.feed(cached_answer)
+            return build_api_response(cached_answer, plugin_dir, True, extractor), ""
+
+        translated, error_details = call_dify_api(plugin_dir, manifest_info, translation_inputs, query, max_retries,
+                                                  documents=keys, locale=locale, deadline=deadline)
+        complete = translated and all(translated[f"{key}_complete"] for key in keys)
+        if complete and cache_key:
+            save_cached_answer(cache_key, translated["answer"], f"{manifest_info.get('name', '')} ({locale})")
+        return translated, error_details
+
+    labels = " and ".join(label for key, _, label, _, _ in DOCUMENTS if key in documents)
+    print_info(f"Translating {labels} into {len(locales)} locale(s): {', '.join(locales)}")
+    with ThreadPoolExecutor(max_workers=len(locales)) as executor:
+        # Each call records into the metrics of the calling plugin
+        futures = {locale: executor.submit(contextvars.copy_context().run, translate, locale) for locale in locales}
+        return {locale: future.result() for locale, future in futures.items()}
@@ -0,0 +1,138 @@
+"""
+Watch plugin directories and regenerate documentation when they change
+
+Uses filesystem events from ``watchdog`` when it is installed, otherwise
+polls file modification times. Only changes to files that shape the docs
+(manifest, provider/tool YAML, Python source, requirements, ignore files)
+count; generated README/PRIVACY files copied into the source are ignored, so
+a regeneration does not trigger itself. Changes are debounced per plugin, so
+saving several files at once results in one regeneration.
+"""
+import os
+import time
+import threading
+from utils.formatting import print_info, print_warning, print_progress
+from utils.batch_runner import SKIP_DIRECTORIES
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+# Files whose changes lead to a regeneration
+RELEVANT_SUFFIXES = (".py", ".yaml", ".yml")
+RELEVANT_NAMES = {"requirements.txt", "pyproject.toml", ".gitignore", ".difyignore"}
+
+
+def is_relevant_change(plugin_path, file_path):
+    """Return True if a change to ``file_path`` should regenerate the plugin's docs"""
+    rel_path = os.path.relpath(file_path, plugin_path)
+    if rel_path.startswith(".."):
+        return False
+    parts = rel_path.split(os.sep)
+    if any(part in SKIP_DIRECTORIES or (part.startswith(".") and part not in RELEVANT_NAMES) for part in parts):
+        return False
+    name = parts[-1]
+    return name in RELEVANT_NAMES or name.endswith(RELEVANT_SUFFIXES)
+
+
+def snapshot_plugin(plugin_path):
+    """Return {path: (mtime, size)} of the relevant files of a plugin"""
+    snapshot = {}
+    for current_dir, dirnames, filenames in os.walk(plugin_path):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRECTORIES and not d.startswith(".")]
+        for filename in filenames:
+            file_path = os.path.join(current_dir, filename)
+            if not is_relevant_change(plugin_path, file_path):
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            snapshot[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """Record the time of the last relevant filesystem event per plugin"""
+
+    def __init__(self, plugin_path, changes, lock):
+        self.plugin_path = plugin_path
+        self.changes = changes
+        self.lock = lock
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if any(path and is_relevant_change(self.plugin_path, path) for path in paths):
+            with self.lock:
+                self.changes[self.plugin_path] = time.monotonic()
+
+
+def watch_plugins(plugin_paths, regenerate, debounce=2.0, poll_interval=1.0, use_events=None):
+    """Block, calling ``regenerate`` with the plugins whose files changed
+
+    Args:
+        plugin_paths (list): Plugin directories to watch
+        regenerate (callable): Takes a list of changed plugin paths
+        debounce (float): Seconds without further changes before a plugin is regenerated
+        poll_interval (float): Seconds between checks (and between scans when polling)
+        use_events (bool): Use filesystem events (default: when watchdog is installed)
+
+    Returns:
+        int: Number of regenerations run, when interrupted with Ctrl+C
+    """
+    use_events = WATCHDOG_AVAILABLE if use_events is None else use_events and WATCHDOG_AVAILABLE
+    changes = {}
+    lock = threading.Lock()
+    snapshots = {}
+    observer = None
+
+    if use_events:
+        observer = Observer()
+        for plugin_path in plugin_paths:
+            observer.schedule(_ChangeCollector(plugin_path, changes, lock), plugin_path, recursive=True)
+        observer.start()
+    else:
+        snapshots = {plugin_path: snapshot_plugin(plugin_path) for plugin_path in plugin_paths}
+
+    mode = "filesystem events" if use_events else f"polling every {poll_interval:g}s"
+    print_info(f"Watching {len(plugin_paths)} plugin(s) using {mode}; press Ctrl+C to stop")
+    runs = 0
+    try:
+        while True:
+            time.sleep(poll_interval)
+            now = time.monotonic()
+            if not use_events:
+                for plugin_path, previous in snapshots.items():
+                    current = snapshot_plugin(plugin_path)
+                    if current != previous:
+                        snapshots[plugin_path] = current
+                        changes[plugin_path] = now
+
+            with lock:
+                ready = sorted(path for path, changed_at in changes.items() if now - changed_at >= debounce)
+                for path in ready:
+                    del changes[path]
+            if not ready:
+                continue
+
+            print_progress(f"Change detected in {', '.join(os.path.basename(path) for path in ready)}")
+            try:
+                regenerate(ready)
+            except Exception as e:
+                print_warning(f"Regeneration failed: {e}")
+            runs += 1
+            print_info("Waiting for changes...")
+    except KeyboardInterrupt:
+        print_info("Stopped watching")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+    return runs